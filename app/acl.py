@@ -0,0 +1,245 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from .cidr import Net, parse
+from .graph import Graph
+
+if TYPE_CHECKING:
+    from .snapshots import Snapshot
+
+PROTOCOLS = {'-1': -1, 'all': -1, 'icmp': 1, 'tcp': 6, 'udp': 17, 'icmpv6': 58}
+PORT_PROTOCOLS = (6, 17)  # the others match any port
+INTERNET = ('0.0.0.0/0', '::/0')
+SWEEP_PORTS: Tuple[Tuple[str, int], ...] = (
+    ('tcp', 22), ('tcp', 23), ('tcp', 80), ('tcp', 443), ('tcp', 445), ('tcp', 1433), ('tcp', 3306), ('tcp', 3389),
+    ('tcp', 5432), ('tcp', 5900), ('tcp', 6379), ('tcp', 9200), ('tcp', 11211), ('tcp', 27017), ('udp', 53), ('udp', 161),
+)
+MAX_RESULTS = 1000
+_LO = (1 << 64) - 1
+
+def proto_number(proto: Any) -> int:
+    """IANA protocol number of an SG / NACL protocol ('tcp', '6', '-1', ...); -1 is all, -2 unknown."""
+    p = str(proto).lower()
+    if p in PROTOCOLS:
+        return PROTOCOLS[p]
+    try:
+        return int(p)
+    except ValueError:
+        return -2
+
+def _bounds(net: Net) -> Tuple[int, int, int, int, int]:
+    """(version, first high, first low, last high, last low): the address range as 64-bit halves."""
+    first, last = int(net.network_address), int(net.broadcast_address)
+    return net.version, first >> 64, first & _LO, last >> 64, last & _LO
+
+def _le(ah: np.ndarray, al: np.ndarray, bh: np.ndarray, bl: np.ndarray) -> np.ndarray:
+    """a <= b for 128-bit values given as (high, low) halves."""
+    return (ah < bh) | ((ah == bh) & (al <= bl))
+
+class RuleTable:
+    """
+    Rules of many security groups or NACLs as parallel arrays, one row per (rule, CIDR), rows
+    of one owner contiguous and in rule-number order: protocol number, port range, address
+    range of the CIDR as integer bounds, rule number and allow / deny.
+    """
+    def __init__(self, owners: List[str], rows: List[Tuple[int, int, int, int, int, Net, int, bool]]) -> None:
+        self.owners = owners  # row owner index -> security group / NACL id
+        # (owner, egress, proto, port from, port to, network, rule number, allow)
+        rows.sort(key=lambda r: (r[0], r[1], r[6]))
+        n = len(rows)
+        col = lambda i, dtype: np.fromiter((r[i] for r in rows), dtype=dtype, count=n)
+        self.owner = col(0, np.int64)
+        self.egress = col(1, bool)
+        self.proto = col(2, np.int64)
+        self.port_lo = col(3, np.int64)
+        self.port_hi = col(4, np.int64)
+        b = [_bounds(r[5]) for r in rows]
+        self.ver = np.fromiter((x[0] for x in b), dtype=np.int64, count=n)
+        self.first_hi, self.first_lo, self.last_hi, self.last_lo = (
+            np.fromiter((x[i] for x in b), dtype=np.uint64, count=n) for i in range(1, 5))
+        self.number = col(6, np.int64)
+        self.allow = col(7, bool)
+
+    def __len__(self) -> int:
+        return len(self.owner)
+
+    def ports(self, rows: np.ndarray, protos: np.ndarray, ports: np.ndarray) -> np.ndarray:
+        """[row, port] whether a row matches the protocol / port of each query port."""
+        proto = self.proto[rows, None]
+        in_range = (self.port_lo[rows, None] <= ports) & (ports <= self.port_hi[rows, None])
+        return ((proto == -1) | (proto == protos)) & (in_range | ~np.isin(protos, PORT_PROTOCOLS))
+
+    def contains(self, rows: np.ndarray, src: Tuple[int, int, int, int, int]) -> np.ndarray:
+        """Whether each row's CIDR contains all of the source range."""
+        _, fh, fl, lh, ll = (np.uint64(x) for x in src)
+        return ((self.ver[rows] == src[0]) & _le(self.first_hi[rows], self.first_lo[rows], fh, fl)
+                & _le(lh, ll, self.last_hi[rows], self.last_lo[rows]))
+
+    def overlaps(self, rows: np.ndarray, src: Tuple[int, int, int, int, int]) -> np.ndarray:
+        """Whether each row's CIDR shares any address with the source range."""
+        _, fh, fl, lh, ll = (np.uint64(x) for x in src)
+        return ((self.ver[rows] == src[0]) & _le(self.first_hi[rows], self.first_lo[rows], lh, ll)
+                & _le(fh, fl, self.last_hi[rows], self.last_lo[rows]))
+
+def _segments(owner: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Distinct owners of sorted rows and the row where each one starts."""
+    if not len(owner):
+        return owner, owner
+    starts = np.flatnonzero(np.concatenate(([True], owner[1:] != owner[:-1])))
+    return owner[starts], starts
+
+class AclTables:
+    """
+    Security group and network ACL rule tables of a graph, with the ENIs they apply to, for
+    evaluating which (source CIDR, protocol / port) tuples every ENI admits in one pass.
+
+    Security groups are stateful and allow-only: a tuple is admitted when an ingress rule of
+    one of the ENI's groups matches the port and its CIDR contains the whole source. Rules
+    referencing other security groups are left out (their members are not sources by CIDR).
+    Network ACLs are evaluated on their inbound entries in rule-number order, the first entry
+    matching the port and overlapping the source decides, and it admits only an allow entry
+    containing the whole source; no match is a deny. Replies through the outbound entries are
+    not checked. Subnets whose NACL was not enumerated are not filtered by one.
+    """
+    def __init__(self, g: Graph) -> None:
+        self.g = g
+        sgs: Dict[str, int] = {}
+        rows: List[Tuple[int, int, int, int, int, Net, int, bool]] = []
+        for e in g.edges('sg-rule'):
+            ingress = e.details.get('direction') == 'ingress'
+            peer, sg = (e.source, e.target) if ingress else (e.target, e.source)
+            p = g.node(peer)
+            net = parse(p.label) if p is not None and p.type == 'cidr' else None
+            if net is None:
+                continue
+            o = sgs.setdefault(sg, len(sgs))
+            for r in e.details.get('rules') or []:
+                lo, hi = r.get('from'), r.get('to')
+                full = lo is None or lo == -1 or proto_number(r.get('proto')) == -1
+                rows.append((o, int(not ingress), proto_number(r.get('proto')), 0 if full else lo, 65535 if full else hi, net, 0, True))
+        self.sg = RuleTable(list(sgs), rows)
+
+        nacls: Dict[str, int] = {}
+        rows = []
+        for n in g.nodes('nacl'):
+            if 'entries' not in n.details:
+                continue  # enumerated without its rules: not evaluated
+            o = nacls.setdefault(n.id, len(nacls))
+            for x in n.details['entries']:
+                net = parse(x.get('cidr')) if x.get('cidr') else None
+                if net is None:
+                    continue
+                lo, hi = x.get('from'), x.get('to')
+                full = lo is None or proto_number(x.get('proto')) == -1
+                rows.append((o, int(bool(x.get('egress'))), proto_number(x.get('proto')), 0 if full else lo, 65535 if full else hi,
+                             net, int(x.get('rule') or 0), x.get('action') == 'allow'))
+        self.nacl = RuleTable(list(nacls), rows)
+
+        subnet_nacl: Dict[str, int] = {}
+        for nid, o in nacls.items():
+            for e in g.in_edges(nid, 'assoc'):
+                subnet_nacl[e.source] = o
+        self.enis: List[str] = []
+        eni_sg: List[Tuple[int, int]] = []
+        eni_nacl: List[int] = []
+        for n in g.nodes('eni'):
+            i = len(self.enis)
+            self.enis.append(n.id)
+            subnet = n.parent
+            for e in g.out_edges(n.id, 'attach'):
+                if e.target in sgs:
+                    eni_sg.append((i, sgs[e.target]))
+                elif e.label == 'in-subnet':
+                    subnet = e.target
+            eni_nacl.append(subnet_nacl.get(subnet, -1) if subnet else -1)
+        pairs = np.array(sorted(eni_sg), dtype=np.int64).reshape(-1, 2)
+        self._eni_of, self._sg_of = pairs[:, 0], pairs[:, 1]
+        self._nacl_of = np.array(eni_nacl, dtype=np.int64)
+
+    def _sg_admits(self, src: Tuple[int, int, int, int, int], protos: np.ndarray, ports: np.ndarray) -> np.ndarray:
+        """[security group, port] admitted from `src`."""
+        t = self.sg
+        out = np.zeros((len(t.owners), len(ports)), dtype=bool)
+        rows = np.flatnonzero(~t.egress)
+        rows = rows[t.contains(rows, src)]
+        if len(rows):
+            owners, starts = _segments(t.owner[rows])
+            out[owners] = np.logical_or.reduceat(t.ports(rows, protos, ports), starts, axis=0)
+        return out
+
+    def _nacl_admits(self, src: Tuple[int, int, int, int, int], protos: np.ndarray, ports: np.ndarray) -> np.ndarray:
+        """[NACL, port] admitted from `src`: the first inbound entry that matches decides."""
+        t = self.nacl
+        out = np.zeros((len(t.owners), len(ports)), dtype=bool)
+        rows = np.flatnonzero(~t.egress)
+        rows = rows[t.overlaps(rows, src)]
+        if len(rows):
+            owners, starts = _segments(t.owner[rows])
+            pos = np.arange(len(rows))
+            first = np.minimum.reduceat(np.where(t.ports(rows, protos, ports), pos[:, None], len(rows)), starts, axis=0)
+            admits = np.append(t.allow[rows] & t.contains(rows, src), False)  # index len(rows): nothing matched
+            out[owners] = admits[first]
+        return out
+
+    def admits(self, sources: Sequence[str], ports: Sequence[Tuple[str, int]]) -> np.ndarray:
+        """[ENI, source, port] whether the ENI's security groups and subnet NACL admit the tuple."""
+        protos = np.array([proto_number(p) for p, _ in ports], dtype=np.int64)
+        nums = np.array([n for _, n in ports], dtype=np.int64)
+        out = np.zeros((len(self.enis), len(sources), len(ports)), dtype=bool)
+        owners, starts = _segments(self._eni_of)
+        filtered = self._nacl_of >= 0
+        for s, source in enumerate(sources):
+            net = parse(source)
+            if net is None:
+                raise ValueError(f'not an IP address or CIDR: {source}')
+            src = _bounds(net)
+            if len(owners):
+                sg = self._sg_admits(src, protos, nums)
+                out[owners, s] = np.logical_or.reduceat(sg[self._sg_of], starts, axis=0)
+            nacl = self._nacl_admits(src, protos, nums)
+            out[filtered, s] &= nacl[self._nacl_of[filtered]]
+        return out
+
+    def sweep(self, sources: Sequence[str] = INTERNET, ports: Sequence[Tuple[str, int]] = SWEEP_PORTS,
+              public_only: bool = True, limit: int = MAX_RESULTS) -> Dict[str, Any]:
+        """
+        What each ENI admits from `sources` on `ports` (by default: what is open to the whole
+        internet on commonly attacked ports), ENIs without a public IP left out with `public_only`.
+        """
+        hit = self.admits(sources, ports)
+        labels = [f'{p}:{n}' for p, n in ports]
+        found = np.flatnonzero(hit.any(axis=(1, 2)))
+        out: List[Dict[str, Any]] = []
+        total = 0
+        for i in found.tolist():
+            n = self.g.node(self.enis[i])
+            if public_only and not n.details.get('public_ip'):
+                continue
+            total += 1
+            if len(out) < limit:
+                s_idx, p_idx = np.nonzero(hit[i])
+                out.append({'id': n.id, 'label': n.label, 'public_ip': n.details.get('public_ip'),
+                            'open': [{'source': sources[s], 'port': labels[p]} for s, p in zip(s_idx.tolist(), p_idx.tolist())]})
+        return {'sources': list(sources), 'ports': labels, 'enis': len(self.enis), 'total': total,
+                'truncated': total > len(out), 'results': out}
+
+def parse_ports(spec: str) -> List[Tuple[str, int]]:
+    """'tcp:22,udp:53' as [('tcp', 22), ('udp', 53)]; ValueError when malformed."""
+    out = []
+    for part in spec.split(','):
+        proto, _, port = part.strip().partition(':')
+        if not proto or proto_number(proto) == -2 or not port.isdigit() or int(port) > 65535:
+            raise ValueError(f'bad port: {part!r}; expected proto:port, e.g. tcp:22')
+        out.append((proto.lower(), int(port)))
+    return out
+
+def snapshot_acl(snap: Snapshot) -> AclTables:
+    """The AclTables of `snap`, built on first use and kept with the snapshot."""
+    if snap.acl is not None:  # built once, never replaced: no lock needed to read it
+        return snap.acl
+    with snap.lock:
+        if snap.acl is None:
+            snap.acl = AclTables(snap.graph)
+        return snap.acl
@@ -1,12 +1,10 @@
 from __future__ import annotations
 from typing import List
-from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import re
 import boto3
-from ..graph import Graph
-
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
+from ..graph import GraphBuffer
+from .clients import client
 
 def safe_call(fn, *args, **kwargs):
     try:
@@ -19,9 +17,9 @@ def safe_call(fn, *args, **kwargs):
 def mk_id(*parts: str) -> str:
     return ":".join([p for p in parts if p])
 
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
     # API Gateway v1 (REST)
-    apigw = session.client('apigateway', region_name=region, config=BOTO_CFG)
+    apigw = client(session, 'apigateway', region)
     apis, err = safe_call(apigw.get_rest_apis, limit=500)
     if not err and apis:
         for api in apis.get('items', []):
@@ -32,11 +30,14 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
             if not err2 and stages:
                 for st in stages.get('item', []):
                     sid = st.get('stageName')
-                    g.add_node(mk_id('apigw-stage', account_id, region, api_id, sid), f'Stage {sid}', 'api_gw_stage', region, account_id=account_id, parent=mk_id('apigw', account_id, region, api_id))
+                    logging = any((m or {}).get('loggingLevel') not in (None, 'OFF') for m in (st.get('methodSettings') or {}).values())
+                    g.add_node(mk_id('apigw-stage', account_id, region, api_id, sid), f'Stage {sid}', 'api_gw_stage', region,
+                               details={'tracing': st.get('tracingEnabled'), 'waf': st.get('webAclArn'), 'logging': logging},
+                               account_id=account_id, parent=mk_id('apigw', account_id, region, api_id))
             # Integrations for v1 would require walking resources; can be added later.
 
     # API Gateway v2 (HTTP/WebSocket)
-    apigwv2 = session.client('apigatewayv2', region_name=region, config=BOTO_CFG)
+    apigwv2 = client(session, 'apigatewayv2', region)
     apis2, err = safe_call(apigwv2.get_apis)
     if not err and apis2:
         for api in apis2.get('Items', []):
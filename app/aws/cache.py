@@ -0,0 +1,196 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, Optional, Tuple
+from contextvars import ContextVar
+import hashlib
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+
+import orjson
+from botocore.awsrequest import AWSResponse
+
+from ..scheduler import current_task
+
+# opt-in: cached responses may be stale, and they are stored on disk unencrypted (see README)
+CACHE_ENABLED = os.environ.get('CACHE_ENABLED', '0') == '1'
+CACHE_DIR = os.environ.get('CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'awsenum'))  # '' disables
+CACHE_MAX_BYTES = int(os.environ.get('CACHE_MAX_BYTES', str(512 * 1024 * 1024)))
+CACHE_TTL = int(os.environ.get('CACHE_TTL', '900'))
+
+# seconds, by botocore service name; override with CACHE_TTLS="ec2=300,s3=3600"
+SERVICE_TTLS: Dict[str, int] = {
+    'ec2': 300, 'elbv2': 300, 'lambda': 600, 'apigateway': 600, 'apigatewayv2': 600,
+    's3': 3600, 'route53': 3600, 'cloudfront': 3600,
+}
+for _item in filter(None, os.environ.get('CACHE_TTLS', '').split(',')):
+    _svc, _, _ttl = _item.partition('=')
+    SERVICE_TTLS[_svc.strip()] = int(_ttl)
+
+# per-request upper bound on entry age (payload 'max_age'); 0 forces a refresh
+max_age: ContextVar[Optional[float]] = ContextVar('cache_max_age', default=None)
+# ARN of the caller (sts GetCallerIdentity) the current task's credentials belong to; part of
+# every key, so principals of one account with different permissions never share entries
+principal: ContextVar[Optional[str]] = ContextVar('cache_principal', default=None)
+
+_READ_OP = re.compile(r'^(Describe|List|Get)')
+_ACCOUNT = re.compile(r'^\d{12}$')
+_NEVER = ('sts',)  # identity must never come from another credential's entry
+
+class ResponseCache:
+    """
+    On-disk cache of parsed AWS API responses, installed on clients through botocore events.
+
+    Entries are keyed by (principal, account, region, service, operation, params) and only
+    read-only Describe/List/Get calls made inside a scheduler task for a known account and
+    caller are cached.
+    Expired entries (per-service TTL, or the caller's `max_age`) are refetched, and the
+    least recently used entries are evicted once the file exceeds `max_bytes`. Facts that
+    never change (e.g. a bucket's region) are kept apart, with no TTL or eviction.
+    """
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES, default_ttl: int = CACHE_TTL) -> None:
+        self.directory = directory
+        self.enabled = bool(directory)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._size = 0
+
+    @property
+    def _db(self) -> Optional[sqlite3.Connection]:
+        # opened on first use so importing the app never touches the disk
+        if self._conn is None and self.enabled:
+            with self._lock:
+                if self._conn is None:
+                    os.makedirs(self.directory, mode=0o700, exist_ok=True)
+                    db = sqlite3.connect(os.path.join(self.directory, 'responses.sqlite'), check_same_thread=False, isolation_level=None)
+                    db.execute('PRAGMA journal_mode=WAL')
+                    db.execute(
+                        'CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, service TEXT, operation TEXT, account TEXT, region TEXT, '
+                        'created REAL, accessed REAL, size INTEGER, value BLOB)'
+                    )
+                    db.execute('CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)')
+                    db.execute('CREATE TABLE IF NOT EXISTS facts (namespace TEXT, key TEXT, value TEXT, PRIMARY KEY (namespace, key))')
+                    self._size = db.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+                    self._conn = db
+        return self._conn if self.enabled else None
+
+    def ttl(self, service: str) -> float:
+        return SERVICE_TTLS.get(service, self.default_ttl)
+
+    @staticmethod
+    def make_key(account: str, region: str, service: str, operation: str, params: Dict[str, Any], caller: str = '') -> str:
+        raw = orjson.dumps([caller, account, region, service, operation, params], option=orjson.OPT_SORT_KEYS, default=str)
+        return hashlib.sha256(raw).hexdigest()
+
+    def get(self, key: str, service: str, limit: Optional[float] = None) -> Optional[Any]:
+        db = self._db
+        if db is None:
+            return None
+        age = self.ttl(service) if limit is None else min(self.ttl(service), limit)
+        now = time.time()
+        with self._lock:
+            row = db.execute('SELECT created, value FROM responses WHERE key = ?', (key,)).fetchone()
+            if row is None or now - row[0] > age:
+                self.misses += 1
+                return None
+            db.execute('UPDATE responses SET accessed = ? WHERE key = ?', (now, key))
+            self.hits += 1
+        return pickle.loads(row[1])
+
+    def put(self, key: str, service: str, operation: str, account: str, region: str, parsed: Any) -> None:
+        db = self._db
+        if db is None:
+            return
+        blob = pickle.dumps(parsed, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            old = db.execute('SELECT size FROM responses WHERE key = ?', (key,)).fetchone()
+            db.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                (key, service, operation, account, region, now, now, len(blob), blob),
+            )
+            self._size += len(blob) - (old[0] if old else 0)
+            if self._size > self.max_bytes:
+                self._evict(db, int(self.max_bytes * 0.9))
+
+    def _evict(self, db: sqlite3.Connection, target: int) -> None:
+        for key, size in db.execute('SELECT key, size FROM responses ORDER BY accessed').fetchall():
+            if self._size <= target:
+                break
+            db.execute('DELETE FROM responses WHERE key = ?', (key,))
+            self._size -= size
+
+    def get_facts(self, namespace: str, keys: Iterable[str]) -> Dict[str, str]:
+        db = self._db
+        keys = list(keys)
+        if db is None or not keys:
+            return {}
+        out: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(keys), 500):  # stay under SQLite's bound-parameter limit
+                chunk = keys[i:i + 500]
+                rows = db.execute(f"SELECT key, value FROM facts WHERE namespace = ? AND key IN ({','.join('?' * len(chunk))})", (namespace, *chunk))
+                out.update(rows.fetchall())
+        return out
+
+    def put_facts(self, namespace: str, items: Dict[str, str]) -> None:
+        db = self._db
+        if db is None or not items:
+            return
+        with self._lock:
+            db.executemany('INSERT OR REPLACE INTO facts VALUES (?, ?, ?)', [(namespace, k, v) for k, v in items.items()])
+
+    def clear(self) -> None:
+        db = self._db
+        if db is not None:
+            with self._lock:
+                db.execute('DELETE FROM responses')
+                db.execute('DELETE FROM facts')
+                self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {'enabled': self.enabled, 'bytes': self._size, 'hits': self.hits, 'misses': self.misses}
+
+    # --- botocore event handlers -------------------------------------------------
+
+    def install(self, client: Any) -> None:
+        if not self.enabled:
+            return
+        service = client.meta.service_model.service_name
+        if service in _NEVER:
+            return
+        region = client.meta.region_name or 'global'
+        events = client.meta.events
+        events.register('before-parameter-build', lambda params, model, context, **kw: self._keyed(service, region, params, model, context))
+        events.register('before-call', lambda model, context, **kw: self._lookup(service, context))
+        events.register('after-call', lambda http_response, parsed, model, context, **kw: self._store(service, region, http_response, parsed, model, context))
+
+    def _keyed(self, service: str, region: str, params: Dict[str, Any], model: Any, context: Dict[str, Any]) -> None:
+        task = current_task.get(); caller = principal.get()
+        if task is None or not caller or not _ACCOUNT.match(task[0]) or not _READ_OP.match(model.name):
+            return
+        context['awsenum_cache'] = (self.make_key(task[0], region, service, model.name, params, caller), task[0])
+
+    def _lookup(self, service: str, context: Dict[str, Any]) -> Optional[Tuple[AWSResponse, Any]]:
+        entry = context.get('awsenum_cache')
+        if entry is None:
+            return None
+        parsed = self.get(entry[0], service, max_age.get())
+        if parsed is None:
+            return None
+        context['awsenum_cache_hit'] = True
+        return AWSResponse('', 200, {}, None), parsed
+
+    def _store(self, service: str, region: str, http_response: Any, parsed: Any, model: Any, context: Dict[str, Any]) -> None:
+        entry = context.get('awsenum_cache')
+        if entry is None or context.get('awsenum_cache_hit') or http_response.status_code >= 300:
+            return
+        self.put(entry[0], service, model.name, entry[1], region, parsed)
+
+CACHE = ResponseCache(CACHE_DIR if CACHE_ENABLED else '')
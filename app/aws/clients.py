@@ -0,0 +1,87 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from collections import OrderedDict
+import os
+import threading
+import boto3
+from botocore.config import Config as BotoConfig
+
+from ..metrics import METRICS
+from ..scheduler import MAX_WORKERS
+from .cache import CACHE
+from .ratelimit import LIMITER
+
+POOL_SIZE = int(os.environ.get('CLIENT_POOL_SIZE', '4096'))
+
+# one connection per worker thread that may share a client, for the largest `workers` a request
+# may ask for; client-side rate limiting is left to the shared LIMITER ('adaptive' mode would
+# keep a separate rate per client)
+BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'standard'}, read_timeout=25, connect_timeout=10, max_pool_connections=MAX_WORKERS)
+
+ClientKey = Tuple[Optional[Tuple[str, str]], str, Optional[str]]
+
+class ClientPool:
+    """
+    Shared boto3 clients keyed by (credentials, service, region).
+
+    Clients are thread-safe once built, but boto3.Session is not, so every
+    `session.client(...)` / credential lookup happens under one creation lock.
+    Least recently used clients are dropped beyond `max_size`. Each `hooks` entry is
+    called with every new client, e.g. to register botocore event handlers.
+    """
+    def __init__(self, config: BotoConfig = BOTO_CFG, max_size: int = POOL_SIZE, hooks: Optional[List[Callable[[Any], None]]] = None) -> None:
+        self.config = config
+        self.max_size = max_size
+        self.hooks = list(hooks or [])
+        self._clients: "OrderedDict[ClientKey, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._create_lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+
+    @staticmethod
+    def _creds_key(session: boto3.Session) -> Optional[Tuple[str, str]]:
+        creds = session.get_credentials()
+        if creds is None:
+            return None
+        frozen = creds.get_frozen_credentials()
+        return (frozen.access_key, frozen.token or '')
+
+    def get(self, session: boto3.Session, service: str, region: Optional[str] = None) -> Any:
+        with self._create_lock:
+            key: ClientKey = (self._creds_key(session), service, region)
+        with self._lock:
+            c = self._clients.get(key)
+            if c is not None:
+                self._clients.move_to_end(key)
+                self.reused += 1
+                return c
+        with self._create_lock:
+            with self._lock:
+                c = self._clients.get(key)  # built by another thread meanwhile
+                if c is not None:
+                    self.reused += 1
+                    return c
+            c = session.client(service, region_name=region, config=self.config)
+            for hook in self.hooks:
+                hook(c)
+            with self._lock:
+                self._clients[key] = c
+                self.created += 1
+                while len(self._clients) > self.max_size:
+                    self._clients.popitem(last=False)
+        return c
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'size': len(self._clients), 'created': self.created, 'reused': self.reused}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+POOL = ClientPool(hooks=[METRICS.install, CACHE.install, LIMITER.install])
+
+def client(session: boto3.Session, service: str, region: Optional[str] = None) -> Any:
+    """Pooled equivalent of `session.client(service, region_name=region, config=BOTO_CFG)`."""
+    return POOL.get(session, service, region)
@@ -1,13 +1,19 @@
 from __future__ import annotations
 from typing import Any, Dict, List, Optional, Tuple
-from botocore.exceptions import ClientError, EndpointConnectionError
-from botocore.config import Config as BotoConfig
 import boto3
 
-from ..graph import Graph
-from ..utils import safe_call, mk_id
+from ..graph import GraphBuffer
+from .clients import client
+from ..policy import public_statements
+from ..utils import backoff_call, fan_out, mk_id, paginate_all
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
+# (operation, result key) of every describe the graph is built from; all paginated
+DESCRIBES = (
+    ('describe_vpcs', 'Vpcs'), ('describe_subnets', 'Subnets'), ('describe_route_tables', 'RouteTables'),
+    ('describe_internet_gateways', 'InternetGateways'), ('describe_nat_gateways', 'NatGateways'),
+    ('describe_security_groups', 'SecurityGroups'), ('describe_network_interfaces', 'NetworkInterfaces'),
+    ('describe_instances', 'Reservations'), ('describe_vpc_endpoints', 'VpcEndpoints'),
+)
 
 def range_to_str(from_port, to_port, proto) -> str:
     if from_port is None and to_port is None: return "all"
@@ -29,23 +35,27 @@ def classify_target_type(target: Any) -> str:
     if s.startswith("i-"):   return "i"
     return "target"
 
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    ec2 = session.client('ec2', region_name=region, config=BOTO_CFG)
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    ec2 = client(session, 'ec2', region)
+    # the describes are independent: fetch them all at once, then build the graph from the complete results
+    results = fan_out(lambda d: backoff_call(paginate_all, ec2, *d), DESCRIBES, workers=len(DESCRIBES))
+    raw: Dict[str, List[Dict[str, Any]]] = {}
+    for (op, key), (items, err) in zip(DESCRIBES, results):
+        if err:
+            warnings.append(f"[{account_id}/{region}] {op}: {err}")
+            if op == 'describe_vpcs': return
+        raw[key] = items or []
 
     # VPCs
-    vpcs, err = safe_call(ec2.describe_vpcs)
-    if err: warnings.append(f"[{account_id}/{region}] describe_vpcs: {err}"); return
-    for v in vpcs.get('Vpcs', []):
+    for v in raw['Vpcs']:
         vid = v['VpcId']
-        g.add_node(mk_id("vpc", account_id, region, vid), f"VPC {vid}", "vpc", region, details={"cidr": v.get('CidrBlock')}, account_id=account_id)
+        g.add_node(mk_id("vpc", account_id, region, vid), f"VPC {vid}", "vpc", region, details={"cidr": v.get('CidrBlock'), "default": v.get('IsDefault')}, account_id=account_id)
 
     # Subnets
-    subnets, err = safe_call(ec2.describe_subnets)
-    if err: warnings.append(f"[{account_id}/{region}] describe_subnets: {err}"); subnets = {"Subnets": []}
-    for s in subnets.get('Subnets', []):
+    for s in raw['Subnets']:
         sid = s['SubnetId']; vid = s['VpcId']
         g.add_node(mk_id("subnet", account_id, region, sid), f"Subnet {sid}", "subnet", region,
-                   details={"cidr": s.get('CidrBlock'), "az": s.get('AvailabilityZone')},
+                   details={"cidr": s.get('CidrBlock'), "az": s.get('AvailabilityZone'), "public_on_launch": s.get('MapPublicIpOnLaunch')},
                    parent=mk_id("vpc", account_id, region, vid), account_id=account_id)
         g.add_edge(mk_id("edge", account_id, region, sid, vid),
                    mk_id("subnet", account_id, region, sid),
@@ -53,11 +63,10 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
                    "subnet-of", "attach", "resource")
 
     # Route tables
-    rts, err = safe_call(ec2.describe_route_tables)
-    if err: warnings.append(f"[{account_id}/{region}] describe_route_tables: {err}"); rts = {"RouteTables": []}
-    for rt in rts.get('RouteTables', []):
+    for rt in raw['RouteTables']:
         rtid = rt['RouteTableId']; vpcid = rt.get('VpcId')
-        g.add_node(mk_id("rtb", account_id, region, rtid), f"RTB {rtid}", "route_table", region,
+        main = any(a.get('Main') for a in rt.get('Associations', []) or [])
+        g.add_node(mk_id("rtb", account_id, region, rtid), f"RTB {rtid}", "route_table", region, details={"main": main},
                    parent=mk_id("vpc", account_id, region, vpcid) if vpcid else None, account_id=account_id)
         if vpcid:
             g.add_edge(mk_id("edge", account_id, region, rtid, vpcid),
@@ -82,14 +91,12 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
                 g.add_edge(mk_id("edge", account_id, region, rtid, target, str(dst)),
                            mk_id("rtb", account_id, region, rtid),
                            mk_id(ttype, account_id, region, target),
-                           f"route→{dst}", "route", "network", details={"destination": dst})
+                           f"route→{dst}", "route", "network", details={"destination": dst, "target_type": ttype, "state": r.get('State')})
 
     # IGW
-    igws, err = safe_call(ec2.describe_internet_gateways)
-    if err: warnings.append(f"[{account_id}/{region}] describe_internet_gateways: {err}"); igws = {"InternetGateways": []}
-    for igw in igws.get('InternetGateways', []):
+    for igw in raw['InternetGateways']:
         igwid = igw['InternetGatewayId']
-        g.add_node(mk_id("igw", account_id, region, igwid), igwid, "igw", region, account_id=account_id)
+        g.add_node(mk_id("igw", account_id, region, igwid), igwid, "igw", region, details={"attached": bool(igw.get('Attachments'))}, account_id=account_id)
         for att in igw.get('Attachments', []) or []:
             vpcid = att.get('VpcId')
             if vpcid:
@@ -99,9 +106,7 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
                            "attached", "attach", "resource")
 
     # NATGW
-    ngws, err = safe_call(ec2.describe_nat_gateways)
-    if err: warnings.append(f"[{account_id}/{region}] describe_nat_gateways: {err}"); ngws = {"NatGateways": []}
-    for nat in ngws.get('NatGateways', []):
+    for nat in raw['NatGateways']:
         natid = nat['NatGatewayId']; vpcid = nat.get('VpcId')
         g.add_node(mk_id("natgw", account_id, region, natid), natid, "nat_gateway", region,
                    details={"state": nat.get('State')}, parent=mk_id("vpc", account_id, region, vpcid) if vpcid else None, account_id=account_id)
@@ -113,31 +118,26 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
                        "in-subnet", "attach", "resource")
 
     # Security groups + rules (collapsed labels per peer)
-    sgs, err = safe_call(ec2.describe_security_groups)
-    if err: warnings.append(f"[{account_id}/{region}] describe_security_groups: {err}"); sgs = {"SecurityGroups": []}
-    for sg in sgs.get('SecurityGroups', []):
+    for sg in raw['SecurityGroups']:
         sgid = sg['GroupId']; vpcid = sg.get('VpcId')
         g.add_node(mk_id("sg", account_id, region, sgid), f"{sg.get('GroupName')} ({sgid})", "security_group", region,
-                   details={"desc": sg.get('Description'), "vpc": vpcid}, parent=mk_id("vpc", account_id, region, vpcid) if vpcid else None, account_id=account_id)
+                   details={"name": sg.get('GroupName'), "desc": sg.get('Description'), "vpc": vpcid}, parent=mk_id("vpc", account_id, region, vpcid) if vpcid else None, account_id=account_id)
 
     def collapse_rules(perms, direction: str, sgid: str):
         agg: Dict[str, Dict[str, set]] = {}
+        rules: Dict[str, List[Dict[str, Any]]] = {}  # peer -> structured rules, for reachability
         for perm in perms or []:
             proto = perm.get('IpProtocol', 'all')
             fport = perm.get('FromPort'); tport = perm.get('ToPort')
             prange = range_to_str(fport, tport, proto)
-            # CIDRs
-            for r in perm.get('IpRanges', []):
-                cidr = r.get('CidrIp')
-                if not cidr: continue
-                key = (proto, prange, cidr)
-                agg.setdefault(cidr, {}).setdefault(proto, set()).add(prange)
-            # SG refs
-            for up in perm.get('UserIdGroupPairs', []):
-                other = up.get('GroupId')
-                if not other: continue
-                key = (proto, prange, other)
-                agg.setdefault(other, {}).setdefault(proto, set()).add(prange)
+            rule = {"proto": proto, "from": fport, "to": tport}
+            peers = [r.get('CidrIp') for r in perm.get('IpRanges', [])]           # CIDRs
+            peers += [r.get('CidrIpv6') for r in perm.get('Ipv6Ranges', [])]
+            peers += [up.get('GroupId') for up in perm.get('UserIdGroupPairs', [])]  # SG refs
+            for peer in peers:
+                if not peer: continue
+                agg.setdefault(peer, {}).setdefault(proto, set()).add(prange)
+                rules.setdefault(peer, []).append(rule)
         # Emit collapsed edges
         for peer, protos in agg.items():
             label = "; ".join([f"{p}:{','.join(sorted(r))}" for p, r in protos.items()])
@@ -154,20 +154,19 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
                 warnings.append(f"[{account_id}/{region}] Unhandled peer type in SG rule: {peer}")
                 continue
             g.add_edge(mk_id("edge", account_id, region, src, tgt, direction),
-                       src_id, tgt_id, label, "sg-rule", "network")
+                       src_id, tgt_id, label, "sg-rule", "network", details={"direction": direction, "rules": rules[peer]})
 
-    for sg in sgs.get('SecurityGroups', []):
+    for sg in raw['SecurityGroups']:
         sgid = sg['GroupId']
         collapse_rules(sg.get('IpPermissions'), 'ingress', sgid)
         collapse_rules(sg.get('IpPermissionsEgress'), 'egress', sgid)
 
     # ENIs
-    enis, err = safe_call(ec2.describe_network_interfaces)
-    if err: warnings.append(f"[{account_id}/{region}] describe_network_interfaces: {err}"); enis = {"NetworkInterfaces": []}
-    for eni in enis.get('NetworkInterfaces', []):
+    for eni in raw['NetworkInterfaces']:
         enid = eni['NetworkInterfaceId']; vpcid = eni.get('VpcId'); sid = eni.get('SubnetId')
         parent = mk_id("subnet", account_id, region, sid) if sid else (mk_id("vpc", account_id, region, vpcid) if vpcid else None)
-        g.add_node(mk_id("eni", account_id, region, enid), enid, "eni", region, details={"private_ip": eni.get('PrivateIpAddress')}, parent=parent, account_id=account_id)
+        g.add_node(mk_id("eni", account_id, region, enid), enid, "eni", region,
+                   details={"private_ip": eni.get('PrivateIpAddress'), "public_ip": (eni.get('Association') or {}).get('PublicIp')}, parent=parent, account_id=account_id)
         if sid:
             g.add_edge(mk_id("edge", account_id, region, enid, sid), mk_id("eni", account_id, region, enid), mk_id("subnet", account_id, region, sid), "in-subnet", "attach", "resource")
         for sgid in [x['GroupId'] for x in eni.get('Groups', [])]:
@@ -178,32 +177,27 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
             g.add_edge(mk_id("edge", account_id, region, iid, enid), mk_id("i", account_id, region, iid), mk_id("eni", account_id, region, enid), "eni", "attach", "resource")
 
     # Instances
-    paginator = ec2.get_paginator('describe_instances')
-    try:
-        for page in paginator.paginate():
-            for res in page.get('Reservations', []):
-                for inst in res.get('Instances', []):
-                    iid = inst['InstanceId']; name = next((t['Value'] for t in inst.get('Tags', []) if t.get('Key') == 'Name'), iid)
-                    sid = inst.get('SubnetId'); vpcid = inst.get('VpcId')
-                    parent = mk_id("subnet", account_id, region, sid) if sid else (mk_id("vpc", account_id, region, vpcid) if vpcid else None)
-                    details = {
-                        "state": inst.get('State', {}).get('Name'),
-                        "public_ip": inst.get('PublicIpAddress')
-                    }
-                    g.add_node(mk_id("i", account_id, region, iid), name, "instance", region, details=details, parent=parent, account_id=account_id)
-                    if sid:
-                        g.add_edge(mk_id("edge", account_id, region, iid, sid), mk_id("i", account_id, region, iid), mk_id("subnet", account_id, region, sid), "in-subnet", "attach", "resource")
-                    for sg in inst.get('SecurityGroups', []) or []:
-                        g.add_edge(mk_id("edge", account_id, region, iid, sg['GroupId']), mk_id("i", account_id, region, iid), mk_id("sg", account_id, region, sg['GroupId']), "has-sg", "attach", "resource")
-    except ClientError as e:
-        warnings.append(f"[{account_id}/{region}] describe_instances: {e.response['Error'].get('Code')}")
+    for res in raw['Reservations']:
+        for inst in res.get('Instances', []):
+            iid = inst['InstanceId']; name = next((t['Value'] for t in inst.get('Tags', []) if t.get('Key') == 'Name'), iid)
+            sid = inst.get('SubnetId'); vpcid = inst.get('VpcId')
+            parent = mk_id("subnet", account_id, region, sid) if sid else (mk_id("vpc", account_id, region, vpcid) if vpcid else None)
+            details = {
+                "state": inst.get('State', {}).get('Name'),
+                "public_ip": inst.get('PublicIpAddress'),
+                "imds_tokens": (inst.get('MetadataOptions') or {}).get('HttpTokens'),
+                "instance_profile": (inst.get('IamInstanceProfile') or {}).get('Arn'),
+            }
+            g.add_node(mk_id("i", account_id, region, iid), name, "instance", region, details=details, parent=parent, account_id=account_id)
+            if sid:
+                g.add_edge(mk_id("edge", account_id, region, iid, sid), mk_id("i", account_id, region, iid), mk_id("subnet", account_id, region, sid), "in-subnet", "attach", "resource")
+            for sg in inst.get('SecurityGroups', []) or []:
+                g.add_edge(mk_id("edge", account_id, region, iid, sg['GroupId']), mk_id("i", account_id, region, iid), mk_id("sg", account_id, region, sg['GroupId']), "has-sg", "attach", "resource")
 
     # VPC Endpoints
-    vpces, err = safe_call(ec2.describe_vpc_endpoints)
-    if err: warnings.append(f"[{account_id}/{region}] describe_vpc_endpoints: {err}"); vpces = {"VpcEndpoints": []}
-    for vpce in vpces.get('VpcEndpoints', []):
+    for vpce in raw['VpcEndpoints']:
         vid = vpce['VpcEndpointId']; svc = vpce.get('ServiceName'); vpcid = vpce.get('VpcId')
-        g.add_node(mk_id("vpce", account_id, region, vid), vid, "vpc_endpoint", region, details={"service": svc, "type": vpce.get('VpcEndpointType')}, parent=mk_id("vpc", account_id, region, vpcid) if vpcid else None, account_id=account_id)
+        g.add_node(mk_id("vpce", account_id, region, vid), vid, "vpc_endpoint", region, details={"service": svc, "type": vpce.get('VpcEndpointType'), "public_policy": bool(public_statements(vpce.get('PolicyDocument') or {}))}, parent=mk_id("vpc", account_id, region, vpcid) if vpcid else None, account_id=account_id)
         if svc:
             g.add_node(mk_id("service", account_id, region, svc), svc, "aws_service", region, account_id=account_id)
             g.add_edge(mk_id("edge", account_id, region, vid, svc), mk_id("vpce", account_id, region, vid), mk_id("service", account_id, region, svc), "to-service", "bind", "resource")
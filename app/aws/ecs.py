@@ -1,15 +1,13 @@
 from __future__ import annotations
 from typing import List
-from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import boto3
-from ..graph import Graph
+from ..graph import GraphBuffer
+from .clients import client
 from ..utils import mk_id
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
-
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    ecs = session.client('ecs', region_name=region, config=BOTO_CFG)
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    ecs = client(session, 'ecs', region)
     try:
         clusters = ecs.list_clusters().get('clusterArns', []) or []
         for c in clusters:
@@ -1,27 +1,31 @@
 from __future__ import annotations
 from typing import List
-from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import boto3
-from ..graph import Graph
-
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
+from ..graph import GraphBuffer
+from .clients import client
 
 def mk_id(*parts: str) -> str:
     return ":".join([p for p in parts if p])
 
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    eks = session.client('eks', region_name=region, config=BOTO_CFG)
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    eks = client(session, 'eks', region)
     try:
         names = eks.list_clusters().get('clusters', []) or []
         for name in names:
             d = eks.describe_cluster(name=name)['cluster']
             vpcid = d.get('resourcesVpcConfig', {}).get('vpcId')
+            vpc_cfg = d.get('resourcesVpcConfig', {})
+            logging = [t for lc in (d.get('logging') or {}).get('clusterLogging', []) if lc.get('enabled') for t in lc.get('types', [])]
             g.add_node(
                 mk_id('eks', account_id, region, name),
                 name,
                 'eks_cluster',
                 region,
+                details={
+                    'version': d.get('version'), 'public_endpoint': vpc_cfg.get('endpointPublicAccess'),
+                    'public_cidrs': vpc_cfg.get('publicAccessCidrs'), 'secrets_encrypted': bool(d.get('encryptionConfig')), 'logging': logging,
+                },
                 parent=mk_id('vpc', account_id, region, vpcid) if vpcid else None,
                 account_id=account_id
             )
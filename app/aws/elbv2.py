@@ -1,50 +1,68 @@
 from __future__ import annotations
-from typing import List
-from botocore.config import Config as BotoConfig
-from botocore.exceptions import ClientError
+from typing import Any, Dict, List, Tuple
 import boto3
-from ..graph import Graph
-from ..utils import safe_call, mk_id
+from ..graph import GraphBuffer
+from .clients import client
+from ..utils import backoff_call, fan_out, mk_id, paginate_all
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
+TAG_BATCH = 20  # describe_tags accepts at most 20 ARNs per call
 
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    elb = session.client('elbv2', region_name=region, config=BOTO_CFG)
-    lbs, err = safe_call(elb.describe_load_balancers)
+def _tags(elb: Any, arns: List[str]) -> Tuple[Dict[str, Dict[str, str]], str | None]:
+    res, err = backoff_call(elb.describe_tags, ResourceArns=arns)
+    return {d['ResourceArn']: {t['Key']: t.get('Value', '') for t in d.get('Tags', []) or []} for d in (res or {}).get('TagDescriptions', []) or []}, err
+
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    elb = client(session, 'elbv2', region)
+    lbs, err = backoff_call(paginate_all, elb, 'describe_load_balancers', 'LoadBalancers')
     if err: warnings.append(f"[{account_id}/{region}] elbv2 describe_load_balancers: {err}"); return
-    for lb in lbs.get('LoadBalancers', []) or []:
+    if not lbs:
+        return
+    # one account-wide listing, mapped back to load balancers through LoadBalancerArns
+    tgs, err = backoff_call(paginate_all, elb, 'describe_target_groups', 'TargetGroups')
+    if err: warnings.append(f"[{account_id}/{region}] elbv2 describe_target_groups: {err}"); tgs = []
+    known = {lb['LoadBalancerArn'] for lb in lbs}
+    tgs = [tg for tg in tgs or [] if known.intersection(tg.get('LoadBalancerArns') or [])]
+    # per-LB listeners, per-TG health and tag batches are independent: fetch them all concurrently
+    listeners = fan_out(lambda lb: backoff_call(paginate_all, elb, 'describe_listeners', 'Listeners', LoadBalancerArn=lb['LoadBalancerArn']), lbs)
+    health = fan_out(lambda tg: backoff_call(elb.describe_target_health, TargetGroupArn=tg['TargetGroupArn']), tgs)
+    arns = [lb['LoadBalancerArn'] for lb in lbs]
+    tags: Dict[str, Dict[str, str]] = {}
+    for batch, err in fan_out(lambda i: _tags(elb, arns[i:i + TAG_BATCH]), range(0, len(arns), TAG_BATCH)):
+        if err: warnings.append(f"[{account_id}/{region}] elbv2 describe_tags: {err}")
+        tags.update(batch)
+
+    for lb, (lres, err) in zip(lbs, listeners):
         lbarn = lb['LoadBalancerArn']; name = lb['LoadBalancerName']; scheme = lb.get('Scheme'); lbtype = lb.get('Type')
         vpcid = lb.get('VpcId')
-        g.add_node(mk_id("lb", account_id, region, lbarn), f"{name} ({lbtype})", "load_balancer", region, details={"scheme": scheme, "dns": lb.get('DNSName')}, parent=mk_id("vpc", account_id, region, vpcid) if vpcid else None, account_id=account_id)
+        g.add_node(mk_id("lb", account_id, region, lbarn), f"{name} ({lbtype})", "load_balancer", region, details={"scheme": scheme, "dns": lb.get('DNSName'), "type": lbtype, "security_groups": len(lb.get('SecurityGroups') or []), "tags": tags.get(lbarn, {})}, parent=mk_id("vpc", account_id, region, vpcid) if vpcid else None, account_id=account_id)
         for az in lb.get('AvailabilityZones', []):
             sid = az.get('SubnetId')
             if sid:
-                g.add_edge(mk_id("edge", account_id, region, name, sid), mk_id("lb", account_id, region, lbarn), mk_id("subnet", account_id, region, sid), "in-subnet", "attach", "resource")
+                g.add_edge(mk_id("edge", account_id, region, lbarn, sid), mk_id("lb", account_id, region, lbarn), mk_id("subnet", account_id, region, sid), "in-subnet", "attach", "resource")
         for sgid in lb.get('SecurityGroups', []) or []:
-            g.add_edge(mk_id("edge", account_id, region, name, sgid), mk_id("lb", account_id, region, lbarn), mk_id("sg", account_id, region, sgid), "has-sg", "attach", "resource")
+            g.add_edge(mk_id("edge", account_id, region, lbarn, sgid), mk_id("lb", account_id, region, lbarn), mk_id("sg", account_id, region, sgid), "has-sg", "attach", "resource")
         # listeners
-        listeners, err = safe_call(elb.describe_listeners, LoadBalancerArn=lbarn)
-        if err: warnings.append(f"[{account_id}/{region}] elbv2 describe_listeners: {err}"); listeners = {"Listeners": []}
-        for lst in listeners.get('Listeners', []):
+        if err: warnings.append(f"[{account_id}/{region}] elbv2 describe_listeners: {err}")
+        for lst in lres or []:
             proto = lst.get('Protocol'); port = lst.get('Port')
             ext = mk_id("internet", account_id, region, "0.0.0.0/0") if scheme == "internet-facing" else mk_id("vpc", account_id, region, vpcid)
-            g.add_node(ext, "Internet" if scheme == "internet-facing" else f"VPC {vpcid}", "external", region, account_id=account_id)
-            g.add_edge(mk_id("edge", account_id, region, lbarn, str(port), str(proto)), ext, mk_id("lb", account_id, region, lbarn), f"{proto}:{port}", "listener", "network")
-        # target groups
-        tgs, err = safe_call(elb.describe_target_groups, LoadBalancerArn=lbarn)
-        if err: warnings.append(f"[{account_id}/{region}] elbv2 describe_target_groups: {err}"); tgs = {"TargetGroups": []}
-        for tg in tgs.get('TargetGroups', []) or []:
-            tgarn = tg['TargetGroupArn']
-            g.add_node(mk_id("tg", account_id, region, tgarn), tg.get('TargetGroupName', 'tg'), "target_group", region, details={"protocol": tg.get('Protocol'), "port": tg.get('Port')}, account_id=account_id)
-            g.add_edge(mk_id("edge", account_id, region, lbarn, tgarn), mk_id("lb", account_id, region, lbarn), mk_id("tg", account_id, region, tgarn), "lb→tg", "bind", "resource")
-            th, err = safe_call(elb.describe_target_health, TargetGroupArn=tgarn)
-            if err: warnings.append(f"[{account_id}/{region}] elbv2 describe_target_health: {err}"); th = {"TargetHealthDescriptions": []}
-            for d in th.get('TargetHealthDescriptions', []) or []:
-                t = d.get('Target', {}); tid = t.get('Id'); ttype = tg.get('TargetType')  # instance | ip | alb | lambda
-                if ttype == 'lambda':
-                    nid = mk_id("lambda", account_id, region, tid); g.add_node(nid, tid.split(":")[-1], "lambda", region, account_id=account_id)
-                elif ttype == 'instance':
-                    nid = mk_id("i", account_id, region, tid); g.add_node(nid, tid, "instance", region, account_id=account_id)
-                else:
-                    nid = mk_id(ttype or 'target', account_id, region, str(tid)); g.add_node(nid, str(tid), ttype or 'target', region, account_id=account_id)
-                g.add_edge(mk_id("edge", account_id, region, tgarn, str(tid)), mk_id("tg", account_id, region, tgarn), nid, f"{tg.get('Protocol')}:{tg.get('Port')}", "tg-target", "network")
+            g.add_node(ext, "Internet" if scheme == "internet-facing" else f"VPC {vpcid}", "external", region,
+                       details={"cidr": "0.0.0.0/0"} if scheme == "internet-facing" else None, account_id=account_id)
+            g.add_edge(mk_id("edge", account_id, region, lbarn, str(port), str(proto)), ext, mk_id("lb", account_id, region, lbarn), f"{proto}:{port}", "listener", "network", details={"protocol": proto, "port": port, "ssl_policy": lst.get('SslPolicy')})
+    # target groups
+    for tg, (th, err) in zip(tgs, health):
+        tgarn = tg['TargetGroupArn']
+        g.add_node(mk_id("tg", account_id, region, tgarn), tg.get('TargetGroupName', 'tg'), "target_group", region, details={"protocol": tg.get('Protocol'), "port": tg.get('Port')}, account_id=account_id)
+        for lbarn in tg.get('LoadBalancerArns') or []:
+            if lbarn in known:
+                g.add_edge(mk_id("edge", account_id, region, lbarn, tgarn), mk_id("lb", account_id, region, lbarn), mk_id("tg", account_id, region, tgarn), "lb→tg", "bind", "resource")
+        if err: warnings.append(f"[{account_id}/{region}] elbv2 describe_target_health: {err}")
+        for d in (th or {}).get('TargetHealthDescriptions', []) or []:
+            t = d.get('Target', {}); tid = t.get('Id'); ttype = tg.get('TargetType')  # instance | ip | alb | lambda
+            if ttype == 'lambda':
+                nid = mk_id("lambda", account_id, region, tid); g.add_node(nid, tid.split(":")[-1], "lambda", region, account_id=account_id)
+            elif ttype == 'instance':
+                nid = mk_id("i", account_id, region, tid); g.add_node(nid, tid, "instance", region, account_id=account_id)
+            else:
+                nid = mk_id(ttype or 'target', account_id, region, str(tid)); g.add_node(nid, str(tid), ttype or 'target', region, account_id=account_id)
+            g.add_edge(mk_id("edge", account_id, region, tgarn, str(tid)), mk_id("tg", account_id, region, tgarn), nid, f"{tg.get('Protocol')}:{tg.get('Port')}", "tg-target", "network")
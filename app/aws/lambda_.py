@@ -1,17 +1,61 @@
 from __future__ import annotations
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 from botocore.exceptions import ClientError
-from botocore.config import Config as BotoConfig
 import boto3
 import json
-from ..graph import Graph
-from ..policy import summarize_policy
-from ..utils import safe_call, mk_id
+from ..graph import GraphBuffer, Node
+from .clients import client
+from ..policy import public_statements, summarize_policy
+from ..utils import THROTTLE_CODES, backoff_call, detail_mode, fan_out, mk_id
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
+def fingerprint(session: boto3.Session, account_id: str, region: str) -> List[Tuple[str, str]]:
+    """Cheap change signal for incremental scans: each function's RevisionId (bumped by code, config and policy updates)."""
+    lam = client(session, 'lambda', region)
+    out = []
+    for page in lam.get_paginator('list_functions').paginate():
+        for fn in page.get('Functions', []) or []:
+            out.append((fn['FunctionArn'], fn.get('RevisionId') or fn.get('LastModified') or ''))
+    return sorted(out)
 
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    lam = session.client('lambda', region_name=region, config=BOTO_CFG)
+NOT_FOUND = 'ResourceNotFoundException'  # no invoke config / no policy: an answer, not a failure
+
+Details = Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], List[Tuple[str, str]]]
+
+def _fetch_details(lam: Any, arn: str) -> Details:
+    """(event invoke config, policy, failed calls as (operation, error)) of one function; missing config / policy is not an error."""
+    ev, err = backoff_call(lam.get_function_event_invoke_config, FunctionName=arn)
+    pol, err2 = backoff_call(lam.get_policy, FunctionName=arn)
+    failed = [(op, e) for op, e in (('get_function_event_invoke_config', err), ('get_policy', err2)) if e and e != NOT_FOUND]
+    return (None if err else ev), (None if err2 else pol), failed
+
+def _add_details(g: GraphBuffer, account_id: str, region: str, arn: str, name: str, ev: Optional[Dict[str, Any]], pol: Optional[Dict[str, Any]]) -> None:
+    # Destinations (on success/failure)
+    if ev:
+        dests = ev.get('DestinationConfig', {})
+        for outcome in ('OnSuccess', 'OnFailure'):
+            arn2 = dests.get(outcome, {}).get('Destination')
+            if arn2:
+                g.add_node(mk_id('dest', account_id, region, arn2), arn2.split(':')[-1], 'destination', region, account_id=account_id)
+                g.add_edge(mk_id('edge', account_id, region, arn, outcome, arn2),
+                           mk_id('lambda', account_id, region, arn),
+                           mk_id('dest', account_id, region, arn2),
+                           f'{outcome.lower()} →', 'invoke', 'data')
+    # Resource policy
+    if pol and pol.get('Policy'):
+        policy_doc = json.loads(pol['Policy'])
+        summary = summarize_policy(policy_doc)
+        g.add_node(
+            mk_id('lambda', account_id, region, arn),
+            name,
+            'lambda',
+            region,
+            details={'policy_summary': summary, 'policy': policy_doc, 'public_policy': bool(public_statements(policy_doc))}
+        )
+
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    lam = client(session, 'lambda', region)
+    mode = detail_mode.get()
+    fns: List[Tuple[str, str]] = []
     try:
         paginator = lam.get_paginator('list_functions')
         for page in paginator.paginate():
@@ -19,36 +63,38 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
                 arn = fn['FunctionArn']; name = fn['FunctionName']
                 vpcid = fn.get('VpcConfig', {}).get('VpcId')
                 parent = mk_id('vpc', account_id, region, vpcid) if vpcid else None
-                g.add_node(mk_id('lambda', account_id, region, arn), name, 'lambda', region, details={'runtime': fn.get('Runtime')}, parent=parent, account_id=account_id)
+                details = {'arn': arn, 'runtime': fn.get('Runtime'), 'tracing': (fn.get('TracingConfig') or {}).get('Mode'), 'dlq': bool((fn.get('DeadLetterConfig') or {}).get('TargetArn'))}
+                if mode == 'lazy':
+                    details['lazy_details'] = True  # destinations / policy via GET /details
+                g.add_node(mk_id('lambda', account_id, region, arn), name, 'lambda', region, details=details, parent=parent, account_id=account_id)
                 # VPC
                 for sid in fn.get('VpcConfig', {}).get('SubnetIds', []) or []:
                     g.add_edge(mk_id('edge', account_id, region, arn, sid), mk_id('lambda', account_id, region, arn), mk_id('subnet', account_id, region, sid), 'in-subnet', 'attach', 'resource')
                 for sgid in fn.get('VpcConfig', {}).get('SecurityGroupIds', []) or []:
                     g.add_edge(mk_id('edge', account_id, region, arn, sgid), mk_id('lambda', account_id, region, arn), mk_id('sg', account_id, region, sgid), 'has-sg', 'attach', 'resource')
-                # Destinations (on success/failure)
-                ev, err = safe_call(lam.get_function_event_invoke_config, FunctionName=arn)
-                if not err and ev:
-                    dests = ev.get('DestinationConfig', {})
-                    for outcome in ('OnSuccess', 'OnFailure'):
-                        arn2 = dests.get(outcome, {}).get('Destination')
-                        if arn2:
-                            g.add_node(mk_id('dest', account_id, region, arn2), arn2.split(':')[-1], 'destination', region, account_id=account_id)
-                            g.add_edge(mk_id('edge', account_id, region, arn, outcome, arn2),
-                                       mk_id('lambda', account_id, region, arn),
-                                       mk_id('dest', account_id, region, arn2),
-                                       f'{outcome.lower()} →', 'invoke', 'data')
-                # Resource policy
-                pol, err = safe_call(lam.get_policy, FunctionName=arn)
-                if not err and pol and pol.get('Policy'):
-                    policy_doc = json.loads(pol['Policy'])
-                    summary = summarize_policy(policy_doc)
-                    g.add_node(
-                        mk_id('lambda', account_id, region, arn),
-                        name,
-                        'lambda',
-                        region,
-                        details={'policy_summary': summary, 'policy': policy_doc}
-                    )
-
+                fns.append((arn, name))
     except ClientError as e:
         warnings.append(f"[{account_id}/{region}] lambda list_functions: {e.response['Error'].get('Code')}")
+    if mode != 'eager':
+        return
+    # two calls per function: run them on a bounded sub-pool, results merged here in list order
+    for (arn, name), (ev, pol, failed) in zip(fns, fan_out(lambda f: _fetch_details(lam, f[0]), fns)):
+        _add_details(g, account_id, region, arn, name, ev, pol)
+        for op, err in failed:
+            if err in THROTTLE_CODES:
+                warnings.append(f"[{account_id}/{region}] lambda {op} for {name}: throttled")
+
+def details(session: boto3.Session, account_id: str, region: str, node: Node, g: GraphBuffer, warnings: List[str]) -> None:
+    """
+    Destinations and policy of one function, for nodes enumerated with lazy details. The node
+    stays `lazy_details` (so the client asks again) unless both calls answered.
+    """
+    arn = node.details.get('arn')
+    if not arn:
+        return
+    ev, pol, failed = _fetch_details(client(session, 'lambda', region), arn)
+    _add_details(g, account_id, region, arn, node.label, ev, pol)
+    if not failed:
+        g.add_node(node.id, node.label, node.type, region, details={'lazy_details': False})
+    for op, err in failed:
+        warnings.append(f"[{account_id}/{region}] lambda {op} for {node.label}: {'throttled' if err in THROTTLE_CODES else err}")
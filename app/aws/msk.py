@@ -1,19 +1,22 @@
 from __future__ import annotations
 from typing import List
-from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import boto3
-from ..graph import Graph
+from ..graph import GraphBuffer
+from .clients import client
 from ..utils import mk_id
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
-
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    msk = session.client('kafka', region_name=region, config=BOTO_CFG)
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    msk = client(session, 'kafka', region)
     try:
         clusters = msk.list_clusters().get('ClusterInfoList', []) or []
         for c in clusters:
             arn = c['ClusterArn']
-            g.add_node(mk_id('msk', account_id, region, arn), c.get('ClusterName', arn), 'msk_cluster', region, account_id=account_id)
+            enc = c.get('EncryptionInfo', {}).get('EncryptionInTransit', {})
+            g.add_node(mk_id('msk', account_id, region, arn), c.get('ClusterName', arn), 'msk_cluster', region, details={
+                'client_broker': enc.get('ClientBroker'), 'in_cluster': enc.get('InCluster'),
+                'public_access': c.get('BrokerNodeGroupInfo', {}).get('ConnectivityInfo', {}).get('PublicAccess', {}).get('Type'),
+                'unauthenticated': c.get('ClientAuthentication', {}).get('Unauthenticated', {}).get('Enabled'),
+            }, account_id=account_id)
     except ClientError as e:
         warnings.append(f"[{account_id}/{region}] msk list_clusters: {e.response['Error'].get('Code')}");
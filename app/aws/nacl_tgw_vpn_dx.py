@@ -1,20 +1,30 @@
 from __future__ import annotations
 from typing import List
-from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import boto3
-from ..graph import Graph
+from ..graph import GraphBuffer
+from .clients import client
 from ..utils import mk_id
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
-
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    ec2 = session.client('ec2', region_name=region, config=BOTO_CFG)
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    ec2 = client(session, 'ec2', region)
     try:
         nacls = ec2.describe_network_acls().get('NetworkAcls', []) or []
         for a in nacls:
             aid = a['NetworkAclId']; vpcid = a.get('VpcId')
-            g.add_node(mk_id('nacl', account_id, region, aid), aid, 'nacl', region, account_id=account_id, parent=mk_id('vpc', account_id, region, vpcid) if vpcid else None)
+            # rule table, evaluated in bulk by app.acl: first matching entry by rule number decides
+            entries = [{
+                'rule': x.get('RuleNumber'), 'egress': bool(x.get('Egress')), 'proto': x.get('Protocol'),
+                'from': (x.get('PortRange') or {}).get('From'), 'to': (x.get('PortRange') or {}).get('To'),
+                'cidr': x.get('CidrBlock') or x.get('Ipv6CidrBlock'), 'action': x.get('RuleAction'),
+            } for x in a.get('Entries') or []]
+            g.add_node(mk_id('nacl', account_id, region, aid), aid, 'nacl', region, details={'default': a.get('IsDefault'), 'entries': entries},
+                       account_id=account_id, parent=mk_id('vpc', account_id, region, vpcid) if vpcid else None)
+            for assoc in a.get('Associations') or []:
+                if assoc.get('SubnetId'):
+                    sid = assoc['SubnetId']
+                    g.add_edge(mk_id('edge', account_id, region, sid, aid), mk_id('subnet', account_id, region, sid),
+                               mk_id('nacl', account_id, region, aid), 'nacl', 'assoc', 'resource')
     except ClientError as e:
         warnings.append(f"[{account_id}/{region}] ec2 describe_network_acls: {e.response['Error'].get('Code')}");
     # TGW
@@ -22,7 +32,7 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
         tgws = ec2.describe_transit_gateways().get('TransitGateways', []) or []
         for t in tgws:
             tid = t['TransitGatewayId']
-            g.add_node(mk_id('tgw', account_id, region, tid), tid, 'tgw', region, account_id=account_id)
+            g.add_node(mk_id('tgw', account_id, region, tid), tid, 'tgw', region, details={'auto_accept': t.get('Options', {}).get('AutoAcceptSharedAttachments')}, account_id=account_id)
     except ClientError as e:
         warnings.append(f"[{account_id}/{region}] ec2 describe_transit_gateways: {e.response['Error'].get('Code')}");
     # Peering
@@ -30,6 +40,12 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
         pcx = ec2.describe_vpc_peering_connections().get('VpcPeeringConnections', []) or []
         for p in pcx:
             pid = p['VpcPeeringConnectionId']
-            g.add_node(mk_id('pcx', account_id, region, pid), pid, 'pcx', region, account_id=account_id)
+            owners = {(p.get(side) or {}).get('OwnerId') for side in ('AccepterVpcInfo', 'RequesterVpcInfo')}
+            details = {'status': p.get('Status', {}).get('Code'), 'cross_account': len(owners - {None}) > 1}
+            for side, info in (('requester', p.get('RequesterVpcInfo') or {}), ('accepter', p.get('AccepterVpcInfo') or {})):
+                # both sides' address space, for peering conflict checks (see app.cidr)
+                cidrs = [c.get('CidrBlock') for c in info.get('CidrBlockSet') or []] or [info.get('CidrBlock')]
+                details[side] = {'vpc': info.get('VpcId'), 'owner': info.get('OwnerId'), 'region': info.get('Region'), 'cidrs': [c for c in cidrs if c]}
+            g.add_node(mk_id('pcx', account_id, region, pid), pid, 'pcx', region, details=details, account_id=account_id)
     except ClientError as e:
         warnings.append(f"[{account_id}/{region}] ec2 describe_vpc_peering_connections: {e.response['Error'].get('Code')}");
@@ -0,0 +1,125 @@
+from __future__ import annotations
+from typing import Any, Dict, Optional, Tuple
+import os
+import re
+import threading
+import time
+
+from ..scheduler import current_task
+from ..utils import THROTTLE_CODES
+
+RATE_LIMIT_START = float(os.environ.get('RATE_LIMIT_START', '20'))  # requests/s of a fresh bucket
+RATE_LIMIT_MIN = float(os.environ.get('RATE_LIMIT_MIN', '0.5'))
+RATE_LIMIT_MAX = float(os.environ.get('RATE_LIMIT_MAX', '100'))  # 0 disables the limiter
+COOLDOWN = 1.0  # seconds between two rate cuts, so a burst of in-flight throttles counts once
+
+_READ_OP = re.compile(r'^(Describe|List|Get|Search)')
+
+# (account, region, API family)
+BucketKey = Tuple[str, str, str]
+
+def family(service: str, operation: str) -> str:
+    """API family sharing one AWS rate limit: reads and mutations of a service are throttled apart."""
+    return f"{service}:{'read' if _READ_OP.match(operation) else 'write'}"
+
+class TokenBucket:
+    __slots__ = ('rate', 'tokens', 'stamp', 'cut', 'calls', 'throttles', 'waited')
+
+    def __init__(self, rate: float, now: float) -> None:
+        self.rate = rate
+        self.tokens = rate
+        self.stamp = now
+        self.cut = 0.0
+        self.calls = 0
+        self.throttles = 0
+        self.waited = 0.0
+
+class RateLimiter:
+    """
+    Client-side token buckets shared by every client and thread, keyed by (account, region, API family).
+
+    Each HTTP attempt takes a token before it is sent (cache hits never reach the wire, so
+    they are free). The rate adapts AIMD-style: a throttling response halves it (at most
+    once per COOLDOWN), every other response adds 1/rate, i.e. about one request/s per second.
+    Buckets hold at most one second of tokens, so bursts stay within what AWS refills.
+    """
+    def __init__(self, start: float = RATE_LIMIT_START, floor: float = RATE_LIMIT_MIN, ceiling: float = RATE_LIMIT_MAX) -> None:
+        self.enabled = ceiling > 0
+        self.start = min(start, ceiling) if self.enabled else start
+        self.floor = floor
+        self.ceiling = ceiling
+        self._buckets: Dict[BucketKey, TokenBucket] = {}
+        self._lock = threading.Lock()
+
+    def _bucket(self, key: BucketKey, now: float) -> TokenBucket:
+        b = self._buckets.get(key)
+        if b is None:
+            b = self._buckets[key] = TokenBucket(self.start, now)
+        return b
+
+    def acquire(self, key: BucketKey) -> float:
+        """Take one token, sleeping until it is available; returns the seconds waited."""
+        with self._lock:
+            now = time.monotonic()
+            b = self._bucket(key, now)
+            b.tokens = min(max(b.rate, 1.0), b.tokens + (now - b.stamp) * b.rate)
+            b.stamp = now
+            b.tokens -= 1  # reserve even when short: waiters queue up behind each other
+            b.calls += 1
+            wait = -b.tokens / b.rate if b.tokens < 0 else 0.0
+            b.waited += wait
+        if wait:
+            time.sleep(wait)
+        return wait
+
+    def observe(self, key: BucketKey, throttled: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            b = self._bucket(key, now)
+            if throttled:
+                b.throttles += 1
+                if now - b.cut >= COOLDOWN:
+                    b.rate = max(self.floor, b.rate / 2)
+                    b.tokens = min(b.tokens, 0.0)
+                    b.cut = now
+            else:
+                b.rate = min(self.ceiling, b.rate + 1 / b.rate)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = {
+                '/'.join(k): {'rate': round(b.rate, 2), 'calls': b.calls, 'throttles': b.throttles, 'waited': round(b.waited, 3)}
+                for k, b in self._buckets.items()
+            }
+        return {'enabled': self.enabled, 'throttles': sum(b['throttles'] for b in buckets.values()), 'buckets': buckets}
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    # --- botocore event handlers -------------------------------------------------
+
+    def install(self, client: Any) -> None:
+        if not self.enabled:
+            return
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name or 'global'
+        events = client.meta.events
+        events.register('before-send', lambda event_name, **kw: self._before_send(service, region, event_name))
+        events.register('needs-retry', lambda response, operation, caught_exception, **kw: self._after_attempt(service, region, operation.name, response))
+
+    @staticmethod
+    def _key(service: str, region: str, operation: str) -> BucketKey:
+        task = current_task.get()
+        return (task[0] if task else '', region, family(service, operation))
+
+    def _before_send(self, service: str, region: str, event_name: str) -> None:
+        self.acquire(self._key(service, region, event_name.rsplit('.', 1)[-1]))
+
+    def _after_attempt(self, service: str, region: str, operation: str, response: Optional[Tuple[Any, Dict[str, Any]]]) -> None:
+        if response is None:  # connection error: says nothing about the rate
+            return
+        code = (response[1] or {}).get('Error', {}).get('Code')
+        self.observe(self._key(service, region, operation), code in THROTTLE_CODES)
+
+LIMITER = RateLimiter()
@@ -1,15 +1,13 @@
 from __future__ import annotations
 from typing import List
-from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import boto3
-from ..graph import Graph
+from ..graph import GraphBuffer
+from .clients import client
 from ..utils import mk_id
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
-
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    rds = session.client('rds', region_name=region, config=BOTO_CFG)
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    rds = client(session, 'rds', region)
     try:
         paginator = rds.get_paginator('describe_db_instances')
         for page in paginator.paginate():
@@ -17,6 +15,19 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
                 arn = db.get('DBInstanceArn') or db['DBInstanceIdentifier']
                 name = db['DBInstanceIdentifier']
                 vpcid = db.get('DBSubnetGroup', {}).get('VpcId')
-                g.add_node(mk_id('rds', account_id, region, arn), name, 'rds_instance', region, details={'engine': db.get('Engine'), 'PubliclyAccessible': db.get('PubliclyAccessible')}, parent=mk_id('vpc', account_id, region, vpcid) if vpcid else None, account_id=account_id)
+                g.add_node(mk_id('rds', account_id, region, arn), name, 'rds_instance', region, details={
+                    'engine': db.get('Engine'), 'PubliclyAccessible': db.get('PubliclyAccessible'), 'encrypted': db.get('StorageEncrypted'),
+                    'multi_az': db.get('MultiAZ'), 'backup_retention': db.get('BackupRetentionPeriod'), 'deletion_protection': db.get('DeletionProtection'),
+                    'iam_auth': db.get('IAMDatabaseAuthenticationEnabled'), 'minor_upgrade': db.get('AutoMinorVersionUpgrade'),
+                }, parent=mk_id('vpc', account_id, region, vpcid) if vpcid else None, account_id=account_id)
+                rid = mk_id('rds', account_id, region, arn)
+                for sn in db.get('DBSubnetGroup', {}).get('Subnets', []) or []:
+                    sid = sn.get('SubnetIdentifier')
+                    if sid:
+                        g.add_edge(mk_id('edge', rid, sid), rid, mk_id('subnet', account_id, region, sid), 'in-subnet', 'attach', 'resource')
+                for sg in db.get('VpcSecurityGroups', []) or []:
+                    sgid = sg.get('VpcSecurityGroupId')
+                    if sgid:
+                        g.add_edge(mk_id('edge', rid, sgid), rid, mk_id('sg', account_id, region, sgid), 'has-sg', 'attach', 'resource')
     except ClientError as e:
         warnings.append(f"[{account_id}/{region}] rds describe_db_instances: {e.response['Error'].get('Code')}");
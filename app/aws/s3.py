@@ -1,25 +1,45 @@
 from __future__ import annotations
-from typing import List
-from botocore.config import Config as BotoConfig
-from botocore.exceptions import ClientError
+from typing import Dict, List, Tuple
 import boto3
-from ..graph import Graph
-from ..utils import mk_id
+from ..graph import GraphBuffer
+from .cache import CACHE
+from .clients import client
+from ..utils import backoff_call, fan_out, mk_id, paginate_all
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
+# LocationConstraint values that predate region names
+LEGACY_LOCATIONS = {'': 'us-east-1', 'EU': 'eu-west-1'}
 
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    s3 = session.client('s3', config=BOTO_CFG)
-    try:
-        res = s3.list_buckets()
-    except ClientError as e:
-        warnings.append(f"[{account_id}/global] s3 list_buckets: {e.response['Error'].get('Code')}"); return
-    for b in res.get('Buckets', []) or []:
+def fingerprint(session: boto3.Session, account_id: str, region: str) -> List[Tuple[str, str]]:
+    """Cheap change signal for incremental scans: bucket names and creation dates (a bucket's region never changes)."""
+    res = client(session, 's3').list_buckets()
+    return sorted((b['Name'], str(b.get('CreationDate'))) for b in res.get('Buckets', []) or [])
+
+def _location(s3, name: str) -> Tuple[str | None, str | None]:
+    res, err = backoff_call(s3.get_bucket_location, Bucket=name)
+    if err:
+        return None, err
+    loc = res.get('LocationConstraint') or ''
+    return LEGACY_LOCATIONS.get(loc, loc), None
+
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    s3 = client(session, 's3')
+    buckets, err = backoff_call(paginate_all, s3, 'list_buckets', 'Buckets')
+    if err:
+        warnings.append(f"[{account_id}/global] s3 list_buckets: {err}"); return
+    # a bucket keeps its region for life; name + creation date tells a recreated bucket apart
+    keys = {b['Name']: f"{b['Name']}@{b.get('CreationDate')}" for b in buckets}
+    learned: Dict[str, str] = {b['Name']: b['BucketRegion'] for b in buckets if b.get('BucketRegion')}  # newer list_buckets responses
+    known = CACHE.get_facts('s3_bucket_region', keys.values())
+    regions = {n: known[k] for n, k in keys.items() if k in known}
+    missing = [n for n in keys if n not in learned and n not in regions]
+    for name, (loc, err) in zip(missing, fan_out(lambda n: _location(s3, n), missing)):
+        if err:
+            warnings.append(f"[{account_id}/global] s3 get_bucket_location for bucket {name}: {err}")
+        else:
+            learned[name] = loc
+    CACHE.put_facts('s3_bucket_region', {keys[n]: loc for n, loc in learned.items() if keys[n] not in known})
+    regions.update(learned)
+    for b in buckets:
         name = b['Name']
-        loc = 'us-east-1'
-        try:
-            lr = s3.get_bucket_location(Bucket=name)
-            loc = lr.get('LocationConstraint') or 'us-east-1'
-        except ClientError as e:
-            warnings.append(f"[{account_id}/global] s3 get_bucket_location for bucket {name}: {e.response['Error'].get('Code')}")
+        loc = regions.get(name, 'us-east-1')
         g.add_node(mk_id('s3', account_id, loc, name), name, 's3_bucket', loc, account_id=account_id)
@@ -1,10 +1,9 @@
 from __future__ import annotations
 from typing import Dict, Any, List, Optional
 import boto3
-from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
+from .clients import client
 
 def build_root_session(ak: Optional[str], sk: Optional[str], st: Optional[str], profile: Optional[str]) -> boto3.Session:
     if profile:
@@ -17,7 +16,7 @@ def assume_roles(root: boto3.Session, role_arns: List[str]) -> Dict[str, boto3.S
     out = { 'self': root }
     if not role_arns:
         return out
-    sts = root.client('sts', config=BOTO_CFG)
+    sts = client(root, 'sts')
     for i, arn in enumerate(role_arns, start=1):
         try:
             resp = sts.assume_role(RoleArn=arn, RoleSessionName=f'topology-session-{i}')
@@ -34,7 +33,7 @@ def assume_roles(root: boto3.Session, role_arns: List[str]) -> Dict[str, boto3.S
 
 def discover_regions(sess: boto3.Session) -> List[str]:
     try:
-        ec2 = sess.client('ec2', region_name='us-east-1', config=BOTO_CFG)
+        ec2 = client(sess, 'ec2', 'us-east-1')
         data = ec2.describe_regions(AllRegions=False)
         return [r['RegionName'] for r in data.get('Regions', [])]
     except Exception:
@@ -1,15 +1,13 @@
 from __future__ import annotations
 from typing import List
-from botocore.config import Config as BotoConfig
 from botocore.exceptions import ClientError
 import boto3
-from ..graph import Graph
+from ..graph import GraphBuffer
+from .clients import client
 from ..utils import mk_id
 
-BOTO_CFG = BotoConfig(retries={'max_attempts': 8, 'mode': 'adaptive'}, read_timeout=25, connect_timeout=10)
-
-def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, warnings: List[str]) -> None:
-    sns = session.client('sns', region_name=region, config=BOTO_CFG)
+def enumerate(session: boto3.Session, account_id: str, region: str, g: GraphBuffer, warnings: List[str]) -> None:
+    sns = client(session, 'sns', region)
     try:
         tps = sns.list_topics().get('Topics', [])
         for t in tps:
@@ -17,7 +15,7 @@ def enumerate(session: boto3.Session, account_id: str, region: str, g: Graph, wa
             g.add_node(mk_id('sns', account_id, region, arn), arn.split(':')[-1], 'sns_topic', region, account_id=account_id)
     except ClientError as e:
         warnings.append(f"[{account_id}/{region}] sns list_topics: {e.response['Error'].get('Code')}");
-    sqs = session.client('sqs', region_name=region, config=BOTO_CFG)
+    sqs = client(session, 'sqs', region)
     try:
         queues = sqs.list_queues().get('QueueUrls', []) or []
         for q in queues:
@@ -0,0 +1,216 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from functools import lru_cache
+import ipaddress
+
+import numpy as np
+
+from .graph import Edge, Graph
+
+if TYPE_CHECKING:
+    from .snapshots import Snapshot
+
+Net = Union[ipaddress.IPv4Network, ipaddress.IPv6Network]
+
+KINDS = ('route', 'sg-rule', 'subnet', 'vpc')
+MAX_PAIRS = 1000  # overlap / conflict results; `truncated` is set beyond that
+_LO = (1 << 64) - 1
+
+@lru_cache(maxsize=65536)
+def parse(cidr: Any) -> Optional[Net]:
+    """A CIDR or address as a network (an address is a /32 or /128), or None."""
+    try:
+        return ipaddress.ip_network(str(cidr).strip(), strict=False)
+    except ValueError:
+        return None
+
+def _split(net: Net, plen: int) -> Tuple[int, int]:
+    """First address of `net` cut to `plen` bits, as (high, low) 64-bit halves."""
+    host = net.max_prefixlen - plen
+    start = int(net.network_address) >> host << host
+    return start >> 64, start & _LO
+
+class CidrIndex:
+    """
+    Every CIDR of a snapshot (route destinations, SG rule peers, subnet and VPC blocks) in
+    flat NumPy arrays, grouped by IP version and prefix length and sorted by network address.
+
+    Prefixes never partially overlap: two CIDRs overlap exactly when one contains the other.
+    So the entries covering an address or CIDR are found with one binary search per prefix
+    length in use (at most 33 for IPv4), instead of a scan over all CIDRs.
+    """
+    def __init__(self, g: Graph) -> None:
+        self.g = g
+        self.nets: List[Net] = []
+        self.kinds: List[str] = []
+        self.ids: List[str] = []      # element the CIDR belongs to (route / sg-rule edge, subnet / vpc node)
+        self.owners: List[str] = []   # route table, security group, VPC
+        self.accounts: List[str] = []
+        self._node_net: Dict[str, Net] = {}  # cidr node id -> network
+        for n in g.nodes('cidr'):
+            net = parse(n.label)
+            if net is not None:
+                self._node_net[n.id] = net
+        for e in g.edges('route'):
+            self._add(e.details.get('destination'), 'route', e.id, e.source, e)
+        for e in g.edges('sg-rule'):
+            ingress = e.details.get('direction') == 'ingress'
+            peer, sg = (e.source, e.target) if ingress else (e.target, e.source)
+            if peer in self._node_net:
+                self._add(self._node_net[peer], 'sg-rule', e.id, sg, e)
+        for kind in ('subnet', 'vpc'):
+            for n in g.nodes(kind):
+                self._add(n.details.get('cidr'), kind, n.id, n.parent if kind == 'subnet' else n.id, None, n.account_id)
+        self._build()
+
+    def _add(self, cidr: Any, kind: str, id_: str, owner: Optional[str], e: Optional[Edge], account: str = '') -> None:
+        net = cidr if isinstance(cidr, (ipaddress.IPv4Network, ipaddress.IPv6Network)) else parse(cidr) if cidr else None
+        if net is None:
+            return
+        if e is not None:
+            o = self.g.node(owner) if owner else None
+            account = o.account_id if o is not None else ''
+        self.nets.append(net); self.kinds.append(kind); self.ids.append(id_)
+        self.owners.append(owner or ''); self.accounts.append(account)
+
+    def _build(self) -> None:
+        n = len(self.nets)
+        ver = np.fromiter((x.version for x in self.nets), dtype=np.int64, count=n)
+        plen = np.fromiter((x.prefixlen for x in self.nets), dtype=np.int64, count=n)
+        starts = [int(x.network_address) for x in self.nets]
+        hi = np.fromiter((s >> 64 for s in starts), dtype=np.uint64, count=n)
+        lo = np.fromiter((s & _LO for s in starts), dtype=np.uint64, count=n)
+        self._kind = np.fromiter((KINDS.index(k) for k in self.kinds), dtype=np.int64, count=n)
+        order = np.lexsort((lo, hi, plen, ver))
+        # (version, prefix length) -> (high halves, low halves, entry numbers), sorted by address
+        self._groups: Dict[Tuple[int, int], Tuple[np.ndarray, np.ndarray, np.ndarray]] = {}
+        if n:
+            key = ver[order] * 256 + plen[order]
+            cuts = np.flatnonzero(np.diff(key)) + 1
+            for part in np.split(order, cuts):
+                self._groups[(int(ver[part[0]]), int(plen[part[0]]))] = (hi[part], lo[part], part)
+
+    def __len__(self) -> int:
+        return len(self.nets)
+
+    def node_net(self, node_id: str) -> Optional[Net]:
+        """The network of a `cidr` node."""
+        return self._node_net.get(node_id)
+
+    def cover_ids(self, net: Net, kinds: Optional[Iterable[str]] = None) -> np.ndarray:
+        """Entry numbers of CIDRs containing all of `net` (itself included), most specific first."""
+        out = []
+        for plen in range(net.prefixlen, -1, -1):
+            group = self._groups.get((net.version, plen))
+            if group is None:
+                continue
+            hi, lo, idx = group
+            h, l = (np.uint64(x) for x in _split(net, plen))
+            i, j = np.searchsorted(hi, h, 'left'), np.searchsorted(hi, h, 'right')
+            if i == j:
+                continue
+            a, b = np.searchsorted(lo[i:j], l, 'left'), np.searchsorted(lo[i:j], l, 'right')
+            if a < b:
+                out.append(idx[i + a:i + b])
+        ids = np.concatenate(out) if out else np.zeros(0, dtype=np.int64)
+        if kinds is not None:
+            ids = ids[np.isin(self._kind[ids], [KINDS.index(k) for k in kinds])]
+        return ids
+
+    def entry(self, i: int) -> Dict[str, Any]:
+        return {'kind': self.kinds[i], 'cidr': str(self.nets[i]), 'id': self.ids[i], 'owner': self.owners[i], 'account_id': self.accounts[i]}
+
+    def covering(self, query: str, kinds: Optional[Iterable[str]] = None) -> Optional[List[Dict[str, Any]]]:
+        """Routes, SG rules, subnets and VPCs whose CIDR contains the address or CIDR `query`; None if it does not parse."""
+        net = parse(query)
+        if net is None:
+            return None
+        return [self.entry(i) for i in self.cover_ids(net, kinds).tolist()]
+
+    def routes_covering(self, net: Net) -> Dict[str, Edge]:
+        """Per route table, its longest-prefix active route containing all of `net`."""
+        out: Dict[str, Edge] = {}
+        for i in self.cover_ids(net, ('route',)).tolist():
+            e = self.g.edge(self.ids[i])
+            if e is not None and e.details.get('state') != 'blackhole':
+                out.setdefault(self.owners[i], e)  # most specific first
+        return out
+
+    def overlaps(self, kind: str = 'vpc', cross_account: bool = True, limit: int = MAX_PAIRS) -> Dict[str, Any]:
+        """
+        Pairs of `kind` ('vpc' or 'subnet') CIDRs that overlap, from different VPCs and with
+        `cross_account` from different accounts: candidates for conflicts once connected.
+        """
+        pairs: List[Dict[str, Any]] = []
+        seen = set()
+        mine = [i for i, k in enumerate(self.kinds) if k == kind]
+        for i in mine:
+            for j in self.cover_ids(self.nets[i], (kind,)).tolist():
+                if i == j or self.owners[i] == self.owners[j] or (cross_account and self.accounts[i] == self.accounts[j]):
+                    continue
+                pair = (min(i, j), max(i, j))
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                if len(pairs) >= limit:
+                    return {'pairs': pairs, 'truncated': True}
+                pairs.append({'a': self.entry(j), 'b': self.entry(i)})  # a contains b
+        return {'pairs': pairs, 'truncated': False}
+
+    def peering_conflicts(self, limit: int = MAX_PAIRS) -> Dict[str, Any]:
+        """
+        VPC peerings that cannot route as intended: both sides' CIDRs overlap, one VPC is
+        peered with two VPCs whose CIDRs overlap, or a route to the peering lies inside the
+        route table's own VPC (the local route wins).
+        """
+        out: List[Dict[str, Any]] = []
+        remote: Dict[str, List[Tuple[str, Net]]] = {}  # vpc id -> (pcx id, remote CIDR)
+        for p in self.g.nodes('pcx'):
+            d = p.details
+            if d.get('status') not in (None, 'active', 'pending-acceptance', 'provisioning'):
+                continue
+            req, acc = d.get('requester') or {}, d.get('accepter') or {}
+            rn = [x for x in map(parse, req.get('cidrs') or []) if x is not None]
+            an = [x for x in map(parse, acc.get('cidrs') or []) if x is not None]
+            for a in rn:
+                for b in an:
+                    if a.version == b.version and a.overlaps(b):
+                        out.append({'type': 'overlapping-peers', 'pcx': p.id, 'cidrs': [str(a), str(b)]})
+            if req.get('vpc') and acc.get('vpc'):
+                remote.setdefault(req['vpc'], []).extend((p.id, x) for x in an)
+                remote.setdefault(acc['vpc'], []).extend((p.id, x) for x in rn)
+        for vpc, peers in remote.items():
+            seen: Set[Tuple[str, str]] = set()  # one entry per unordered pair of peerings
+            for i, (p1, a) in enumerate(peers):
+                for p2, b in peers[i + 1:]:
+                    if p1 == p2 or a.version != b.version or not a.overlaps(b):
+                        continue
+                    (x, xn), (y, yn) = sorted([(p1, a), (p2, b)], key=lambda t: t[0])
+                    if (x, y) not in seen:
+                        seen.add((x, y))
+                        out.append({'type': 'ambiguous-peers', 'vpc': vpc, 'pcx': [x, y], 'cidrs': [str(xn), str(yn)]})
+        own: Dict[str, List[Net]] = {}  # vpc id -> its CIDRs
+        for i, k in enumerate(self.kinds):
+            if k == 'vpc':
+                own.setdefault(self.owners[i], []).append(self.nets[i])
+        for e in self.g.edges('route'):
+            if e.details.get('target_type') != 'pcx':
+                continue
+            dst = parse(e.details.get('destination'))
+            rtb = self.g.node(e.source)
+            if dst is None or rtb is None:
+                continue
+            for net in own.get(rtb.parent or '', ()):
+                if net.version == dst.version and net.overlaps(dst):
+                    out.append({'type': 'route-inside-vpc', 'route': e.id, 'pcx': e.target, 'cidrs': [str(dst), str(net)]})
+                    break
+        return {'conflicts': out[:limit], 'truncated': len(out) > limit}
+
+def snapshot_cidrs(snap: Snapshot) -> CidrIndex:
+    """The CidrIndex of `snap`, built on first use and kept with the snapshot."""
+    if snap.cidrs is not None:  # built once, never replaced: no lock needed to read it
+        return snap.cidrs
+    with snap.lock:
+        if snap.cidrs is None:
+            snap.cidrs = CidrIndex(snap.graph)
+        return snap.cidrs
@@ -1,61 +1,158 @@
 from __future__ import annotations
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
 
-def analyze(elements: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Return list of findings with severity and targets."""
-    findings: List[Dict[str, Any]] = []
-    nodes = [e for e in elements if 'source' not in e['data']]
-    edges = [e for e in elements if 'source' in e['data']]
-    
-    # A more comprehensive list of public CIDR blocks
-    public_cidrs = [
-        "0.0.0.0/0",
-        "::/0", # IPv6 equivalent of 0.0.0.0/0
-    ]
-
-
-    # Public SG ingress
-    for e in edges:
-        d = e['data']
-        if d.get('type') == 'sg-rule' and d.get('label', '').startswith(('tcp', 'udp', 'icmp')):
-            src_id = d['source']; tgt_id = d['target']
-            if ':cidr:' in src_id and any(public_cidr in src_id for public_cidr in public_cidrs):
-                findings.append({
-                    'id': f'finding:{d["id"]}',
-                    'severity': 'High',
-                    'title': 'Public ingress from Internet',
-                    'detail': f'{d.get("label")} to {tgt_id}',
-                    'edge_id': d['id']
-                })
-
-    # Internet-facing LB with wide listeners
-    for n in nodes:
-        d = n['data']
-        if d.get('type') == 'load_balancer' and d['details'].get('scheme') == 'internet-facing':
-            # Check listeners via edges to this node
-            for e in edges:
-                ed = e['data']
-                if ed['target'] == d['id'] and ed.get('type') == 'listener':
-                    if any(public_cidr in ed['source'] for public_cidr in public_cidrs):
-                        findings.append({
-                            'id': f'finding:{d["id"]}:lb-listener',
-                            'severity': 'Medium',
-                            'title': 'Internet-facing LB with public listener',
-                            'detail': f'{d["label"]} has listener {ed["label"]}',
-                            'node_id': d['id']
-                        })
-
-    # RDS publicly accessible
-    for n in nodes:
-        d = n['data']
-        if d.get('type') == 'rds_instance':
-            if d['details'].get('PubliclyAccessible'):
-                findings.append({
-                    'id': f'finding:{d["id"]}:rds-public',
-                    'severity': 'High',
-                    'title': 'RDS instance is publicly accessible',
-                    'detail': d['label'],
-                    'node_id': d['id']
-                })
+from .cidr import CidrIndex, parse
+from .graph import Edge, Graph, Node
+
+SEVERITIES = ('Critical', 'High', 'Medium', 'Low', 'Info')
+
+Element = Union[Node, Edge]
+Check = Callable[['Context', Any], Optional[str]]
+
+class Rule:
+    """One check, run for every node / edge of the declared types; returns a detail string to report a finding."""
+    __slots__ = ('id', 'title', 'severity', 'node_types', 'edge_types', 'check', 'whole_graph')
+
+    def __init__(self, id_: str, title: str, severity: str, node_types: Iterable[str], edge_types: Iterable[str], check: Check,
+                 whole_graph: bool = False) -> None:
+        if severity not in SEVERITIES:
+            raise ValueError(f'unknown severity: {severity}')
+        self.id = id_
+        self.title = title
+        self.severity = severity
+        self.node_types = tuple(node_types)
+        self.edge_types = tuple(edge_types)
+        self.check = check
+        self.whole_graph = whole_graph  # looks beyond an element's neighborhood: re-run in full by incremental analysis
+
+    def finding(self, el: Element, detail: str) -> Dict[str, Any]:
+        f = {'id': f'finding:{el.id}:{self.id}', 'rule': self.id, 'severity': self.severity, 'title': self.title, 'detail': detail}
+        f['edge_id' if isinstance(el, Edge) else 'node_id'] = el.id
+        return f
+
+RULES: Dict[str, Rule] = {}
+
+def rule(id_: str, title: str, severity: str, nodes: Iterable[str] = (), edges: Iterable[str] = (),
+         whole_graph: bool = False) -> Callable[[Check], Check]:
+    """
+    Register `check(ctx, element)` under `id_` for the given node and / or edge types. A check
+    whose result depends on elements more than one hop away sets `whole_graph`.
+    """
+    def register(check: Check) -> Check:
+        RULES[id_] = Rule(id_, title, severity, nodes, edges, check, whole_graph)
+        return check
+    return register
+
+class Context:
+    """What checks see: the graph plus per-run memos, so work shared by several rules is done once."""
+    def __init__(self, g: Graph, cidrs: Optional[CidrIndex] = None) -> None:
+        self.g = g
+        self._cidrs = cidrs
+        self._memo: Dict[Tuple[str, str], Any] = {}
+
+    @property
+    def cidrs(self) -> CidrIndex:
+        """The graph's CidrIndex, built on first use unless one was passed in."""
+        if self._cidrs is None:
+            self._cidrs = CidrIndex(self.g)
+        return self._cidrs
 
+    def memo(self, name: str, id_: str, fn: Callable[[], Any]) -> Any:
+        key = (name, id_)
+        if key not in self._memo:
+            self._memo[key] = fn()
+        return self._memo[key]
+
+    def is_internet(self, node_id: str) -> bool:
+        """Whether a node stands for the whole internet: a /0 `cidr` node, or an `external` node with a /0 `cidr`."""
+        def compute() -> bool:
+            net = self.cidrs.node_net(node_id)
+            if net is None:
+                n = self.g.node(node_id)
+                net = parse(n.details.get('cidr')) if n is not None and n.type == 'external' and n.details.get('cidr') else None
+            return net is not None and net.prefixlen == 0  # 0.0.0.0/0, ::/0 however they are written
+        return self.memo('internet', node_id, compute)
+
+    def public_ingress(self, e: Edge) -> List[Dict[str, Any]]:
+        """Structured rules of an ingress sg-rule edge whose source is the whole internet."""
+        def compute() -> List[Dict[str, Any]]:
+            if e.details.get('direction') != 'ingress' or not self.is_internet(e.source):
+                return []
+            return list(e.details.get('rules') or [])
+        return self.memo('public_ingress', e.id, compute)
+
+    def internet_reachable(self, n: Node) -> Optional[Edge]:
+        return self.memo('reachable', n.id, lambda: next(iter(self.g.in_edges(n.id, 'derived-reachability')), None))
+
+def _dispatch(rules: Iterable[Rule]) -> Tuple[Dict[str, List[Rule]], Dict[str, List[Rule]]]:
+    by_node: Dict[str, List[Rule]] = {}; by_edge: Dict[str, List[Rule]] = {}
+    for r in rules:
+        for t in r.node_types:
+            by_node.setdefault(t, []).append(r)
+        for t in r.edge_types:
+            by_edge.setdefault(t, []).append(r)
+    return by_node, by_edge
+
+def _dirty(g: Graph, changed: Iterable[Tuple[bool, str]]) -> Tuple[Set[str], Set[str]]:
+    """Node and edge ids to re-evaluate: the changed ones plus their one-hop neighborhood."""
+    nodes: Set[str] = set(); edges: Set[str] = set()
+    for is_edge, id_ in changed:
+        if is_edge:
+            edges.add(id_)
+            e = g.edge(id_)
+            if e is not None:
+                nodes.update((e.source, e.target))
+        else:
+            nodes.add(id_)
+    for nid in list(nodes):
+        for e in g.out_edges(nid) + g.in_edges(nid):
+            edges.add(e.id); nodes.update((e.source, e.target))
+    return nodes, edges
+
+def _subject(f: Dict[str, Any]) -> Tuple[bool, str]:
+    return ('edge_id' in f, f.get('edge_id') or f.get('node_id'))
+
+def analyze(g: Graph, changed: Optional[Iterable[Tuple[bool, str]]] = None,
+            previous: Optional[List[Dict[str, Any]]] = None, rules: Optional[Iterable[Rule]] = None,
+            cidrs: Optional[CidrIndex] = None) -> List[Dict[str, Any]]:
+    """
+    Return list of findings with severity and targets, most severe first.
+
+    All rules are dispatched in one pass over the graph's type indexes. With `changed`
+    ((is_edge, id) of elements added, modified or removed since the snapshot `previous`
+    was computed on, removed edges' endpoints included) only those elements and their
+    one-hop neighborhood are re-evaluated, plus every element of the `whole_graph` rules;
+    the other previous findings are kept. `cidrs` is the graph's CidrIndex when the caller
+    has one already.
+    """
+    rules = list(RULES.values() if rules is None else rules)
+    by_node, by_edge = _dispatch(rules)
+    ctx = Context(g, cidrs)
+    findings: List[Dict[str, Any]] = []
+    todo: List[Tuple[Element, List[Rule]]]  # element -> rules to run on it
+    if changed is None or previous is None:
+        todo = [(n, by_node[t]) for t in by_node for n in g.nodes(t)]
+        todo += [(e, by_edge[t]) for t in by_edge for e in g.edges(t)]
+    else:
+        dirty_nodes, dirty_edges = _dirty(g, changed)
+        whole = [r for r in rules if r.whole_graph]
+        whole_ids = {r.id for r in whole}
+        for f in previous:
+            is_edge, id_ = _subject(f)
+            if f['rule'] not in whole_ids and id_ not in (dirty_edges if is_edge else dirty_nodes) and g.has(is_edge, id_):
+                findings.append(f)
+        todo = [(n, by_node[n.type]) for n in map(g.node, dirty_nodes) if n is not None and n.type in by_node]
+        todo += [(e, by_edge[e.type]) for e in map(g.edge, dirty_edges) if e is not None and e.type in by_edge]
+        whole_node, whole_edge = _dispatch(whole)
+        todo += [(n, whole_node[t]) for t in whole_node for n in g.nodes(t) if n.id not in dirty_nodes]
+        todo += [(e, whole_edge[t]) for t in whole_edge for e in g.edges(t) if e.id not in dirty_edges]
+    for el, rs in todo:
+        for r in rs:
+            detail = r.check(ctx, el)
+            if detail:
+                findings.append(r.finding(el, detail))
+    rank = {s: i for i, s in enumerate(SEVERITIES)}
+    findings.sort(key=lambda f: (rank.get(f['severity'], len(rank)), f['id']))
     return findings
+
+from . import rules as _rules  # noqa: E402,F401  registers the built-in rules
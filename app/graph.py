@@ -1,13 +1,177 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
 import threading
 
-class Graph:
-    """Thread-safe graph for Cytoscape elements with optional compound nodes (parent field)."""
+import orjson
+
+from .scheduler import TaskKey, current_task
+
+# owner of elements added outside any scheduler task (containers, derived edges)
+POST: TaskKey = ('', '', 'post')
+_MISSING = object()
+
+class Node:
+    __slots__ = ('id', 'label', 'type', 'region', 'details', 'parent', 'account_id')
+
+    def __init__(self, id_: str, label: str, type_: str, region: str, details: Dict[str, Any], parent: Optional[str], account_id: str) -> None:
+        self.id = id_
+        self.label = label
+        self.type = type_
+        self.region = region
+        self.details = details
+        self.parent = parent
+        self.account_id = account_id
+
+    def to_element(self) -> Dict[str, Any]:
+        return {
+            "data": {
+                "id": self.id,
+                "label": self.label,
+                "type": self.type,
+                "region": self.region,
+                "details": self.details,
+                "parent": self.parent,
+                "account_id": self.account_id,
+            }
+        }
+
+class Edge:
+    __slots__ = ('id', 'source', 'target', 'label', 'type', 'category', 'derived', 'details')
+
+    def __init__(self, id_: str, source: str, target: str, label: str, type_: str, category: str, derived: bool, details: Dict[str, Any]) -> None:
+        self.id = id_
+        self.source = source
+        self.target = target
+        self.label = label
+        self.type = type_            # attach|assoc|route|sg-rule|listener|bind|invoke|publish|subscribe
+        self.category = category      # resource|network|data
+        self.derived = derived
+        self.details = details
+
+    def to_element(self) -> Dict[str, Any]:
+        return {
+            "data": {
+                "id": self.id,
+                "source": self.source,
+                "target": self.target,
+                "label": self.label,
+                "type": self.type,
+                "category": self.category,
+                "derived": self.derived,
+                "details": self.details,
+            }
+        }
+
+def _merge_node(n: Node, details: Optional[Dict[str, Any]], parent: Optional[str], account_id: Optional[str]) -> bool:
+    """Fold a repeated add_node into `n`; True if anything changed."""
+    changed = False
+    if details and any(n.details.get(k, _MISSING) != v for k, v in details.items()):
+        n.details.update(details); changed = True
+    # allow filling parent later
+    if parent and not n.parent:
+        n.parent = parent; changed = True
+    if account_id and not n.account_id:
+        n.account_id = account_id; changed = True
+    return changed
+
+class GraphBuffer:
+    """
+    Nodes and edges of one task, collected without locking and merged by `Graph.commit`.
+
+    Offers the same add_node / add_edge / set_parent calls as `Graph`, with the same merge
+    rules for repeated nodes; set_parent calls are applied after the buffered nodes.
+    """
     def __init__(self) -> None:
-        self._nodes: Dict[str, Dict[str, Any]] = {}
-        self._edges: Dict[str, Dict[str, Any]] = {}
+        self._nodes: Dict[str, Node] = {}
+        self._edges: Dict[str, Edge] = {}
+        self._parents: Dict[str, Optional[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self._nodes) + len(self._edges)
+
+    def add_node(
+        self,
+        id_: str,
+        label: str,
+        type_: str,
+        region: Optional[str] = None,
+        details: Optional[Dict[str, Any]] = None,
+        parent: Optional[str] = None,
+        account_id: Optional[str] = None,
+    ) -> None:
+        if not id_:
+            return
+        n = self._nodes.get(id_)
+        if n is None:
+            self._nodes[id_] = Node(id_, label, type_, region or "", details or {}, parent, account_id or "")
+        else:
+            _merge_node(n, details, parent, account_id)
+
+    def add_edge(
+        self,
+        id_: str,
+        source: str,
+        target: str,
+        label: str,
+        type_: str,
+        category: str,
+        details: Optional[Dict[str, Any]] = None,
+        derived: bool = False,
+    ) -> None:
+        if not id_ or not source or not target or id_ in self._edges:
+            return
+        self._edges[id_] = Edge(id_, source, target, label, type_, category, bool(derived), details or {})
+
+    def set_parent(self, child_id: str, parent_id: Optional[str]) -> None:
+        self._parents[child_id] = parent_id
+
+# id sets are insertion-ordered dicts so traversals are deterministic
+_Index = Dict[str, Dict[str, None]]
+
+def _index_add(index: _Index, key: str, id_: str) -> None:
+    index.setdefault(key, {})[id_] = None
+
+def _index_del(index: _Index, key: str, id_: str) -> None:
+    ids = index.get(key)
+    if ids is not None:
+        ids.pop(id_, None)
+        if not ids:
+            del index[key]
+
+class Graph:
+    """Thread-safe graph for Cytoscape elements with optional compound nodes (parent field).
+
+    Nodes and edges are slotted `Node` / `Edge` records, indexed by out-edges and in-edges
+    per node and by node / edge type; Cytoscape dicts are only built when serializing.
+    Every element remembers which tasks (see `scheduler.current_task`) added it, so an
+    incremental scan can drop one task's output with `remove_owner` and enumerate it again.
+    With `track_changes`, ids of added or modified elements are remembered until
+    `drain_changes()` hands them out, so results can be streamed while a scan runs, and
+    removed elements are kept (serialized) until `drain_removed()`.
+    """
+    def __init__(self, track_changes: bool = False) -> None:
+        self._nodes: Dict[str, Node] = {}
+        self._edges: Dict[str, Edge] = {}
+        self._out: _Index = {}         # node id -> ids of edges leaving it
+        self._in: _Index = {}          # node id -> ids of edges entering it
+        self._node_types: _Index = {}  # node type -> node ids
+        self._edge_types: _Index = {}  # edge type -> edge ids
+        self._owned: Dict[TaskKey, Set[Tuple[bool, str]]] = {}  # task key -> (is_edge, id)
+        self._refs: Dict[Tuple[bool, str], int] = {}  # (is_edge, id) -> number of owning tasks
         self._lock = threading.Lock()
+        self._track = track_changes
+        self._changed: Dict[Tuple[bool, str], None] = {}  # (is_edge, id), insertion ordered
+        self._removed: Dict[Tuple[bool, str], bytes] = {}
+
+    def _touch(self, is_edge: bool, id_: str) -> None:
+        if self._track:
+            self._changed[(is_edge, id_)] = None
+
+    def _own(self, owned: Set[Tuple[bool, str]], is_edge: bool, id_: str) -> None:
+        ek = (is_edge, id_)
+        if ek not in owned:
+            owned.add(ek)
+            self._refs[ek] = self._refs.get(ek, 0) + 1
 
     def add_node(
         self,
@@ -22,26 +186,7 @@ class Graph:
         if not id_:
             return
         with self._lock:
-            if id_ in self._nodes:
-                if details:
-                    self._nodes[id_]["data"]["details"].update(details)
-                # allow filling parent later
-                if parent and not self._nodes[id_]["data"].get("parent"):
-                    self._nodes[id_]["data"]["parent"] = parent
-                if account_id and not self._nodes[id_]["data"].get("account_id"):
-                    self._nodes[id_]["data"]["account_id"] = account_id
-                return
-            self._nodes[id_] = {
-                "data": {
-                    "id": id_,
-                    "label": label,
-                    "type": type_,
-                    "region": region or "",
-                    "details": details or {},
-                    "parent": parent,
-                    "account_id": account_id or "",
-                }
-            }
+            self._put_node(self._owned_by(None), Node(id_, label, type_, region or "", details or {}, parent, account_id or ""))
 
     def add_edge(
         self,
@@ -57,26 +202,163 @@ class Graph:
         if not id_ or not source or not target:
             return
         with self._lock:
-            if id_ in self._edges:
-                return
-            self._edges[id_] = {
-                "data": {
-                    "id": id_,
-                    "source": source,
-                    "target": target,
-                    "label": label,
-                    "type": type_,            # attach|assoc|route|sg-rule|listener|bind|invoke|publish|subscribe
-                    "category": category,      # resource|network|data
-                    "derived": bool(derived),
-                    "details": details or {},
-                }
-            }
+            self._put_edge(self._owned_by(None), Edge(id_, source, target, label, type_, category, bool(derived), details or {}))
 
     def set_parent(self, child_id: str, parent_id: Optional[str]) -> None:
         with self._lock:
-            if child_id in self._nodes:
-                self._nodes[child_id]["data"]["parent"] = parent_id
+            self._set_parent(child_id, parent_id)
+
+    def commit(self, buf: GraphBuffer, owner: Optional[TaskKey] = None) -> None:
+        """Merge a task's buffered nodes, edges and parents in one locked pass; `owner` defaults to the current task."""
+        with self._lock:
+            owned = self._owned_by(owner)
+            for n in buf._nodes.values():
+                self._put_node(owned, n)
+            for e in buf._edges.values():
+                self._put_edge(owned, e)
+            for child_id, parent_id in buf._parents.items():
+                self._set_parent(child_id, parent_id)
+
+    # --- writes, with self._lock held ------------------------------------------
+
+    def _owned_by(self, owner: Optional[TaskKey]) -> Set[Tuple[bool, str]]:
+        return self._owned.setdefault(owner or current_task.get() or POST, set())
+
+    def _put_node(self, owned: Set[Tuple[bool, str]], n: Node) -> None:
+        self._own(owned, False, n.id)
+        cur = self._nodes.get(n.id)
+        if cur is not None:
+            if _merge_node(cur, n.details, n.parent, n.account_id):
+                self._touch(False, n.id)
+            return
+        self._touch(False, n.id)
+        self._nodes[n.id] = n
+        _index_add(self._node_types, n.type, n.id)
+
+    def _put_edge(self, owned: Set[Tuple[bool, str]], e: Edge) -> None:
+        self._own(owned, True, e.id)
+        if e.id in self._edges:
+            return
+        self._touch(True, e.id)
+        self._edges[e.id] = e
+        _index_add(self._out, e.source, e.id)
+        _index_add(self._in, e.target, e.id)
+        _index_add(self._edge_types, e.type, e.id)
+
+    def _set_parent(self, child_id: str, parent_id: Optional[str]) -> None:
+        n = self._nodes.get(child_id)
+        if n is not None and n.parent != parent_id:
+            n.parent = parent_id
+            self._touch(False, child_id)
+
+    # --- queries (records are live; treat them as read-only) -------------------
+
+    def has(self, is_edge: bool, id_: str) -> bool:
+        return id_ in (self._edges if is_edge else self._nodes)
+
+    def node(self, id_: str) -> Optional[Node]:
+        return self._nodes.get(id_)
+
+    def edge(self, id_: str) -> Optional[Edge]:
+        return self._edges.get(id_)
+
+    def nodes(self, type_: Optional[str] = None) -> List[Node]:
+        with self._lock:
+            if type_ is None:
+                return list(self._nodes.values())
+            return [self._nodes[i] for i in self._node_types.get(type_, ())]
+
+    def edges(self, type_: Optional[str] = None) -> List[Edge]:
+        with self._lock:
+            if type_ is None:
+                return list(self._edges.values())
+            return [self._edges[i] for i in self._edge_types.get(type_, ())]
+
+    def out_edges(self, id_: str, type_: Optional[str] = None) -> List[Edge]:
+        with self._lock:
+            es = [self._edges[i] for i in self._out.get(id_, ())]
+        return es if type_ is None else [e for e in es if e.type == type_]
+
+    def in_edges(self, id_: str, type_: Optional[str] = None) -> List[Edge]:
+        with self._lock:
+            es = [self._edges[i] for i in self._in.get(id_, ())]
+        return es if type_ is None else [e for e in es if e.type == type_]
+
+    def counts(self) -> Dict[str, int]:
+        with self._lock:
+            return {'nodes': len(self._nodes), 'edges': len(self._edges)}
+
+    def keys(self) -> Set[Tuple[bool, str]]:
+        """(is_edge, id) of every element."""
+        with self._lock:
+            return {(False, i) for i in self._nodes} | {(True, i) for i in self._edges}
+
+    def copy(self, track_changes: Optional[bool] = None) -> "Graph":
+        """
+        An independent graph with the same elements and owners. Nodes are copied, since a
+        repeated add_node merges into them; edges are never modified and are shared.
+        """
+        g = Graph(self._track if track_changes is None else track_changes)
+        with self._lock:
+            g._nodes = {i: Node(n.id, n.label, n.type, n.region, dict(n.details), n.parent, n.account_id) for i, n in self._nodes.items()}
+            g._edges = dict(self._edges)
+            for src, dst in ((self._out, g._out), (self._in, g._in), (self._node_types, g._node_types), (self._edge_types, g._edge_types)):
+                dst.update((k, dict(ids)) for k, ids in src.items())
+            g._owned = {k: set(owned) for k, owned in self._owned.items()}
+            g._refs = dict(self._refs)
+        return g
+
+    # --- serialization ---------------------------------------------------------
 
     def elements(self) -> List[Dict[str, Any]]:
         with self._lock:
-            return list(self._nodes.values()) + list(self._edges.values())
+            return [n.to_element() for n in self._nodes.values()] + [e.to_element() for e in self._edges.values()]
+
+    def drain_changes(self) -> List[Dict[str, Any]]:
+        """Elements added or modified since the previous call (nodes first). Needs `track_changes`."""
+        with self._lock:
+            changed, self._changed = self._changed, {}
+            nodes = [self._nodes[i].to_element() for is_edge, i in changed if not is_edge and i in self._nodes]
+            edges = [self._edges[i].to_element() for is_edge, i in changed if is_edge and i in self._edges]
+            return nodes + edges
+
+    def drain_removed(self) -> Dict[Tuple[bool, str], bytes]:
+        """(is_edge, id) -> serialized element, for elements removed since the previous call."""
+        with self._lock:
+            removed, self._removed = self._removed, {}
+            return removed
+
+    # --- ownership -------------------------------------------------------------
+
+    def owner_keys(self) -> Set[TaskKey]:
+        with self._lock:
+            return set(self._owned)
+
+    def _pop(self, is_edge: bool, id_: str) -> Optional[Union[Node, Edge]]:
+        if is_edge:
+            e = self._edges.pop(id_, None)
+            if e is not None:
+                _index_del(self._out, e.source, id_)
+                _index_del(self._in, e.target, id_)
+                _index_del(self._edge_types, e.type, id_)
+            return e
+        n = self._nodes.pop(id_, None)
+        if n is not None:
+            _index_del(self._node_types, n.type, id_)
+        return n
+
+    def remove_owner(self, key: TaskKey) -> int:
+        """Forget that `key` produced its elements; elements no other task produced are deleted."""
+        removed = 0
+        with self._lock:
+            for ek in self._owned.pop(key, ()):
+                self._refs[ek] -= 1
+                if self._refs[ek]:
+                    continue
+                del self._refs[ek]
+                el = self._pop(*ek)
+                if el is not None:
+                    removed += 1
+                    if self._track:
+                        self._removed.setdefault(ek, orjson.dumps(el.to_element()))
+        return removed
@@ -0,0 +1,178 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+from concurrent.futures import Future, ThreadPoolExecutor
+import os
+import threading
+import time
+import uuid
+
+from .scan import run_scan
+from .scheduler import Scheduler, TaskKey
+
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '4'))
+JOB_TTL = int(os.environ.get('JOB_TTL', '3600'))  # seconds a finished job stays queryable
+
+class Job:
+    """One enumeration run: its payload, per-task progress, result and cancellation flag."""
+    def __init__(self, payload: Dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex
+        self.payload = payload
+        self.status = 'queued'  # queued|running|done|failed|cancelled
+        self.created = time.time()
+        self.started: Optional[float] = None
+        self.finished: Optional[float] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.scheduler: Optional[Scheduler] = None
+        # task key -> [state, started, finished]; state is queued|running|done|failed|cancelled
+        self.tasks: Dict[TaskKey, List[Any]] = {}
+        # streamed to /jobs/{id}/events; ends with an 'end' event. Once the job has ended and no
+        # stream is reading, all but the 'end' event are dropped (the result holds everything)
+        self.events: List[Dict[str, Any]] = []
+        self._dropped = 0  # events dropped from the front; stream positions count them
+        self._readers = 0
+        self._events_cond = threading.Condition()
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def attach(self, sched: Scheduler) -> None:
+        self.scheduler = sched
+        if self.cancelled:
+            sched.cancel()
+
+    def task_queued(self, key: TaskKey) -> None:
+        with self._lock:
+            self.tasks[key] = ['queued', None, None]
+
+    def task_started(self, key: TaskKey) -> None:
+        with self._lock:
+            self.tasks[key] = ['running', time.time(), None]
+
+    def task_finished(self, key: TaskKey, state: str = 'done') -> None:
+        with self._lock:
+            t = self.tasks.setdefault(key, ['queued', None, None])
+            t[0] = state; t[2] = time.time()
+
+    def cancel(self) -> None:
+        self._cancel.set()
+        dropped = self.scheduler.cancel() if self.scheduler else []
+        with self._lock:
+            for key in dropped:
+                self.tasks[key] = ['cancelled', None, None]
+            never_started = self.status == 'queued' and self.future is not None and self.future.cancel()
+            if never_started:
+                self.status = 'cancelled'; self.finished = time.time()
+        if never_started:
+            self.emit({'event': 'end', 'status': self.status, 'error': None, 'elapsed': 0.0})
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        with self._events_cond:
+            self.events.append(event)
+            self._events_cond.notify_all()
+            self._compact()
+
+    def _ended(self) -> bool:
+        return bool(self.events) and self.events[-1].get('event') == 'end'
+
+    def _compact(self) -> None:
+        # with self._events_cond held
+        if self._readers == 0 and len(self.events) > 1 and self._ended():
+            self._dropped += len(self.events) - 1
+            self.events = self.events[-1:]
+
+    def open_reader(self) -> None:
+        """Keep the events buffered for one more stream; pair with `close_reader`."""
+        with self._events_cond:
+            self._readers += 1
+
+    def close_reader(self) -> None:
+        with self._events_cond:
+            self._readers -= 1
+            self._compact()
+
+    def wait_events(self, start: int, timeout: float = 1.0) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Events from position `start` on (waiting up to `timeout` for new ones) and whether the
+        stream has ended. A stream that opens after the events were dropped only gets 'end'.
+        """
+        with self._events_cond:
+            if self._dropped + len(self.events) <= start:
+                self._events_cond.wait(timeout)
+            new = self.events[max(0, start - self._dropped):]
+            return new, self._ended()
+
+    def elapsed(self) -> float:
+        if self.started is None:
+            return 0.0
+        return round((self.finished or time.time()) - self.started, 3)
+
+    def describe(self, tasks: bool = True) -> Dict[str, Any]:
+        now = time.time()
+        with self._lock:
+            counts: Dict[str, int] = {}
+            rows = []
+            for (acc, region, svc), (state, t0, t1) in self.tasks.items():
+                counts[state] = counts.get(state, 0) + 1
+                if tasks:
+                    rows.append({
+                        'account_id': acc, 'region': region, 'service': svc, 'state': state,
+                        'elapsed': round((t1 or now) - t0, 3) if t0 else None,
+                    })
+        out: Dict[str, Any] = {
+            'id': self.id,
+            'status': self.status,
+            'elapsed': self.elapsed(),
+            'progress': {'total': sum(counts.values()), **counts},
+            'error': self.error,
+        }
+        if tasks:
+            out['tasks'] = rows
+        return out
+
+class JobManager:
+    """Runs scans on a worker pool off the event loop and keeps recent jobs queryable."""
+    def __init__(self, workers: int = JOB_WORKERS, ttl: int = JOB_TTL) -> None:
+        self._pool = ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix='job')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self.ttl = ttl
+
+    def _prune(self) -> None:
+        cutoff = time.time() - self.ttl
+        for jid in [jid for jid, j in self._jobs.items() if j.finished and j.finished < cutoff]:
+            del self._jobs[jid]
+
+    def submit(self, payload: Dict[str, Any], stream: bool = False) -> Job:
+        """Queue a scan; with `stream`, a reader is opened before it starts (see `Job.open_reader`)."""
+        job = Job(payload)
+        if stream:
+            job.open_reader()
+        with self._lock:
+            self._prune()
+            self._jobs[job.id] = job
+        job.future = self._pool.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+
+    def _run(self, job: Job) -> Optional[Dict[str, Any]]:
+        job.status = 'running'; job.started = time.time()
+        try:
+            job.result = run_scan(job)
+            job.status = 'cancelled' if job.cancelled else 'done'
+        except Exception as e:
+            job.error = str(e); job.status = 'failed'
+        finally:
+            job.finished = time.time()
+            job.emit({'event': 'end', 'status': job.status, 'error': job.error, 'elapsed': job.elapsed()})
+        return job.result
+
+JOBS = JobManager()
@@ -0,0 +1,208 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Callable, Dict, List, Optional, Tuple
+import math
+
+import numpy as np
+
+from .graph import Graph
+
+if TYPE_CHECKING:
+    from .snapshots import Snapshot
+
+MODES = ('vpc', 'service', 'account')
+NODE_SIZE = 60.0      # box of a leaf node, label included
+GAP = 30.0            # between sibling boxes
+PAD = 40.0            # inside a compound, around its children (room for the title)
+FORCE_MAX = 150       # more siblings than this are packed in connection order instead of by a force pass
+FORCE_ITER = 50
+
+Positions = Dict[str, List[float]]
+Arrange = Callable[[np.ndarray, np.ndarray, List[Tuple[bool, str, str]]], np.ndarray]
+
+def _rows(groups: List[np.ndarray], sizes: np.ndarray) -> np.ndarray:
+    """Centers of boxes laid out row by row; each group of indices is one row, left to right."""
+    out = np.zeros((len(sizes), 2))
+    y = 0.0
+    for idx in groups:
+        w = sizes[idx, 0]
+        out[idx, 0] = np.cumsum(w + GAP) - GAP - w / 2
+        h = sizes[idx, 1].max()
+        out[idx, 1] = y + h / 2
+        y += h + GAP
+    return out
+
+def _shelves(order: np.ndarray, sizes: np.ndarray) -> List[np.ndarray]:
+    """Split `order` into rows of roughly equal width, aiming at a square overall."""
+    width = max(math.sqrt(float(((sizes + GAP) ** 2).sum())), float(sizes[:, 0].max()))
+    ends = np.cumsum(sizes[order, 0] + GAP)
+    row = (ends - 1e-9) // width  # row of each box by where it ends
+    return [order[row == r] for r in np.unique(row)]
+
+def _grid(sizes: np.ndarray, edges: np.ndarray, keys: List[Tuple[bool, str, str]]) -> np.ndarray:
+    """Account view: leaves first, grouped by type, then the compounds."""
+    order = np.array(sorted(range(len(keys)), key=keys.__getitem__))
+    return _rows(_shelves(order, sizes), sizes)
+
+def _connected(sizes: np.ndarray, edges: np.ndarray, keys: List[Tuple[bool, str, str]]) -> np.ndarray:
+    """Rows in breadth-first order over the edges, so that connected siblings end up side by side."""
+    n = len(sizes)
+    adj: List[List[int]] = [[] for _ in range(n)]
+    for a, b in edges.tolist():
+        adj[a].append(b); adj[b].append(a)
+    seen = np.zeros(n, dtype=bool)
+    order: List[int] = []
+    for start in sorted(range(n), key=keys.__getitem__):
+        if seen[start]:
+            continue
+        seen[start] = True
+        queue = [start]
+        for i in queue:
+            order.append(i)
+            for j in adj[i]:
+                if not seen[j]:
+                    seen[j] = True; queue.append(j)
+    return _rows(_shelves(np.array(order), sizes), sizes)
+
+def _force(sizes: np.ndarray, edges: np.ndarray, keys: List[Tuple[bool, str, str]]) -> np.ndarray:
+    """
+    VPC view: a vectorized Fruchterman-Reingold pass over the siblings and the edges between
+    them (edges of nested nodes count for their enclosing sibling), snapped to rows so that
+    boxes never overlap while connected siblings stay close.
+    """
+    n = len(sizes)
+    if n < 3 or len(edges) == 0:
+        return _grid(sizes, edges, keys)
+    if n > FORCE_MAX:
+        return _connected(sizes, edges, keys)
+    rnd = np.random.default_rng(n)  # deterministic: same graph, same picture
+    pos = rnd.random((n, 2))
+    k = 1 / math.sqrt(n)
+    t = 0.1
+    for _ in range(FORCE_ITER):
+        delta = pos[:, None, :] - pos[None, :, :]
+        dist2 = np.maximum(np.einsum('ijk,ijk->ij', delta, delta), 1e-8)
+        disp = np.einsum('ijk,ij->ik', delta, k * k / dist2)  # repulsion between all pairs
+        d = pos[edges[:, 0]] - pos[edges[:, 1]]
+        pull = d * (np.linalg.norm(d, axis=1) / k)[:, None]  # attraction along edges
+        np.add.at(disp, edges[:, 0], -pull)
+        np.add.at(disp, edges[:, 1], pull)
+        length = np.maximum(np.linalg.norm(disp, axis=1), 1e-9)
+        pos += disp / length[:, None] * np.minimum(length, t)[:, None]
+        t *= 0.95
+    rows = max(1, round(math.sqrt(n)))
+    by_y = np.argsort(pos[:, 1], kind='stable')
+    groups = [g[np.argsort(pos[g, 0], kind='stable')] for g in np.array_split(by_y, rows)]
+    return _rows(groups, sizes)
+
+def _layered(sizes: np.ndarray, edges: np.ndarray, keys: List[Tuple[bool, str, str]]) -> np.ndarray:
+    """Service view: left to right by longest path from the sources, like a layered (dagre) layout."""
+    n = len(sizes)
+    rank = np.zeros(n, dtype=np.int64)
+    if len(edges):
+        e = edges[edges[:, 0] != edges[:, 1]]
+        for _ in range(min(n, 50)):  # bounded, so cycles cannot run away
+            new = rank.copy()
+            np.maximum.at(new, e[:, 1], rank[e[:, 0]] + 1)
+            if (new == rank).all():
+                break
+            rank = new
+    order = np.array(sorted(range(n), key=keys.__getitem__), dtype=np.int64)
+    cols = [order[rank[order] == r] for r in np.unique(rank)]
+    # columns are rows of the transposed boxes
+    out = _rows(cols, sizes[:, ::-1])
+    return out[:, ::-1]
+
+ARRANGE: Dict[str, Arrange] = {'vpc': _force, 'service': _layered, 'account': _grid}
+
+def compute_layout(g: Graph, mode: str) -> Positions:
+    """
+    Positions of every leaf node for one view mode, on the compound parent hierarchy.
+
+    Compounds are laid out bottom-up: the children of each are arranged by the mode's
+    arranger, then the compound becomes one box of that size for its own parent. Compound
+    positions are left out; the client derives them from their children.
+    """
+    arrange = ARRANGE[mode]
+    nodes = {n.id: n for n in g.nodes()}
+    children: Dict[Optional[str], List[str]] = {}
+    for n in nodes.values():
+        p = n.parent if n.parent in nodes and n.parent != n.id else None
+        children.setdefault(p, []).append(n.id)
+
+    # ancestor chain of every node (root first), to lift edges onto siblings
+    chain: Dict[str, Tuple[str, ...]] = {}
+    def _chain(nid: str) -> Tuple[str, ...]:
+        path: List[str] = []
+        cur: Optional[str] = nid
+        while cur is not None and cur not in chain and cur not in path:
+            path.append(cur)
+            p = nodes[cur].parent
+            cur = p if p in nodes else None
+        base = chain[cur] if cur in chain else ()
+        for x in reversed(path):
+            base = chain[x] = base + (x,)
+        return chain[nid]
+    for nid in nodes:
+        _chain(nid)
+
+    lifted: Dict[Optional[str], List[Tuple[str, str]]] = {}
+    for e in g.edges():
+        a, b = chain.get(e.source), chain.get(e.target)
+        if a is None or b is None:
+            continue
+        i = 0
+        while i < len(a) and i < len(b) and a[i] == b[i]:
+            i += 1
+        if i < len(a) and i < len(b):
+            lifted.setdefault(a[i - 1] if i else None, []).append((a[i], b[i]))
+
+    local: Dict[Optional[str], np.ndarray] = {}  # compound -> child centers from its top left corner
+    size: Dict[str, Tuple[float, float]] = {}
+
+    def _place(parent: Optional[str]) -> Tuple[float, float]:
+        ids = children[parent]
+        sizes = np.array([size.get(c, (NODE_SIZE, NODE_SIZE)) for c in ids])
+        index = {c: i for i, c in enumerate(ids)}
+        edges = np.array([(index[s], index[t]) for s, t in lifted.get(parent, [])], dtype=np.int64).reshape(-1, 2)
+        centers = arrange(sizes, edges, [(c in children, nodes[c].type, nodes[c].label) for c in ids])
+        centers -= (centers - sizes / 2).min(axis=0)  # top left of the first box at the origin
+        local[parent] = centers + PAD
+        extent = (centers + sizes / 2).max(axis=0)
+        return float(extent[0]) + 2 * PAD, float(extent[1]) + 2 * PAD
+
+    if not children.get(None):
+        return {}
+    # children before their parents: reverse of a pre-order walk
+    walk: List[str] = []
+    stack = list(children[None])
+    while stack:
+        nid = stack.pop()
+        walk.append(nid)
+        stack.extend(children.get(nid, []))
+    for nid in reversed(walk):
+        if nid in children:
+            size[nid] = _place(nid)
+    _place(None)
+
+    # absolute positions, top-down
+    out: Positions = {}
+    todo = [(c, local[None][i]) for i, c in enumerate(children[None])]
+    while todo:
+        nid, (x, y) = todo.pop()
+        if nid not in children:
+            out[nid] = [round(float(x), 1), round(float(y), 1)]
+            continue
+        w, h = size[nid]
+        corner = np.array([x - w / 2, y - h / 2])
+        todo.extend((c, corner + local[nid][i]) for i, c in enumerate(children[nid]))
+    return out
+
+def snapshot_layout(snap: Snapshot, mode: str) -> Positions:
+    """The layout of `snap` for `mode`, computed on first use and kept with the snapshot."""
+    pos = snap.layouts.get(mode)
+    if pos is not None:  # computed once, never replaced: no lock needed to read it
+        return pos
+    with snap.lock:
+        if mode not in snap.layouts:
+            snap.layouts[mode] = compute_layout(snap.graph, mode)
+        return snap.layouts[mode]
@@ -1,24 +1,70 @@
 from __future__ import annotations
+import asyncio
 import os
-from typing import Any, List
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Optional
 
 import orjson
-import boto3
 from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+from fastapi.responses import HTMLResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
 
-from .graph import Graph
-from .reachability import derive_reachability
-from .findings import analyze as analyze_findings
-from .aws.session import build_root_session, assume_roles, discover_regions
-from .aws import ec2, elbv2, lambda_, apigw, s3, sqs_sns, dynamodb, kinesis, stepfunctions, ecs, rds, route53_cf, ecr, opensearch, elasticache, msk, nacl_tgw_vpn_dx, eks
+from .acl import INTERNET, MAX_RESULTS as EXPOSURE_LIMIT, SWEEP_PORTS, parse_ports, snapshot_acl
+from .cidr import KINDS as CIDR_KINDS, snapshot_cidrs
+from .jobs import JOBS, Job
+from .layout import MODES, snapshot_layout
+from .metrics import METRICS
+from .paths import MAX_DEPTH, find_paths
+from .scan import load_details
+from .search import snapshot_search
+from .snapshots import STORE, Snapshot
+from .subgraph import MAX_HOPS, NEIGHBORHOOD_LIMIT, snapshot_hierarchy
+from .wire import StreamCompressor, choose_encoding, encode
+from .aws.clients import POOL
+from .aws.cache import CACHE
+from .aws.ratelimit import LIMITER
 
-WORKERS = int(os.environ.get('WORKERS', '24'))
+def json_response(data: Any, status_code: int = 200, req: Optional[Request] = None) -> Response:
+    """orjson bytes in one pass; with `req`, in the compact encoding and / or compressed as its headers ask."""
+    h = req.headers if req is not None else {}
+    return encode(data, status_code, h.get('accept', ''), h.get('accept-encoding', ''))
 
-def json_response(data: Any) -> JSONResponse:
-    return JSONResponse(orjson.loads(orjson.dumps(data)))
+def _snapshot(req: Request) -> Optional[Snapshot]:
+    """The snapshot named by `?snapshot=`, else the latest one."""
+    q = req.query_params
+    return STORE.get(q['snapshot']) if q.get('snapshot') else STORE.latest()
+
+def event_stream(job: Job, req: Request, opened: bool = False) -> StreamingResponse:
+    """
+    Stream job events as NDJSON, or as Server-Sent Events when the client accepts text/event-stream;
+    gzip / zstd compressed when accepted, flushed after every event. `opened`: the caller has
+    already opened a reader on `job`.
+    """
+    if not opened:
+        job.open_reader()
+    sse = 'text/event-stream' in req.headers.get('accept', '')
+    coding = choose_encoding(req.headers.get('accept-encoding', ''))
+    z = StreamCompressor(coding) if coding else None
+
+    async def gen():
+        idx = 0
+        try:
+            while True:
+                events, ended = await run_in_threadpool(job.wait_events, idx, 1.0)
+                idx += len(events)
+                for ev in events:
+                    body = orjson.dumps(ev)
+                    chunk = (b'event: ' + ev['event'].encode() + b'\ndata: ' + body + b'\n\n') if sse else body + b'\n'
+                    yield z.chunk(chunk) if z else chunk
+                if ended:
+                    if z:
+                        yield z.end()
+                    return
+        finally:
+            job.close_reader()
+
+    headers = {'Content-Encoding': coding, 'Vary': 'Accept-Encoding'} if coding else None
+    return StreamingResponse(gen(), media_type='text/event-stream' if sse else 'application/x-ndjson', headers=headers)
 
 app = FastAPI()
 app.mount('/ui', StaticFiles(directory=os.path.join(os.path.dirname(__file__), 'ui')), name='ui')
@@ -31,112 +77,235 @@ async def index():
 @app.post('/enumerate')
 async def enumerate_api(req: Request):
     payload = await req.json()
-    ak = payload.get('access_key_id'); sk = payload.get('secret_access_key'); st = payload.get('session_token')
-    profile = payload.get('profile'); role_arns = payload.get('assume_roles') or []
-    regions = payload.get('regions') or []
-    services = payload.get('services') or {}  # service toggles
-
-    root = build_root_session(ak, sk, st, profile)
-    sessions = assume_roles(root, role_arns)
-    all_regions = regions
-    if not all_regions or all_regions == ['ALL']:
-        all_regions = discover_regions(root)
-
-    g = Graph()
-    warnings: List[str] = []
-    svc_list = [
-        ('ec2', ec2.enumerate),
-        ('elbv2', elbv2.enumerate),
-        ('lambda', lambda_.enumerate),
-        ('apigw', apigw.enumerate),
-        ('eks', eks.enumerate),
-        ('s3', s3.enumerate),       # global
-        ('sqs_sns', sqs_sns.enumerate),
-        ('dynamodb', dynamodb.enumerate),
-        ('kinesis', kinesis.enumerate),
-        ('stepfunctions', stepfunctions.enumerate),
-        ('ecs', ecs.enumerate),
-        ('rds', rds.enumerate),
-        ('route53_cf', route53_cf.enumerate),  # global mostly
-        ('ecr', ecr.enumerate),
-        ('opensearch', opensearch.enumerate),
-        ('elasticache', elasticache.enumerate),
-        ('msk', msk.enumerate),
-        ('nacl_tgw_vpn_dx', nacl_tgw_vpn_dx.enumerate),
-    ]
-
-    def _run_fn(fn, sess, account_id, region, g, name):
-        ww = []
-        try:
-            fn(sess, account_id, region, g, ww)
-        except Exception as e:
-            ww.append(f"{name} {account_id}/{region}: {e}")
-        return ww
-
-    # per-account execution
-    def run_account(account_arn: str, sess: boto3.Session):
-        # identity
-        account_id = None
-        try:
-            sts = sess.client('sts')
-            me = sts.get_caller_identity()
-            account_id = me.get('Account')
-        except Exception as e:
-            warnings.append(f"sts failed: {e}")
-            account_id = account_arn or 'self'
-        # global services
-        for name, fn in svc_list:
-            if name in ('s3','route53_cf'):
-                try:
-                    fn(sess, account_id, 'global', g, warnings)
-                except Exception as e:
-                    warnings.append(f"{name} global error: {e}")
-        # regional services
-        with ThreadPoolExecutor(max_workers=min(WORKERS, max(1, len(all_regions)))) as pool:
-            futs = []
-            for r in all_regions:
-                for name, fn in svc_list:
-                    if name in ('s3','route53_cf'): continue
-                    if services and services.get(name) is False: continue
-                    futs.append(pool.submit(lambda rr=r, f=fn, n=name: _run_fn(f, sess, account_id, rr, g, n)))
-            for f in as_completed(futs):
-                w = f.result()
-                if w: warnings.extend(w)
-
-    for arn, sess in sessions.items():
-        if sess is None:
-            warnings.append(f"AssumeRole failed: {arn}"); continue
-        run_account(arn, sess)
-
-    # === Account/Region container parents (for Account view) ===
-    elems_snapshot = g.elements()
-    node_elems = [e for e in elems_snapshot if 'source' not in e['data']]
-    by_acc: dict[str, set[str]] = {}
-    for n in node_elems:
-        d = n['data']; acc = d.get('account_id') or 'self'; reg = d.get('region') or 'global'
-        by_acc.setdefault(acc, set()).add(reg)
-
-    for acc, regs in by_acc.items():
-        g.add_node(f'account:{acc}', f'Account {acc}', 'account', None)
-        for reg in regs:
-            g.add_node(f'account:{acc}:region:{reg}', f'{reg}', 'region', reg, parent=f'account:{acc}')
-    for n in node_elems:
-        d = n['data']
-        if not d.get('parent'):
-            acc = d.get('account_id') or 'self'; reg = d.get('region') or 'global'
-            g.set_parent(d['id'], f'account:{acc}:region:{reg}')
-    # === end containers ===
-
-    # Derived reachability (placeholder; returns [] for now)
-    derived = derive_reachability(g)
-    for e in derived:
-        g.add_edge(**e)
-
-    elements = g.elements()
-    findings = analyze_findings(elements)
-
-    return json_response({ 'elements': elements, 'warnings': warnings, 'findings': findings })
+    # runs on the job pool, so the event loop keeps serving while we wait
+    job = JOBS.submit(payload)
+    await asyncio.wrap_future(job.future)
+    if job.status != 'done':
+        return json_response({ 'error': job.error or job.status, 'job': job.describe(tasks=False) }, status_code=500)
+    # large graphs: serialize and compress off the event loop
+    return await run_in_threadpool(json_response, { **job.result, 'job': job.describe(tasks=False) }, 200, req)
+
+@app.post('/enumerate/stream')
+async def enumerate_stream(req: Request):
+    payload = await req.json()
+    return event_stream(JOBS.submit(payload, stream=True), req, opened=True)
+
+@app.post('/jobs')
+async def create_job(req: Request):
+    payload = await req.json()
+    job = JOBS.submit(payload)
+    return json_response(job.describe(tasks=False), status_code=202)
+
+@app.get('/jobs/{job_id}')
+async def get_job(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return json_response({ 'error': 'unknown job' }, status_code=404)
+    return json_response(job.describe())
+
+@app.get('/jobs/{job_id}/result')
+async def get_job_result(job_id: str, req: Request):
+    job = JOBS.get(job_id)
+    if job is None:
+        return json_response({ 'error': 'unknown job' }, status_code=404)
+    if job.status != 'done':
+        return json_response({ 'error': job.error or f'job is {job.status}', 'job': job.describe(tasks=False) }, status_code=409)
+    return await run_in_threadpool(json_response, { **job.result, 'job': job.describe(tasks=False) }, 200, req)
+
+@app.get('/jobs/{job_id}/events')
+async def get_job_events(job_id: str, req: Request):
+    job = JOBS.get(job_id)
+    if job is None:
+        return json_response({ 'error': 'unknown job' }, status_code=404)
+    return event_stream(job, req)
+
+@app.delete('/jobs/{job_id}')
+async def cancel_job(job_id: str):
+    job = JOBS.get(job_id)
+    if job is None:
+        return json_response({ 'error': 'unknown job' }, status_code=404)
+    job.cancel()
+    return json_response(job.describe(tasks=False))
+
+@app.get('/paths')
+async def paths(req: Request):
+    """k shortest paths between two nodes of a snapshot (default: the latest one)."""
+    q = req.query_params
+    src, dst = q.get('from'), q.get('to')
+    if not src or not dst:
+        return json_response({ 'error': 'from and to are required' }, status_code=400)
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    for nid in (src, dst):
+        if not snap.graph.has(False, nid):
+            return json_response({ 'error': f'unknown node: {nid}' }, status_code=404)
+    try:
+        k = int(q.get('k') or 3); max_depth = int(q.get('max_depth') or MAX_DEPTH)
+    except ValueError:
+        return json_response({ 'error': 'k and max_depth must be integers' }, status_code=400)
+    types = [t for t in (q.get('types') or '').split(',') if t]
+    found = await run_in_threadpool(find_paths, snap.graph, src, dst, k, max_depth, types)
+    return json_response({ 'snapshot_id': snap.id, 'from': src, 'to': dst, 'paths': [p.to_dict() for p in found] }, req=req)
+
+@app.get('/details')
+async def node_details(req: Request):
+    """Fetch details deferred by a scan with `"details": "lazy"` for one node (Lambda destinations and policy)."""
+    q = req.query_params
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    res = await run_in_threadpool(load_details, snap, q.get('node') or '')
+    if res is None:
+        return json_response({ 'error': 'node has no deferred details' }, status_code=404)
+    return json_response({ 'snapshot_id': snap.id, **res }, req=req)
+
+@app.get('/subgraph')
+async def subgraph(req: Request):
+    """Account, region and VPC containers of a snapshot, collapsed, with child counts."""
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    h = await run_in_threadpool(snapshot_hierarchy, snap)
+    res = await run_in_threadpool(h.overview)
+    return await run_in_threadpool(json_response, { 'snapshot_id': snap.id, **res }, 200, req)
+
+@app.get('/subgraph/children')
+async def subgraph_children(req: Request):
+    """Direct children of one container (`node=<id>`) and the edges touching them."""
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    h = await run_in_threadpool(snapshot_hierarchy, snap)
+    res = await run_in_threadpool(h.expand, req.query_params.get('node') or '')
+    if res is None:
+        return json_response({ 'error': 'unknown node' }, status_code=404)
+    return await run_in_threadpool(json_response, { 'snapshot_id': snap.id, **res }, 200, req)
+
+@app.get('/subgraph/neighborhood')
+async def subgraph_neighborhood(req: Request):
+    """Nodes within `k` hops (max MAX_HOPS) of `node`, their containers and the edges among them."""
+    q = req.query_params
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    try:
+        k = int(q.get('k') or 1); limit = int(q.get('limit') or NEIGHBORHOOD_LIMIT)
+    except ValueError:
+        return json_response({ 'error': 'k and limit must be integers' }, status_code=400)
+    h = await run_in_threadpool(snapshot_hierarchy, snap)
+    res = await run_in_threadpool(h.neighborhood, q.get('node') or '', min(k, MAX_HOPS), limit)
+    if res is None:
+        return json_response({ 'error': 'unknown node' }, status_code=404)
+    return await run_in_threadpool(json_response, { 'snapshot_id': snap.id, **res }, 200, req)
+
+@app.get('/search')
+async def search(req: Request):
+    """Ranked search over node labels, ids, tags, IPs, CIDRs and DNS names of a snapshot (`q`, `offset`, `limit`)."""
+    q = req.query_params
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    try:
+        offset = int(q.get('offset') or 0); limit = int(q.get('limit') or 50)
+    except ValueError:
+        return json_response({ 'error': 'offset and limit must be integers' }, status_code=400)
+    index = await run_in_threadpool(snapshot_search, snap)
+    res = index.search(q.get('q') or '', offset, limit)
+    return json_response({ 'snapshot_id': snap.id, **res }, req=req)
+
+@app.get('/cidr')
+async def cidr_covering(req: Request):
+    """Routes, SG rules, subnets and VPCs whose CIDR contains an address or CIDR (`q`, optional `kind=a,b`)."""
+    q = req.query_params
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    kinds = [k for k in (q.get('kind') or '').split(',') if k] or None
+    if kinds and not set(kinds) <= set(CIDR_KINDS):
+        return json_response({ 'error': f'kind must be among {", ".join(CIDR_KINDS)}' }, status_code=400)
+    index = await run_in_threadpool(snapshot_cidrs, snap)
+    res = index.covering(q.get('q') or '', kinds)
+    if res is None:
+        return json_response({ 'error': 'q must be an IP address or CIDR' }, status_code=400)
+    return json_response({ 'snapshot_id': snap.id, 'query': q.get('q'), 'covering': res }, req=req)
+
+@app.get('/cidr/overlaps')
+async def cidr_overlaps(req: Request):
+    """Overlapping VPC (`kind=vpc`) or subnet (`kind=subnet`) CIDRs, across accounts unless `same_account=1`."""
+    q = req.query_params
+    kind = q.get('kind') or 'vpc'
+    if kind not in ('vpc', 'subnet'):
+        return json_response({ 'error': 'kind must be vpc or subnet' }, status_code=400)
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    index = await run_in_threadpool(snapshot_cidrs, snap)
+    res = await run_in_threadpool(index.overlaps, kind, q.get('same_account') not in ('1', 'true'))
+    return json_response({ 'snapshot_id': snap.id, 'kind': kind, **res }, req=req)
+
+@app.get('/cidr/peering')
+async def cidr_peering(req: Request):
+    """VPC peering connections whose address space conflicts (see CidrIndex.peering_conflicts)."""
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    index = await run_in_threadpool(snapshot_cidrs, snap)
+    res = await run_in_threadpool(index.peering_conflicts)
+    return json_response({ 'snapshot_id': snap.id, **res }, req=req)
+
+@app.get('/exposure')
+async def exposure(req: Request):
+    """
+    ENIs whose security groups and subnet NACL admit `source` (comma-separated CIDRs, default the
+    whole internet) on `ports` (`tcp:22,udp:53`, default SWEEP_PORTS); `public=0` includes ENIs without a public IP.
+    """
+    q = req.query_params
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    sources = [s for s in (q.get('source') or '').split(',') if s.strip()] or list(INTERNET)
+    try:
+        ports = parse_ports(q['ports']) if q.get('ports') else list(SWEEP_PORTS)
+        limit = int(q.get('limit') or EXPOSURE_LIMIT)
+    except ValueError as e:
+        return json_response({ 'error': str(e) }, status_code=400)
+    tables = await run_in_threadpool(snapshot_acl, snap)
+    try:
+        res = await run_in_threadpool(tables.sweep, sources, ports, q.get('public') not in ('0', 'false'), limit)
+    except ValueError as e:
+        return json_response({ 'error': str(e) }, status_code=400)
+    return await run_in_threadpool(json_response, { 'snapshot_id': snap.id, **res }, 200, req)
+
+@app.get('/layout')
+async def layout(req: Request):
+    """Node positions of a snapshot for one view mode (`vpc`, `service` or `account`), computed once and cached."""
+    q = req.query_params
+    mode = q.get('mode') or 'vpc'
+    if mode not in MODES:
+        return json_response({ 'error': f'mode must be one of {", ".join(MODES)}' }, status_code=400)
+    snap = _snapshot(req)
+    if snap is None:
+        return json_response({ 'error': 'no snapshot; run a scan first' }, status_code=404)
+    positions = await run_in_threadpool(snapshot_layout, snap, mode)
+    return await run_in_threadpool(json_response, { 'snapshot_id': snap.id, 'mode': mode, 'positions': positions }, 200, req)
+
+@app.get('/metrics')
+async def metrics():
+    """API call, phase, rate limiter and cache statistics in the Prometheus text format."""
+    lim, cache, pool = LIMITER.stats(), CACHE.stats(), POOL.stats()
+    extra = ['# TYPE awsenum_rate_limit_rate gauge']
+    extra += [f'awsenum_rate_limit_rate{{bucket="{k}"}} {b["rate"]}' for k, b in lim['buckets'].items()]
+    extra.append('# TYPE awsenum_rate_limit_throttles_total counter')
+    extra += [f'awsenum_rate_limit_throttles_total{{bucket="{k}"}} {b["throttles"]}' for k, b in lim['buckets'].items()]
+    extra.append('# TYPE awsenum_rate_limit_wait_seconds_total counter')
+    extra += [f'awsenum_rate_limit_wait_seconds_total{{bucket="{k}"}} {b["waited"]}' for k, b in lim['buckets'].items()]
+    extra += ['# TYPE awsenum_cache_hits_total counter', f'awsenum_cache_hits_total {cache["hits"]}',
+              '# TYPE awsenum_cache_misses_total counter', f'awsenum_cache_misses_total {cache["misses"]}',
+              '# TYPE awsenum_cache_bytes gauge', f'awsenum_cache_bytes {cache["bytes"]}',
+              '# TYPE awsenum_clients gauge', f'awsenum_clients {pool["size"]}']
+    return PlainTextResponse(METRICS.render(extra), media_type='text/plain; version=0.0.4')
 
 @app.get('/_health')
 async def health():
-    return { 'ok': True }
+    return { 'ok': True, 'clients': POOL.stats(), 'cache': CACHE.stats(), 'rate_limit': LIMITER.stats() }
@@ -0,0 +1,196 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from contextlib import contextmanager
+from contextvars import ContextVar
+import bisect
+import threading
+import time
+
+from botocore import xform_name
+
+from .scheduler import current_task
+from .utils import THROTTLE_CODES
+
+# histogram upper bounds, seconds
+API_BUCKETS = (0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0)
+PHASE_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+# (service, operation, account, region)
+CallKey = Tuple[str, str, str, str]
+
+COUNTERS = ('calls', 'cached', 'errors', 'retries', 'throttles', 'bytes', 'pages')
+
+def _labels(k: CallKey) -> str:
+    return f'service="{k[0]}",operation="{k[1]}",account="{k[2]}",region="{k[3]}"'
+
+class Histogram:
+    __slots__ = ('bounds', 'counts', 'sum', 'count')
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, v: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, v)] += 1
+        self.sum += v
+        self.count += 1
+
+    def lines(self, name: str, labels: str) -> Iterator[str]:
+        cum = 0
+        sep = ',' if labels else ''
+        for bound, n in zip(self.bounds + (float('inf'),), self.counts):
+            cum += n
+            yield f'{name}_bucket{{{labels}{sep}le="{"+Inf" if bound == float("inf") else bound}"}} {cum}'
+        yield f'{name}_sum{{{labels}}} {self.sum:.6f}'
+        yield f'{name}_count{{{labels}}} {self.count}'
+
+class Timings:
+    """Per-job breakdown: seconds per post-processing phase and API totals per service and operation."""
+    def __init__(self) -> None:
+        self.phases: Dict[str, float] = {}
+        self.ops: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def add_phase(self, name: str, seconds: float) -> None:
+        with self._lock:
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+
+    def add(self, service: str, operation: str, field: str, v: float) -> None:
+        with self._lock:
+            row = self.ops.setdefault((service, operation), dict.fromkeys(COUNTERS + ('seconds',), 0))
+            row[field] += v
+
+    def to_dict(self, top: int = 10) -> Dict[str, Any]:
+        with self._lock:
+            ops = [{'service': s, 'operation': o, **row} for (s, o), row in self.ops.items()]
+            phases = dict(self.phases)
+        services: Dict[str, Dict[str, float]] = {}
+        for op in ops:
+            row = services.setdefault(op['service'], dict.fromkeys(COUNTERS + ('seconds',), 0))
+            for f in row:
+                row[f] += op[f]
+        for row in [*ops, *services.values()]:
+            row['seconds'] = round(row['seconds'], 3)
+        ops.sort(key=lambda r: -r['seconds'])
+        return {'phases': {k: round(v, 3) for k, v in phases.items()}, 'services': services, 'slowest_operations': ops[:top]}
+
+# the running job's breakdown; tasks and detail sub-pools inherit it through their copied context
+current_timings: ContextVar[Optional[Timings]] = ContextVar('current_timings', default=None)
+
+class Metrics:
+    """
+    Process-wide API call and phase statistics, exposed in the Prometheus text format.
+
+    Installed on clients through botocore events: every call is counted per (service,
+    operation, account, region) with its latency (parameter build to parsed response,
+    retries and rate-limit waits included), retries, throttled attempts, bytes received
+    and pages of paginated operations. Cache hits are counted as calls and as `cached`.
+    """
+    def __init__(self) -> None:
+        self.counters: Dict[CallKey, Dict[str, int]] = {}
+        self.latency: Dict[CallKey, Histogram] = {}
+        self.phases: Dict[str, Histogram] = {}
+        self._pageable: Dict[Tuple[str, str], bool] = {}
+        self._lock = threading.Lock()
+
+    def _count(self, key: CallKey, field: str, v: int = 1) -> None:
+        with self._lock:
+            row = self.counters.get(key)
+            if row is None:
+                row = self.counters[key] = dict.fromkeys(COUNTERS, 0)
+            row[field] += v
+        t = current_timings.get()
+        if t is not None:
+            t.add(key[0], key[1], field, v)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            dt = time.perf_counter() - t0
+            with self._lock:
+                self.phases.setdefault(name, Histogram(PHASE_BUCKETS)).observe(dt)
+            t = current_timings.get()
+            if t is not None:
+                t.add_phase(name, dt)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.counters.clear(); self.latency.clear(); self.phases.clear()
+
+    # --- botocore event handlers -------------------------------------------------
+
+    def install(self, client: Any) -> None:
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name or 'global'
+        events = client.meta.events
+        events.register('before-parameter-build', lambda model, context, **kw: self._start(client, service, model, context))
+        events.register('needs-retry', lambda response, operation, **kw: self._attempt(service, region, operation.name, response))
+        events.register('after-call', lambda http_response, parsed, model, context, **kw: self._done(service, region, model.name, http_response, parsed, context))
+
+    @staticmethod
+    def _key(service: str, region: str, operation: str) -> CallKey:
+        task = current_task.get()
+        return (service, operation, task[0] if task else '', region)
+
+    def _start(self, client: Any, service: str, model: Any, context: Dict[str, Any]) -> None:
+        context['awsenum_t0'] = time.perf_counter()
+        pk = (service, model.name)
+        if pk not in self._pageable:
+            self._pageable[pk] = client.can_paginate(xform_name(model.name))
+
+    def _attempt(self, service: str, region: str, operation: str, response: Optional[Tuple[Any, Dict[str, Any]]]) -> None:
+        if response is not None and (response[1] or {}).get('Error', {}).get('Code') in THROTTLE_CODES:
+            self._count(self._key(service, region, operation), 'throttles')
+
+    def _done(self, service: str, region: str, operation: str, http_response: Any, parsed: Dict[str, Any], context: Dict[str, Any]) -> None:
+        key = self._key(service, region, operation)
+        dt = time.perf_counter() - context.get('awsenum_t0', time.perf_counter())
+        with self._lock:
+            h = self.latency.get(key)
+            if h is None:
+                h = self.latency[key] = Histogram(API_BUCKETS)
+            h.observe(dt)
+        self._count(key, 'calls')
+        t = current_timings.get()
+        if t is not None:
+            t.add(service, operation, 'seconds', dt)
+        if self._pageable.get((service, operation)):
+            self._count(key, 'pages')
+        if context.get('awsenum_cache_hit'):
+            self._count(key, 'cached')
+            return
+        if http_response.status_code >= 300:
+            self._count(key, 'errors')
+        retries = (parsed.get('ResponseMetadata') or {}).get('RetryAttempts') or 0
+        if retries:
+            self._count(key, 'retries', retries)
+        self._count(key, 'bytes', len(http_response.content or b''))
+
+    # --- exposition --------------------------------------------------------------
+
+    def render(self, extra: Optional[List[str]] = None) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        out: List[str] = []
+        with self._lock:
+            counters = {k: dict(v) for k, v in self.counters.items()}
+            latency = list(self.latency.items())
+            phases = list(self.phases.items())
+        for field in COUNTERS:
+            name = f'awsenum_api_{field}_total'
+            out.append(f'# TYPE {name} counter')
+            out.extend(f'{name}{{{_labels(k)}}} {row[field]}' for k, row in counters.items())
+        out.append('# TYPE awsenum_api_latency_seconds histogram')
+        for k, h in latency:
+            out.extend(h.lines('awsenum_api_latency_seconds', _labels(k)))
+        out.append('# TYPE awsenum_phase_seconds histogram')
+        for name, h in phases:
+            out.extend(h.lines('awsenum_phase_seconds', f'phase="{name}"'))
+        out.extend(extra or [])
+        return '\n'.join(out) + '\n'
+
+METRICS = Metrics()
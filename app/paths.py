@@ -0,0 +1,107 @@
+from __future__ import annotations
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+import heapq
+
+from .graph import Edge, Graph
+
+# edges a path may follow, in their own direction (traffic / control flow)
+PATH_EDGE_TYPES: FrozenSet[str] = frozenset({'route', 'sg-rule', 'tg-target', 'listener', 'bind', 'assoc', 'attach', 'derived-reachability'})
+# membership edges (by label) that carry traffic both ways: an ENI and its instance, a security group
+# and its members, a subnet and its resources; see _neighbors for how they may be combined
+CONTAINMENT_LABELS: FrozenSet[str] = frozenset({'eni', 'has-sg', 'in-subnet'})
+MAX_K = 10
+MAX_DEPTH = 16
+
+Step = Tuple[Edge, bool]  # (edge, followed source -> target)
+
+class Path:
+    __slots__ = ('nodes', 'steps')
+
+    def __init__(self, nodes: List[str], steps: List[Step]) -> None:
+        self.nodes = nodes
+        self.steps = steps
+
+    def key(self) -> Tuple[str, ...]:
+        return tuple(e.id for e, _ in self.steps)
+
+    def to_dict(self) -> Dict[str, Any]:
+        hops = []
+        for (e, forward), a, b in zip(self.steps, self.nodes, self.nodes[1:]):
+            hops.append({'from': a, 'to': b, 'edge': e.id, 'type': e.type, 'label': e.label, 'reverse': not forward})
+        return {'length': len(self.steps), 'nodes': self.nodes, 'hops': hops}
+
+def _neighbors(g: Graph, node: str, types: FrozenSet[str], up: Optional[str]) -> List[Tuple[str, Edge, bool]]:
+    """
+    Edges out of `node` in their direction, and containment edges against it. `up` is the
+    label of the containment edge `node` was entered through forward (member -> container):
+    going back down the same kind of edge would hop to a sibling (instance -> sg <- other
+    instance), which is no path, so it is skipped.
+    """
+    out = [(e.target, e, True) for e in g.out_edges(node) if e.type in types]
+    out += [(e.source, e, False) for e in g.in_edges(node)
+            if e.type in types and e.label in CONTAINMENT_LABELS and e.label != up]
+    return out
+
+def _up(e: Edge, forward: bool) -> Optional[str]:
+    return e.label if forward and e.label in CONTAINMENT_LABELS else None
+
+def _bfs(g: Graph, src: str, dst: str, types: FrozenSet[str], max_depth: int,
+         banned_nodes: Set[str] = frozenset(), banned_edges: Set[str] = frozenset(), up: Optional[str] = None) -> Optional[Path]:
+    """Shortest path by hop count, at most `max_depth` hops, avoiding the banned nodes / edges."""
+    # states are (node, label of the containment edge it was entered through forward)
+    start = (src, up)
+    prev: Dict[Tuple[str, Optional[str]], Optional[Tuple[Tuple[str, Optional[str]], Edge, bool]]] = {start: None}
+    frontier = [start]
+    for _ in range(max_depth):
+        nxt = []
+        for state in frontier:
+            for v, e, forward in _neighbors(g, state[0], types, state[1]):
+                sv = (v, _up(e, forward))
+                if sv in prev or v in banned_nodes or v == src or e.id in banned_edges:
+                    continue
+                prev[sv] = (state, e, forward)
+                if v == dst:
+                    nodes, steps = [v], []
+                    while prev[sv] is not None:
+                        s2, e2, f2 = prev[sv]
+                        nodes.append(s2[0]); steps.append((e2, f2)); sv = s2
+                    if len(set(nodes)) == len(nodes):  # a node may be reached in two states; paths stay loop-free
+                        return Path(nodes[::-1], steps[::-1])
+                    continue
+                nxt.append(sv)
+        if not nxt:
+            break
+        frontier = nxt
+    return None
+
+def find_paths(g: Graph, src: str, dst: str, k: int = 3, max_depth: int = MAX_DEPTH,
+               types: Optional[Iterable[str]] = None) -> List[Path]:
+    """Up to `k` shortest loop-free paths from `src` to `dst` (Yen's algorithm over bounded BFS)."""
+    types = frozenset(types) if types else PATH_EDGE_TYPES
+    k = max(1, min(k, MAX_K)); max_depth = max(1, min(max_depth, MAX_DEPTH))
+    if src == dst or not g.has(False, src) or not g.has(False, dst):
+        return []
+    first = _bfs(g, src, dst, types, max_depth)
+    if first is None:
+        return []
+    found = [first]
+    seen = {first.key()}
+    candidates: List[Tuple[int, int, Path]] = []  # (length, tie-break, path)
+    counter = 0
+    while len(found) < k:
+        last = found[-1]
+        for j in range(len(last.steps)):
+            root_nodes = last.nodes[:j + 1]
+            banned_edges = {p.steps[j][0].id for p in found if len(p.steps) > j and p.nodes[:j + 1] == root_nodes}
+            up = _up(*last.steps[j - 1]) if j else None
+            spur = _bfs(g, root_nodes[-1], dst, types, max_depth - j, set(root_nodes[:-1]), banned_edges, up)
+            if spur is None:
+                continue
+            path = Path(root_nodes[:-1] + spur.nodes, last.steps[:j] + spur.steps)
+            if path.key() not in seen:
+                seen.add(path.key())
+                heapq.heappush(candidates, (len(path.steps), counter, path)); counter += 1
+        if not candidates:
+            break
+        found.append(heapq.heappop(candidates)[2])
+    return found
@@ -20,3 +20,21 @@ def summarize_policy(doc: str | Dict[str, Any]) -> List[str]:
         cond = st.get("Condition")
         out.append(f"{eff} {act} on {res} for {prn}{' with conditions' if cond else ''}")
     return out or ["(empty policy)"]
+
+def public_statements(doc: str | Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Allow statements open to any principal ('*') without conditions."""
+    if isinstance(doc, str):
+        try:
+            doc = json.loads(doc)
+        except json.JSONDecodeError:
+            return []
+    sts = (doc or {}).get("Statement", [])
+    if isinstance(sts, dict):
+        sts = [sts]
+    out = []
+    for st in sts:
+        prn = st.get("Principal")
+        aws = prn.get("AWS") if isinstance(prn, dict) else prn
+        if st.get("Effect") == "Allow" and not st.get("Condition") and (aws == "*" or (isinstance(aws, list) and "*" in aws)):
+            out.append(st)
+    return out
@@ -1,49 +1,163 @@
 from __future__ import annotations
-from typing import Dict, Any, List, Tuple, Set
-from .graph import Graph
+from typing import Any, Dict, List, Optional, Tuple
+import ipaddress
 
-def derive_reachability(g: Graph) -> List[Dict[str, Any]]:
+from .cidr import CidrIndex, Net
+from .graph import Edge, Graph, GraphBuffer, Node, POST
+
+INTERNET = 'internet'
+TARGET_TYPES = ('instance', 'eni', 'load_balancer', 'rds_instance')
+
+Rule = Tuple[Net, Dict[str, Any], str]  # (public source, structured rule, security group id)
+
+def _ports(rule: Dict[str, Any]) -> str:
+    proto = rule.get('proto')
+    if proto in ('-1', 'all', None):
+        return 'all'
+    lo, hi = rule.get('from'), rule.get('to')
+    if lo is None or lo == -1:
+        return f'{proto}:all'
+    return f'{proto}:{lo}' if lo == hi else f'{proto}:{lo}-{hi}'
+
+def _exposure(n: Node) -> Optional[str]:
+    """Why `n` can be addressed from the internet at all, or None."""
+    d = n.details
+    if n.type in ('instance', 'eni'):
+        return f"public ip {d['public_ip']}" if d.get('public_ip') else None
+    if n.type == 'load_balancer':
+        return 'internet-facing load balancer' if d.get('scheme') == 'internet-facing' else None
+    if n.type == 'rds_instance':
+        return 'publicly accessible' if d.get('PubliclyAccessible') else None
+    return None
+
+class Reachability:
+    """
+    Internet -> resource evaluation over the graph indexes.
+
+    Route tables, subnet associations and security groups are each evaluated once and cached,
+    so a whole graph is checked in time linear in its size. A resource is reachable when it is
+    exposed (public IP, internet-facing, publicly accessible), one of its security groups admits
+    a public source, and the longest-prefix route covering that source in its subnet's route
+    table (explicit association, else the VPC's main table) leads to an internet gateway, so
+    replies get out. Network ACLs are not evaluated. Routes covering a source are looked up
+    for all route tables at once in the snapshot's CidrIndex.
+    """
+    def __init__(self, g: Graph, cidrs: Optional[CidrIndex] = None) -> None:
+        self.g = g
+        self.cidrs = cidrs if cidrs is not None else CidrIndex(g)
+        self._main: Dict[str, str] = {}  # vpc id -> main route table id
+        for n in g.nodes('route_table'):
+            if n.details.get('main') and n.parent:
+                self._main[n.parent] = n.id
+        self._covering: Dict[Net, Dict[str, Edge]] = {}  # source -> route table id -> route
+        self._subnet_rtb: Dict[str, Optional[Tuple[str, str]]] = {}
+        self._sg_public: Dict[str, List[Rule]] = {}
+
+    def _neighbors(self, n: Node, type_: str) -> List[str]:
+        ids = []
+        for e in self.g.out_edges(n.id, 'attach'):
+            t = self.g.node(e.target)
+            if t is not None and t.type == type_:
+                ids.append(t.id)
+        return ids
+
+    def subnets(self, n: Node) -> List[str]:
+        ids = self._neighbors(n, 'subnet')
+        if not ids and n.parent:
+            p = self.g.node(n.parent)
+            if p is not None and p.type == 'subnet':
+                ids.append(p.id)
+        return ids
+
+    def route_table(self, subnet_id: str) -> Optional[Tuple[str, str]]:
+        """(route table id, 'explicit' | 'main') used by a subnet."""
+        if subnet_id not in self._subnet_rtb:
+            rt = None
+            for e in self.g.out_edges(subnet_id, 'assoc'):
+                t = self.g.node(e.target)
+                if t is not None and t.type == 'route_table':
+                    rt = (t.id, 'explicit'); break
+            if rt is None:
+                subnet = self.g.node(subnet_id)
+                main = self._main.get(subnet.parent) if subnet is not None and subnet.parent else None
+                rt = (main, 'main') if main else None
+            self._subnet_rtb[subnet_id] = rt
+        return self._subnet_rtb[subnet_id]
+
+    def route_for(self, rtb_id: str, src: Net) -> Optional[Edge]:
+        """Longest-prefix route covering all of `src`, i.e. the route replies to it take."""
+        if src not in self._covering:
+            self._covering[src] = self.cidrs.routes_covering(src)
+        return self._covering[src].get(rtb_id)
+
+    def public_ingress(self, sg_id: str) -> List[Rule]:
+        if sg_id not in self._sg_public:
+            rules = []
+            for e in self.g.in_edges(sg_id, 'sg-rule'):
+                if e.details.get('direction') != 'ingress':
+                    continue
+                net = self.cidrs.node_net(e.source)
+                if net is None or net.is_private:
+                    continue
+                rules.extend((net, rule, sg_id) for rule in e.details.get('rules') or [])
+            self._sg_public[sg_id] = rules
+        return self._sg_public[sg_id]
+
+    def evaluate(self, n: Node) -> Optional[Dict[str, Any]]:
+        """Derived internet -> `n` edge (as add_edge kwargs) with its explanation trail, or None."""
+        why = _exposure(n)
+        if why is None:
+            return None
+        sgs = self._neighbors(n, 'security_group')
+        if sgs:
+            allowed = [r for sg in sgs for r in self.public_ingress(sg)]
+        elif n.type == 'load_balancer':
+            # load balancers without security groups (NLB) accept whatever their listeners expose
+            allowed = [(ipaddress.ip_network('0.0.0.0/0'), {'proto': '-1'}, '')]
+        else:
+            return None
+        for subnet_id in self.subnets(n):
+            rt = self.route_table(subnet_id)
+            if rt is None:
+                continue
+            via = [(net, rule, sg, route) for net, rule, sg in allowed
+                   for route in [self.route_for(rt[0], net)] if route is not None and route.details.get('target_type') == 'igw']
+            if not via:
+                continue
+            trail = [why, f'{subnet_id} uses {rt[0]} ({rt[1]})']
+            for net, rule, sg, route in via:
+                step = f"route {route.details['destination']} -> {route.target}"
+                if step not in trail:
+                    trail.append(step)
+                trail.append(f"{sg} allows {_ports(rule)} from {net}" if sg else f"no security group: all from {net}")
+            ports = sorted({_ports(rule) for _, rule, _, _ in via})
+            return {
+                'id_': f'derived:{n.id}:internet',
+                'source': INTERNET,
+                'target': n.id,
+                'label': ', '.join(ports),
+                'type_': 'derived-reachability',
+                'category': 'network',
+                'details': {'trail': trail, 'ports': ports},
+                'derived': True,
+            }
+        return None
+
+def derive_reachability(g: Graph, cidrs: Optional[CidrIndex] = None) -> int:
     """
-    Best-effort reachability edges based on SG rules + routes.
-    Produces dashed ('derived': True) network edges with explanation trail in details.
-    This is intentionally conservative to avoid false positives.
-
-    Note: This implementation is a simplified model and does not account for
-    Network ACLs, host-based firewalls, or complex routing scenarios. A more
-    comprehensive analysis would require a more sophisticated graph traversal
-    and rule evaluation engine.
+    Add dashed ('derived': True) internet -> resource edges, with the explanation trail in
+    details, for every instance, ENI, load balancer and RDS instance the internet can reach.
+    This is intentionally conservative to avoid false positives. Returns the number of edges.
     """
-    els = g.elements()
-    node_by_id = {e['data']['id']: e for e in els if 'source' not in e['data']}
-    edges = [e for e in els if 'source' in e['data']]
-
-    derived_edges = []
-
-    # Example: If an instance is in a public subnet with a public IP, it's reachable.
-    for node_data in node_by_id.values():
-        if node_data['data'].get('type') == 'instance':
-            instance_id = node_data['data']['id']
-            details = node_data['data'].get('details', {})
-            if details.get('public_ip'):
-                # Find the subnet and check for an internet gateway route
-                for edge in edges:
-                    if edge['data']['source'] == instance_id and 'subnet' in edge['data']['target']:
-                        subnet_id = edge['data']['target']
-                        # Now find the route table for this subnet
-                        for rt_edge in edges:
-                            if rt_edge['data']['source'] == subnet_id and 'rtb' in rt_edge['data']['target']:
-                                rtb_id = rt_edge['data']['target']
-                                # Check for a route to an IGW
-                                for route in edges:
-                                    if route['data']['source'] == rtb_id and 'igw' in route['data']['target']:
-                                        derived_edges.append({
-                                            'id': f"derived:{instance_id}:igw",
-                                            'source': 'internet',
-                                            'target': instance_id,
-                                            'label': 'public-ip-and-route',
-                                            'type': 'derived-reachability',
-                                            'category': 'network',
-                                            'derived': True
-                                        })
-
-    return derived_edges
+    r = Reachability(g, cidrs)
+    buf = GraphBuffer()
+    count = 0
+    for type_ in TARGET_TYPES:
+        for n in g.nodes(type_):
+            e = r.evaluate(n)
+            if e is not None:
+                buf.add_edge(**e); count += 1
+    if count:
+        buf.add_node(INTERNET, 'Internet', 'external', details={'cidr': '0.0.0.0/0'})
+    g.commit(buf, POST)
+    return count
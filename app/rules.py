@@ -0,0 +1,303 @@
+"""Built-in findings rules; see `findings.rule` for how to add one."""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+
+from .findings import Context, rule
+from .graph import Edge, Node
+
+# --- security groups -------------------------------------------------------------
+
+SENSITIVE_PORTS: Dict[int, str] = {
+    22: 'SSH', 3389: 'RDP', 23: 'Telnet', 21: 'FTP', 445: 'SMB', 135: 'MS RPC', 139: 'NetBIOS', 5900: 'VNC',
+    3306: 'MySQL', 5432: 'PostgreSQL', 1433: 'SQL Server', 1521: 'Oracle', 27017: 'MongoDB', 6379: 'Redis',
+    11211: 'Memcached', 9200: 'Elasticsearch', 5601: 'Kibana', 9092: 'Kafka', 2375: 'Docker API', 2379: 'etcd',
+    10250: 'Kubelet', 389: 'LDAP', 2049: 'NFS', 9042: 'Cassandra',
+}
+_TCP = ('tcp', '6')
+
+def _all_traffic(r: Dict[str, Any]) -> bool:
+    return r.get('proto') in ('-1', 'all')
+
+def _sensitive(rules: List[Dict[str, Any]]) -> List[int]:
+    """Sensitive TCP ports the given rules open, in port order."""
+    ranges = [(r['from'], r.get('to')) for r in rules if r.get('proto') in _TCP and r.get('from') is not None]
+    return sorted(p for p in SENSITIVE_PORTS if any(lo <= p <= (hi if hi is not None else lo) for lo, hi in ranges))
+
+@rule('sg-public-ingress', 'Public ingress from Internet', 'High', edges=('sg-rule',))
+def _sg_public_ingress(ctx: Context, e: Edge) -> Optional[str]:
+    rules = [r for r in ctx.public_ingress(e) if not _all_traffic(r)]
+    if not rules:
+        return None
+    ports = _sensitive(rules)
+    exposed = f", exposes {', '.join(f'{SENSITIVE_PORTS[p]} ({p})' for p in ports)}" if ports else ''
+    return f'{e.label} to {e.target}{exposed}'
+
+@rule('sg-public-all-traffic', 'All traffic allowed from Internet', 'Critical', edges=('sg-rule',))
+def _sg_public_all(ctx: Context, e: Edge) -> Optional[str]:
+    return f'all protocols and ports to {e.target}' if any(_all_traffic(r) for r in ctx.public_ingress(e)) else None
+
+@rule('sg-public-wide-port-range', 'Wide port range open to Internet', 'Medium', edges=('sg-rule',))
+def _sg_wide_range(ctx: Context, e: Edge) -> Optional[str]:
+    wide = [r for r in ctx.public_ingress(e) if r.get('from') is not None and r.get('from') != -1 and (r.get('to') or 0) - r['from'] >= 1000]
+    return ', '.join(f"{r['proto']}:{r['from']}-{r['to']}" for r in wide) + f' to {e.target}' if wide else None
+
+@rule('sg-default-in-use', 'Default security group has rules', 'Low', nodes=('security_group',))
+def _sg_default(ctx: Context, n: Node) -> Optional[str]:
+    if n.details.get('name') != 'default':
+        return None
+    count = len(ctx.g.in_edges(n.id, 'sg-rule')) + len(ctx.g.out_edges(n.id, 'sg-rule'))
+    return f'{n.label} has {count} rule edge(s)' if count else None
+
+@rule('sg-unused', 'Security group not attached to anything', 'Info', nodes=('security_group',))
+def _sg_unused(ctx: Context, n: Node) -> Optional[str]:
+    # only groups described by the EC2 enumerator; peers referenced from other accounts have no name
+    if n.details.get('name') is None or n.details['name'] == 'default' or ctx.g.in_edges(n.id, 'attach'):
+        return None
+    return n.label
+
+# --- load balancers ----------------------------------------------------------------
+
+WEAK_TLS_POLICIES = frozenset({
+    'ELBSecurityPolicy-2015-05', 'ELBSecurityPolicy-2016-08', 'ELBSecurityPolicy-TLS-1-0-2015-04',
+    'ELBSecurityPolicy-TLS-1-1-2017-01', 'ELBSecurityPolicy-FS-2018-06', 'ELBSecurityPolicy-FS-1-1-2019-08',
+})
+
+def _public_listener(ctx: Context, e: Edge) -> Optional[Node]:
+    """The internet-facing load balancer an edge is a public listener of."""
+    lb = ctx.g.node(e.target)
+    if lb is None or lb.details.get('scheme') != 'internet-facing' or not ctx.is_internet(e.source):
+        return None
+    return lb
+
+@rule('lb-listener', 'Internet-facing LB with public listener', 'Medium', edges=('listener',))
+def _lb_listener(ctx: Context, e: Edge) -> Optional[str]:
+    lb = _public_listener(ctx, e)
+    return f'{lb.label} has listener {e.label}' if lb else None
+
+@rule('lb-http-listener', 'Internet-facing LB listens on plain HTTP', 'Medium', edges=('listener',))
+def _lb_http(ctx: Context, e: Edge) -> Optional[str]:
+    lb = _public_listener(ctx, e)
+    return f'{lb.label} has listener {e.label}' if lb and e.details.get('protocol') == 'HTTP' else None
+
+@rule('lb-weak-tls-policy', 'Load balancer listener allows old TLS versions', 'Medium', edges=('listener',))
+def _lb_tls(ctx: Context, e: Edge) -> Optional[str]:
+    policy = e.details.get('ssl_policy')
+    return f'{e.label} on {e.target} uses {policy}' if policy in WEAK_TLS_POLICIES else None
+
+@rule('lb-no-security-group', 'Internet-facing load balancer without security groups', 'Low', nodes=('load_balancer',))
+def _lb_no_sg(ctx: Context, n: Node) -> Optional[str]:
+    d = n.details
+    return f'{n.label} accepts whatever its listeners expose' if d.get('scheme') == 'internet-facing' and d.get('security_groups') == 0 else None
+
+# --- compute -----------------------------------------------------------------------
+
+@rule('internet-reachable', 'Resource reachable from the Internet', 'Medium', nodes=('instance', 'eni'))
+def _reachable(ctx: Context, n: Node) -> Optional[str]:
+    e = ctx.internet_reachable(n)
+    return f'{n.label}: {e.label}' if e else None
+
+@rule('instance-imdsv1', 'Instance allows IMDSv1', 'Medium', nodes=('instance',))
+def _imdsv1(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('imds_tokens') == 'optional' and not ctx.internet_reachable(n) else None
+
+@rule('instance-public-imdsv1', 'Internet-reachable instance allows IMDSv1', 'High', nodes=('instance',))
+def _public_imdsv1(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('imds_tokens') == 'optional' and ctx.internet_reachable(n) else None
+
+@rule('instance-no-profile', 'Instance without an IAM instance profile', 'Info', nodes=('instance',))
+def _no_profile(ctx: Context, n: Node) -> Optional[str]:
+    d = n.details
+    return n.label if 'instance_profile' in d and not d['instance_profile'] and d.get('state') != 'terminated' else None
+
+DEPRECATED_RUNTIMES = frozenset({
+    'python2.7', 'python3.6', 'python3.7', 'python3.8', 'nodejs', 'nodejs4.3', 'nodejs6.10', 'nodejs8.10', 'nodejs10.x',
+    'nodejs12.x', 'nodejs14.x', 'nodejs16.x', 'ruby2.5', 'ruby2.7', 'dotnetcore1.0', 'dotnetcore2.0', 'dotnetcore2.1',
+    'dotnetcore3.1', 'dotnet5.0', 'dotnet6', 'go1.x', 'java8',
+})
+
+@rule('lambda-public-policy', 'Lambda function policy allows any principal', 'High', nodes=('lambda',))
+def _lambda_public(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('public_policy') else None
+
+@rule('lambda-deprecated-runtime', 'Lambda runtime is deprecated', 'Medium', nodes=('lambda',))
+def _lambda_runtime(ctx: Context, n: Node) -> Optional[str]:
+    rt = n.details.get('runtime')
+    return f'{n.label} runs {rt}' if rt in DEPRECATED_RUNTIMES else None
+
+@rule('lambda-no-dlq', 'Lambda function has no dead-letter queue', 'Low', nodes=('lambda',))
+def _lambda_dlq(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('dlq') is False and not ctx.g.out_edges(n.id, 'invoke') else None
+
+@rule('lambda-no-tracing', 'Lambda function without active tracing', 'Info', nodes=('lambda',))
+def _lambda_tracing(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('tracing') == 'PassThrough' else None
+
+@rule('ecr-no-scan-on-push', 'ECR repository does not scan images on push', 'Medium', nodes=('ecr_repo',))
+def _ecr_scan(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('scan_on_push') is False else None
+
+@rule('ecr-mutable-tags', 'ECR repository allows tag overwrites', 'Low', nodes=('ecr_repo',))
+def _ecr_mutable(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('tag_mutability') == 'MUTABLE' else None
+
+@rule('ecr-no-kms', 'ECR repository not encrypted with KMS', 'Info', nodes=('ecr_repo',))
+def _ecr_kms(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('encryption') == 'AES256' else None
+
+@rule('eks-public-endpoint', 'EKS API endpoint open to the Internet', 'High', nodes=('eks_cluster',))
+def _eks_public(ctx: Context, n: Node) -> Optional[str]:
+    d = n.details
+    return n.label if d.get('public_endpoint') and '0.0.0.0/0' in (d.get('public_cidrs') or []) else None
+
+@rule('eks-no-secrets-encryption', 'EKS secrets not envelope-encrypted', 'Medium', nodes=('eks_cluster',))
+def _eks_secrets(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('secrets_encrypted') is False else None
+
+@rule('eks-no-audit-logging', 'EKS control plane audit logging disabled', 'Low', nodes=('eks_cluster',))
+def _eks_logging(ctx: Context, n: Node) -> Optional[str]:
+    logging = n.details.get('logging')
+    return n.label if logging is not None and 'audit' not in logging else None
+
+# --- data stores -------------------------------------------------------------------
+
+@rule('rds-public', 'RDS instance is publicly accessible', 'High', nodes=('rds_instance',))
+def _rds_public(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('PubliclyAccessible') and not ctx.internet_reachable(n) else None
+
+@rule('rds-internet-reachable', 'RDS instance reachable from the Internet', 'Critical', nodes=('rds_instance',))
+def _rds_reachable(ctx: Context, n: Node) -> Optional[str]:
+    e = ctx.internet_reachable(n)
+    return f'{n.label}: {e.label}' if e else None
+
+@rule('rds-unencrypted', 'RDS storage not encrypted', 'High', nodes=('rds_instance',))
+def _rds_encrypted(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('encrypted') is False else None
+
+@rule('rds-no-backups', 'RDS automated backups disabled', 'Medium', nodes=('rds_instance',))
+def _rds_backups(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('backup_retention') == 0 else None
+
+@rule('rds-single-az', 'RDS instance is not Multi-AZ', 'Low', nodes=('rds_instance',))
+def _rds_multi_az(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('multi_az') is False else None
+
+@rule('rds-no-deletion-protection', 'RDS deletion protection disabled', 'Low', nodes=('rds_instance',))
+def _rds_deletion(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('deletion_protection') is False else None
+
+@rule('rds-no-minor-upgrades', 'RDS automatic minor version upgrades disabled', 'Low', nodes=('rds_instance',))
+def _rds_minor(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('minor_upgrade') is False else None
+
+@rule('rds-no-iam-auth', 'RDS IAM database authentication disabled', 'Info', nodes=('rds_instance',))
+def _rds_iam(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('iam_auth') is False else None
+
+@rule('elasticache-no-transit-encryption', 'ElastiCache traffic not encrypted in transit', 'Medium', nodes=('elasticache',))
+def _ec_transit(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('transit_encryption') is False else None
+
+@rule('elasticache-no-at-rest-encryption', 'ElastiCache data not encrypted at rest', 'Medium', nodes=('elasticache',))
+def _ec_rest(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('at_rest_encryption') is False else None
+
+@rule('elasticache-redis-no-auth', 'Redis cluster without AUTH token', 'Medium', nodes=('elasticache',))
+def _ec_auth(ctx: Context, n: Node) -> Optional[str]:
+    d = n.details
+    return n.label if d.get('engine') == 'redis' and d.get('auth_token') is False else None
+
+@rule('elasticache-no-snapshots', 'Redis cluster without automatic snapshots', 'Low', nodes=('elasticache',))
+def _ec_snapshots(ctx: Context, n: Node) -> Optional[str]:
+    d = n.details
+    return n.label if d.get('engine') == 'redis' and d.get('snapshot_retention') == 0 else None
+
+@rule('msk-plaintext', 'MSK accepts plaintext client traffic', 'High', nodes=('msk_cluster',))
+def _msk_plaintext(ctx: Context, n: Node) -> Optional[str]:
+    cb = n.details.get('client_broker')
+    return f'{n.label}: {cb}' if cb in ('PLAINTEXT', 'TLS_PLAINTEXT') else None
+
+@rule('msk-public-access', 'MSK brokers publicly accessible', 'High', nodes=('msk_cluster',))
+def _msk_public(ctx: Context, n: Node) -> Optional[str]:
+    pa = n.details.get('public_access')
+    return n.label if pa and pa != 'DISABLED' else None
+
+@rule('msk-unauthenticated', 'MSK allows unauthenticated clients', 'High', nodes=('msk_cluster',))
+def _msk_unauth(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('unauthenticated') else None
+
+@rule('msk-plaintext-in-cluster', 'MSK broker-to-broker traffic not encrypted', 'Medium', nodes=('msk_cluster',))
+def _msk_in_cluster(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('in_cluster') is False else None
+
+# --- edge / API services --------------------------------------------------------------
+
+@rule('cloudfront-allows-http', 'CloudFront allows plain HTTP viewers', 'Medium', nodes=('cloudfront',))
+def _cf_http(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('viewer_protocol') == 'allow-all' else None
+
+@rule('cloudfront-old-tls', 'CloudFront allows old TLS versions', 'Medium', nodes=('cloudfront',))
+def _cf_tls(ctx: Context, n: Node) -> Optional[str]:
+    v = n.details.get('min_tls')
+    return f'{n.label}: {v}' if v in ('SSLv3', 'TLSv1', 'TLSv1_2016', 'TLSv1.1_2016') else None
+
+@rule('cloudfront-no-waf', 'CloudFront distribution without WAF', 'Low', nodes=('cloudfront',))
+def _cf_waf(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if 'waf' in n.details and not n.details['waf'] else None
+
+@rule('apigw-stage-no-waf', 'API Gateway stage without WAF', 'Low', nodes=('api_gw_stage',))
+def _apigw_waf(ctx: Context, n: Node) -> Optional[str]:
+    return f'{n.parent}: {n.label}' if 'waf' in n.details and not n.details['waf'] else None
+
+@rule('apigw-stage-no-logging', 'API Gateway stage without execution logging', 'Low', nodes=('api_gw_stage',))
+def _apigw_logging(ctx: Context, n: Node) -> Optional[str]:
+    return f'{n.parent}: {n.label}' if n.details.get('logging') is False else None
+
+@rule('apigw-stage-no-tracing', 'API Gateway stage without X-Ray tracing', 'Info', nodes=('api_gw_stage',))
+def _apigw_tracing(ctx: Context, n: Node) -> Optional[str]:
+    return f'{n.parent}: {n.label}' if n.details.get('tracing') is False else None
+
+# --- network -----------------------------------------------------------------------
+
+@rule('vpc-default', 'Default VPC present', 'Info', nodes=('vpc',))
+def _vpc_default(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('default') else None
+
+@rule('subnet-auto-public-ip', 'Subnet assigns public IPs on launch', 'Low', nodes=('subnet',))
+def _subnet_public(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('public_on_launch') else None
+
+@rule('vpce-full-access-policy', 'VPC endpoint policy allows any principal', 'Low', nodes=('vpc_endpoint',))
+def _vpce_policy(ctx: Context, n: Node) -> Optional[str]:
+    return f"{n.label} ({n.details.get('service')})" if n.details.get('public_policy') else None
+
+@rule('igw-detached', 'Internet gateway not attached to a VPC', 'Info', nodes=('igw',))
+def _igw_detached(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('attached') is False else None
+
+@rule('pcx-cross-account', 'VPC peering with another account', 'Info', nodes=('pcx',))
+def _pcx_cross(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('cross_account') and n.details.get('status') == 'active' else None
+
+def _peering_conflicts(ctx: Context) -> Dict[str, List[Dict[str, Any]]]:
+    """Peering conflicts of the whole graph by peering connection id, worked out once per run."""
+    def compute() -> Dict[str, List[Dict[str, Any]]]:
+        out: Dict[str, List[Dict[str, Any]]] = {}
+        for c in ctx.cidrs.peering_conflicts()['conflicts']:
+            for pcx in c['pcx'] if isinstance(c['pcx'], list) else [c['pcx']]:
+                out.setdefault(pcx, []).append(c)
+        return out
+    return ctx.memo('peering_conflicts', '', compute)
+
+# depends on every VPC's CIDRs and every route to a peering, none of which need be next to the pcx node
+@rule('pcx-cidr-conflict', 'VPC peering with overlapping address space', 'Medium', nodes=('pcx',), whole_graph=True)
+def _pcx_conflict(ctx: Context, n: Node) -> Optional[str]:
+    found = _peering_conflicts(ctx).get(n.id)
+    return '; '.join(f"{c['type']}: {' / '.join(c['cidrs'])}" for c in found) if found else None
+
+@rule('tgw-auto-accept', 'Transit gateway auto-accepts shared attachments', 'Medium', nodes=('tgw',))
+def _tgw_auto(ctx: Context, n: Node) -> Optional[str]:
+    return n.label if n.details.get('auto_accept') == 'enable' else None
+
+@rule('route-blackhole', 'Route points at a deleted target', 'Low', edges=('route',))
+def _route_blackhole(ctx: Context, e: Edge) -> Optional[str]:
+    return f"{e.source}: {e.details.get('destination')} -> {e.target}" if e.details.get('state') == 'blackhole' else None
@@ -0,0 +1,323 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Set, Tuple
+from contextvars import copy_context
+import boto3
+import orjson
+
+from .graph import Graph, GraphBuffer, Node, POST
+from .snapshots import STORE, Snapshot, scope_of
+from .scheduler import Scheduler, TaskKey, WORKERS, ACCOUNT_WORKERS, SERVICE_WORKERS, current_task
+from .cidr import CidrIndex
+from .reachability import derive_reachability
+from .findings import analyze as analyze_findings
+from .layout import MODES as VIEW_MODES, snapshot_layout
+from .search import snapshot_search
+from .metrics import METRICS, Timings, current_timings
+from .aws.clients import client
+from .utils import DETAIL_MODES, detail_mode
+from .aws import cache
+from .aws.session import build_root_session, assume_roles, discover_regions
+from .aws import ec2, elbv2, lambda_, apigw, s3, sqs_sns, dynamodb, kinesis, stepfunctions, ecs, rds, route53_cf, ecr, opensearch, elasticache, msk, nacl_tgw_vpn_dx, eks
+
+if TYPE_CHECKING:
+    from .jobs import Job
+
+GLOBAL_SERVICES = ('s3', 'route53_cf')
+
+SVC_LIST = [
+    ('ec2', ec2.enumerate),
+    ('elbv2', elbv2.enumerate),
+    ('lambda', lambda_.enumerate),
+    ('apigw', apigw.enumerate),
+    ('eks', eks.enumerate),
+    ('s3', s3.enumerate),       # global
+    ('sqs_sns', sqs_sns.enumerate),
+    ('dynamodb', dynamodb.enumerate),
+    ('kinesis', kinesis.enumerate),
+    ('stepfunctions', stepfunctions.enumerate),
+    ('ecs', ecs.enumerate),
+    ('rds', rds.enumerate),
+    ('route53_cf', route53_cf.enumerate),  # global mostly
+    ('ecr', ecr.enumerate),
+    ('opensearch', opensearch.enumerate),
+    ('elasticache', elasticache.enumerate),
+    ('msk', msk.enumerate),
+    ('nacl_tgw_vpn_dx', nacl_tgw_vpn_dx.enumerate),
+]
+
+# cheap change signals; services without one (EC2, ELBv2, ...) are enumerated again by every incremental scan
+FINGERPRINTS = {
+    'lambda': lambda_.fingerprint,
+    's3': s3.fingerprint,
+}
+
+# services whose per-resource details can be fetched later, for nodes scanned with details='lazy'
+LAZY_DETAILS = {
+    'lambda': ('lambda', lambda_.details),  # node type -> (service, loader)
+}
+
+def _run_fn(fn, sess, key: TaskKey, g: Graph) -> List[str]:
+    """Run one enumerator into a private buffer, then merge its output into `g` as owned by `key`."""
+    account_id, region, name = key
+    ww = []
+    buf = GraphBuffer()
+    try:
+        fn(sess, account_id, region, buf, ww)
+    except Exception as e:
+        ww.append(f"{name} {account_id}/{region}: {e}")
+    g.commit(buf, key)
+    return ww
+
+def add_containers(g: Graph, nodes: Optional[List[Node]] = None) -> None:
+    """Account/Region container parents (for Account view), for `nodes` (default: all of them)."""
+    nodes = g.nodes() if nodes is None else nodes
+    by_acc: dict[str, set[str]] = {}
+    for n in nodes:
+        by_acc.setdefault(n.account_id or 'self', set()).add(n.region or 'global')
+
+    for acc, regs in by_acc.items():
+        g.add_node(f'account:{acc}', f'Account {acc}', 'account', None)
+        for reg in regs:
+            g.add_node(f'account:{acc}:region:{reg}', f'{reg}', 'region', reg, parent=f'account:{acc}')
+    for n in nodes:
+        if not n.parent:
+            g.set_parent(n.id, f'account:{n.account_id or "self"}:region:{n.region or "global"}')
+
+def _diff(g: Graph, before: Set[Tuple[bool, str]], touched: Dict[Tuple[bool, str], Dict[str, Any]], removed: Dict[Tuple[bool, str], bytes]) -> Dict[str, Any]:
+    """Added / changed elements and removed ids of an incremental scan, relative to the base snapshot."""
+    added, changed = [], []
+    for ek, el in touched.items():
+        if not g.has(*ek):
+            continue
+        if ek not in before:
+            added.append(el)
+        elif ek not in removed or orjson.dumps(el) != removed[ek]:
+            changed.append(el)
+    gone = [ek[1] for ek in removed if ek in before and not g.has(*ek)]
+    return {'added': added, 'changed': changed, 'removed': gone}
+
+def _changed_keys(touched: Dict[Tuple[bool, str], Dict[str, Any]], removed: Dict[Tuple[bool, str], bytes]) -> Set[Tuple[bool, str]]:
+    """(is_edge, id) of every touched or removed element, plus the endpoints of removed edges."""
+    keys = set(touched) | set(removed)
+    for (is_edge, _), blob in removed.items():
+        if is_edge:
+            d = orjson.loads(blob)['data']
+            keys.update(((False, d['source']), (False, d['target'])))
+    return keys
+
+def run_scan(job: Job) -> Optional[Dict[str, Any]]:
+    """
+    Enumerate everything `job.payload` asks for. Returns None if the job was cancelled.
+
+    With `incremental` in the payload and a snapshot of the same scope available, a copy of
+    the snapshot's graph is patched: services whose fingerprint is unchanged keep their
+    elements, every other task is dropped and enumerated again, and the result carries
+    only added / changed / removed elements. The base snapshot stays readable meanwhile.
+    """
+    payload = job.payload
+    ak = payload.get('access_key_id'); sk = payload.get('secret_access_key'); st = payload.get('session_token')
+    profile = payload.get('profile'); role_arns = payload.get('assume_roles') or []
+    regions = payload.get('regions') or []
+
+    root = build_root_session(ak, sk, st, profile)
+    sessions = assume_roles(root, role_arns)
+    all_regions = regions
+    if not all_regions or all_regions == ['ALL']:
+        all_regions = discover_regions(root)
+
+    scope = scope_of(payload, all_regions)
+    base = STORE.latest(scope) if payload.get('incremental') else None
+    # a fresh context per scan: max_age / detail_mode / timings must not outlive it on a reused pool thread
+    return copy_context().run(_scan, job, sessions, all_regions, scope, base)
+
+def _scan(job: Job, sessions: Dict[str, Optional[boto3.Session]], all_regions: List[str], scope: str, base: Optional[Snapshot]) -> Optional[Dict[str, Any]]:
+    payload = job.payload
+    services = payload.get('services') or {}  # service toggles
+
+    g = base.graph.copy(track_changes=True) if base else Graph(track_changes=True)
+    before = g.keys() if base else set()
+    touched: Dict[Tuple[bool, str], Dict[str, Any]] = {}
+    removed: Dict[Tuple[bool, str], bytes] = {}
+    fingerprints: Dict[TaskKey, Any] = dict(base.fingerprints) if base else {}
+    scheduled: Set[TaskKey] = set()
+    accounts: Dict[str, boto3.Session] = {}
+    callers: Dict[str, str] = {}  # account id -> caller ARN, scopes the response cache
+    warnings: List[str] = []
+    # inherited by every task: caps the age of cached API responses for this scan
+    if payload.get('max_age') is not None:
+        cache.max_age.set(float(payload['max_age']))
+    if payload.get('details') in DETAIL_MODES:
+        detail_mode.set(payload['details'])
+    # collapsed clients load containers on demand (app.subgraph): events only report progress
+    collapsed = bool(payload.get('collapsed'))
+    timings = Timings()
+    current_timings.set(timings)
+
+    def _identity(account_arn: str, sess: boto3.Session) -> str:
+        try:
+            sts = client(sess, 'sts')
+            me = sts.get_caller_identity()
+            callers[me.get('Account')] = me.get('Arn')
+            return me.get('Account')
+        except Exception as e:
+            warnings.append(f"sts failed: {e}")
+            return account_arn or 'self'
+
+    def _service(key: TaskKey, fn: Callable[..., Any], sess: boto3.Session) -> Tuple[List[str], bool]:
+        """Returns (warnings, reused); reused means the base snapshot's elements were kept."""
+        account_id, region, svc = key
+        cache.principal.set(callers.get(account_id))  # this task's own context (see Scheduler)
+        fp_fn = FINGERPRINTS.get(svc)
+        fp = None
+        if fp_fn is not None:
+            token = cache.max_age.set(0)  # fingerprints must see live state
+            try:
+                fp = fp_fn(sess, account_id, region)
+            except Exception:
+                fp = None
+            finally:
+                cache.max_age.reset(token)
+            fingerprints[key] = fp
+        if base is not None:
+            if fp is not None and base.fingerprints.get(key) == fp:
+                return [], True
+            g.remove_owner(key)
+            if fp is not None:
+                cache.max_age.set(0)  # known to have changed: cached responses are stale
+        return _run_fn(fn, sess, key, g), False
+
+    def _tracked(key: TaskKey, fn: Callable[..., Any], *args: Any) -> Any:
+        job.task_started(key)
+        return fn(*args)
+
+    def _queue(key: TaskKey, fn: Callable[..., Any], *args: Any) -> None:
+        job.task_queued(key)
+        if not sched.submit(key, _tracked, key, fn, *args):
+            job.task_finished(key, 'cancelled')
+
+    def _drain() -> Tuple[List[Dict[str, Any]], List[str]]:
+        els = g.drain_changes()
+        for el in els:
+            touched[('source' in el['data'], el['data']['id'])] = el
+        rm = g.drain_removed()
+        for ek, blob in rm.items():
+            removed.setdefault(ek, blob)
+        return els, [ek[1] for ek in rm if not g.has(*ek)]
+
+    # every (account, region, service) task goes through one shared queue
+    sched = Scheduler(
+        workers=int(payload.get('workers') or WORKERS),
+        per_account=int(payload.get('account_workers') or ACCOUNT_WORKERS),
+        per_service=int(payload.get('service_workers') or SERVICE_WORKERS),
+    )
+    job.attach(sched)
+    enabled = [(name, fn) for name, fn in SVC_LIST if not (services and services.get(name) is False)]
+    for arn, sess in sessions.items():
+        if sess is None:
+            warnings.append(f"AssumeRole failed: {arn}"); continue
+        _queue((arn, 'global', 'sts'), _identity, arn, sess)
+
+    reused = 0
+    with METRICS.phase('enumerate'):
+        for key, fut in sched.run():
+            acc, region, name = key
+            if name == 'sts':
+                # identity resolved: queue this account's global and regional services
+                sess = sessions[acc]; account_id = fut.result()
+                accounts[account_id] = sess
+                job.task_finished(key)
+                for svc, fn in enabled:
+                    for r in (['global'] if svc in GLOBAL_SERVICES else all_regions):
+                        scheduled.add((account_id, r, svc))
+                        _queue((account_id, r, svc), _service, (account_id, r, svc), fn, sess)
+                continue
+            w, kept = fut.result()
+            reused += kept
+            job.task_finished(key, 'unchanged' if kept else 'done')
+            if w: warnings.extend(w)
+            els, gone = _drain()
+            job.emit({
+                'event': 'batch',
+                'task': {'account_id': acc, 'region': region, 'service': name},
+                'elements': [] if collapsed else els,
+                'removed': [] if collapsed else gone,
+                'warnings': w,
+            })
+
+    if job.cancelled:
+        return None
+
+    if base is not None:
+        # tasks of the base snapshot that did not run this time (e.g. AssumeRole failed), and
+        # containers / derived edges, which are rebuilt below
+        for key in g.owner_keys() - scheduled:
+            g.remove_owner(key)
+        g.remove_owner(POST)
+
+    with METRICS.phase('containers'):
+        add_containers(g)
+    with METRICS.phase('reachability'):
+        cidrs = CidrIndex(g)  # shared with the findings and kept with the snapshot
+        derive_reachability(g, cidrs)
+
+    # containers, re-parented nodes and derived edges the batches have not carried yet
+    els, gone = _drain()
+    with METRICS.phase('findings'):
+        if base is not None:
+            # only what changed since the base snapshot (and its neighborhood) is evaluated again
+            findings = analyze_findings(g, _changed_keys(touched, removed), base.findings, cidrs=cidrs)
+        else:
+            findings = analyze_findings(g, cidrs=cidrs)
+
+    snap = Snapshot(scope, g, warnings, findings, fingerprints, accounts)
+    snap.cidrs = cidrs
+    # positions for the client's current view; other views are computed on request (GET /layout)
+    view = payload.get('view') if payload.get('view') in VIEW_MODES else 'vpc'
+    layout = None
+    if not collapsed:  # positions of every node would defeat loading on demand
+        with METRICS.phase('layout'):
+            layout = {'mode': view, 'positions': snapshot_layout(snap, view)}
+    else:
+        with METRICS.phase('index'):  # collapsed clients search on the server; others build it on first /search
+            snapshot_search(snap)
+    STORE.put(snap)
+    stats = {'tasks': len(scheduled), 'reused': reused}
+
+    job.emit({'event': 'final', 'elements': [] if collapsed else els, 'removed': [] if collapsed else gone, 'warnings': warnings,
+              'findings': findings, 'layout': layout, 'snapshot_id': snap.id})
+    with METRICS.phase('elements'):  # the result's element dicts; encoding is timed in app.wire
+        if base is not None:
+            out = { 'incremental': True, 'base_snapshot': base.id, 'snapshot_id': snap.id, **_diff(g, before, touched, removed) }
+        else:
+            out = { 'elements': g.elements(), 'snapshot_id': snap.id }
+    return { **out, 'layout': layout, 'warnings': warnings, 'findings': findings, 'stats': stats, 'timings': timings.to_dict() }
+
+def load_details(snap: Snapshot, node_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch the deferred details of one node into `snap`'s graph. Returns the node and its
+    outgoing edges as elements plus warnings, or None if the node has no deferred details.
+    """
+    g = snap.graph
+    node = g.node(node_id)
+    entry = LAZY_DETAILS.get(node.type) if node is not None else None
+    sess = snap.sessions.get(node.account_id) if node is not None else None
+    if entry is None or sess is None:
+        return None
+    svc, loader = entry
+    key: TaskKey = (node.account_id, node.region, svc)
+    buf = GraphBuffer(); warnings: List[str] = []
+    token = current_task.set(key)  # cache entries are per account
+    try:
+        loader(sess, node.account_id, node.region, node, buf, warnings)
+    finally:
+        current_task.reset(token)
+    before = g.counts()
+    g.commit(buf, key)  # owned by the service task, so the next incremental scan replaces them
+    edges = g.out_edges(node_id)
+    targets = [n for n in map(g.node, dict.fromkeys(e.target for e in edges)) if n is not None]
+    if g.counts() != before:
+        add_containers(g, [n for n in targets if not n.parent])  # new destinations go under their region
+        with snap.lock:  # rebuilt on the next query, with the new elements
+            snap.search = None; snap.hierarchy = None; snap.layouts = {}
+    elements = [n.to_element() for n in [node] + targets] + [e.to_element() for e in edges]
+    return {'elements': elements, 'warnings': warnings}
@@ -0,0 +1,117 @@
+from __future__ import annotations
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Tuple
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+import os
+import threading
+
+WORKERS = int(os.environ.get('WORKERS', '24'))
+# upper bound for a per-request `workers`; the HTTP connection pools are sized for it (see aws.clients)
+MAX_WORKERS = max(WORKERS, int(os.environ.get('MAX_WORKERS', '64')))
+ACCOUNT_WORKERS = int(os.environ.get('ACCOUNT_WORKERS', '8'))
+SERVICE_WORKERS = int(os.environ.get('SERVICE_WORKERS', '8'))
+
+# (account, region, service)
+TaskKey = Tuple[str, str, str]
+
+# key of the task the current thread is running, for code below the enumerators (cache, metrics)
+current_task: ContextVar[Optional[TaskKey]] = ContextVar('current_task', default=None)
+
+def _call_as(key: TaskKey, fn: Callable[..., Any], args: tuple) -> Any:
+    current_task.set(key)
+    return fn(*args)
+
+class Scheduler:
+    """
+    One bounded work queue for every (account, region, service) task of a scan.
+
+    At most `workers` (capped at MAX_WORKERS) tasks run at once, no more than `per_account` of them for the
+    same account and no more than `per_service` for the same service. Tasks wait in
+    per-(account, service) buckets that are visited round-robin, so a saturated
+    account or service never blocks work that could run elsewhere.
+    `submit` may be called while `run` is iterating (e.g. from a finished task's result).
+    `cancel` drops everything still queued; tasks already running are left to finish.
+    Each task runs in a copy of the submitter's context with `current_task` set to its key.
+    """
+    def __init__(self, workers: int = WORKERS, per_account: int = ACCOUNT_WORKERS, per_service: int = SERVICE_WORKERS) -> None:
+        self.workers = max(1, min(int(workers), MAX_WORKERS))
+        self.per_account = max(1, int(per_account))
+        self.per_service = max(1, int(per_service))
+        self._buckets: "OrderedDict[Tuple[str, str], Deque[Tuple[TaskKey, Callable[..., Any], tuple]]]" = OrderedDict()
+        self._running_acc: Dict[str, int] = {}
+        self._running_svc: Dict[str, int] = {}
+        self._inflight = 0
+        self._done: Deque[Tuple[TaskKey, Future]] = deque()
+        self._cond = threading.Condition()
+        self.cancelled = False
+
+    def submit(self, key: TaskKey, fn: Callable[..., Any], *args: Any) -> bool:
+        """Queue a task; returns False (and drops it) once the scheduler is cancelled."""
+        with self._cond:
+            if self.cancelled:
+                return False
+            ctx = copy_context()
+            self._buckets.setdefault((key[0], key[2]), deque()).append((key, ctx.run, (_call_as, key, fn, args)))
+            self._cond.notify()
+            return True
+
+    def cancel(self) -> List[TaskKey]:
+        """Drop all queued tasks and refuse new ones. Returns the keys that were dropped."""
+        with self._cond:
+            self.cancelled = True
+            dropped = [key for bucket in self._buckets.values() for key, _, _ in bucket]
+            self._buckets.clear()
+            self._cond.notify_all()
+            return dropped
+
+    def pending(self) -> int:
+        with self._cond:
+            return sum(len(b) for b in self._buckets.values())
+
+    def _next_eligible(self) -> Optional[Tuple[TaskKey, Callable[..., Any], tuple]]:
+        for bkey in list(self._buckets):
+            acc, svc = bkey
+            if self._running_acc.get(acc, 0) >= self.per_account or self._running_svc.get(svc, 0) >= self.per_service:
+                continue
+            bucket = self._buckets.pop(bkey)
+            item = bucket.popleft()
+            if bucket:
+                self._buckets[bkey] = bucket  # re-insert at the end: round-robin
+            return item
+        return None
+
+    def _dispatch(self, pool: ThreadPoolExecutor) -> None:
+        while self._inflight < self.workers:
+            item = self._next_eligible()
+            if item is None:
+                return
+            key, fn, args = item
+            self._inflight += 1
+            self._running_acc[key[0]] = self._running_acc.get(key[0], 0) + 1
+            self._running_svc[key[2]] = self._running_svc.get(key[2], 0) + 1
+            fut = pool.submit(fn, *args)
+            fut.add_done_callback(lambda f, k=key: self._finished(k, f))
+
+    def _finished(self, key: TaskKey, fut: Future) -> None:
+        with self._cond:
+            self._inflight -= 1
+            self._running_acc[key[0]] -= 1
+            self._running_svc[key[2]] -= 1
+            self._done.append((key, fut))
+            self._cond.notify()
+
+    def run(self) -> Iterator[Tuple[TaskKey, Future]]:
+        """Execute queued tasks, yielding (key, future) for each one as it completes."""
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while True:
+                with self._cond:
+                    self._dispatch(pool)
+                    while not self._done and self._inflight:
+                        self._cond.wait()
+                        self._dispatch(pool)
+                    if not self._done:
+                        return  # nothing running, nothing finished: queue drained
+                    done = list(self._done); self._done.clear()
+                for item in done:
+                    yield item
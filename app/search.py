@@ -0,0 +1,190 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set, Tuple
+import bisect
+
+import numpy as np
+
+from .graph import Graph, Node
+
+if TYPE_CHECKING:
+    from .snapshots import Snapshot
+
+# searchable detail fields, after the label and before tags and ids in ranking order
+DETAIL_FIELDS = ('name', 'private_ip', 'public_ip', 'cidr', 'dns', 'arn', 'endpoint', 'public_endpoint', 'instance_profile')
+FIELDS = ('label',) + DETAIL_FIELDS + ('tag', 'id')
+MAX_TERMS = 5000   # matching terms looked at per query token; `truncated` is set beyond that
+MAX_LIMIT = 200
+MAX_TERM = 128     # bytes; longer values are found by exact and prefix match only
+
+EXACT, PREFIX, SUBSTRING = 0, 1, 2
+TAG, ID = len(FIELDS) - 2, len(FIELDS) - 1
+_FIELD_NO = {name: i for i, name in enumerate(FIELDS) if name in DETAIL_FIELDS}
+
+def _terms(n: Node) -> Iterator[Tuple[int, str]]:
+    """(field number, lowercased value) of everything searchable on `n`."""
+    yield 0, str(n.label).lower()
+    d = n.details
+    if d:
+        for name in d.keys() & _FIELD_NO.keys():
+            v = d[name]
+            if v is not None and v != '' and isinstance(v, (str, int)) and not isinstance(v, bool):
+                yield _FIELD_NO[name], str(v).lower()
+        tags = d.get('tags')
+        if isinstance(tags, dict):
+            for k, v in tags.items():
+                yield TAG, f'{k}:{v}'.lower()
+                yield TAG, str(v).lower()
+    yield ID, n.id.lower()
+    yield ID, n.id.rpartition(':')[2].lower()  # the resource's own id, without kind / account / region
+
+def _dedupe(a: np.ndarray) -> np.ndarray:
+    a = np.sort(a)
+    return a[np.concatenate(([True], a[1:] != a[:-1]))] if len(a) else a
+
+def _codes(data: np.ndarray) -> np.ndarray:
+    """Trigram code at every position of a uint8 array (three bytes packed into one int)."""
+    d = data.astype(np.int64)
+    return (d[:-2] << 16) | (d[1:-1] << 8) | d[2:]
+
+class SearchIndex:
+    """
+    Node search over labels, ids, tags and address / name fields of the details.
+
+    Every distinct value is a term: terms are kept sorted for exact and prefix lookups
+    (bisection) and indexed by byte trigrams for substring lookups. The trigram postings are
+    built in one vectorized pass over all terms and queried by intersecting the postings of
+    the query's trigrams, so a query touches only the terms that can match.
+    """
+    def __init__(self, g: Graph) -> None:
+        self.nodes: List[Node] = g.nodes()
+        postings: Dict[str, List[int]] = {}
+        nf = len(FIELDS)
+        partial: Set[str] = set()  # terms worth substring matching: all but full node ids
+        for doc, n in enumerate(self.nodes):
+            full = n.id.lower()
+            for field, term in _terms(n):
+                postings.setdefault(term, []).append(doc * nf + field)
+                if term != full or ':' not in full:
+                    partial.add(term)
+        self.terms: List[str] = sorted(postings)
+        self._tid = {t: i for i, t in enumerate(self.terms)}
+        # postings of all terms back to back (doc * len(FIELDS) + field), term i at ptr[i]:ptr[i + 1]
+        lists = [postings[t] for t in self.terms]
+        self._ptr = np.zeros(len(lists) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter(map(len, lists), dtype=np.int64, count=len(lists)), out=self._ptr[1:])
+        self._post = np.fromiter((p for ps in lists for p in ps), dtype=np.int64, count=int(self._ptr[-1]))
+        self._tlen = np.fromiter(map(len, self.terms), dtype=np.int64, count=len(self.terms))
+        self._build_trigrams(partial)
+
+    def _build_trigrams(self, partial: Set[str]) -> None:
+        # full ids are long and repeat what their own id part, label and region say
+        enc = [t.encode()[:MAX_TERM] if t in partial else b'' for t in self.terms]
+        lens = np.fromiter(map(len, enc), dtype=np.int64, count=len(enc))
+        # all terms back to back, each followed by a zero byte so no trigram spans two terms
+        data = np.frombuffer(b'\0'.join(enc) + b'\0', dtype=np.uint8)
+        if len(data) < 3:
+            self._codes = self._tids = np.zeros(0, dtype=np.int64)
+            return
+        owner = np.repeat(np.arange(len(enc), dtype=np.int64), lens + 1)[:-2]
+        ok = (data[:-2] != 0) & (data[1:-1] != 0) & (data[2:] != 0)
+        keys = _dedupe((_codes(data)[ok] << 32) | owner[ok])  # by trigram, then term
+        self._codes = keys >> 32
+        self._tids = keys & 0xFFFFFFFF
+
+    def __len__(self) -> int:
+        return len(self.nodes)
+
+    def _substring(self, q: str, limit: int) -> Tuple[List[int], bool]:
+        """Ids of terms containing `q` (at least three bytes long), at most `limit`, and whether there were more."""
+        raw = q.encode()
+        found: Optional[np.ndarray] = None
+        for c in _dedupe(_codes(np.frombuffer(raw, dtype=np.uint8))).tolist():
+            lo, hi = np.searchsorted(self._codes, [c, c + 1])
+            tids = self._tids[lo:hi]
+            found = tids if found is None else np.intersect1d(found, tids, assume_unique=True)
+            if not len(found):
+                return [], False
+        out = []
+        for tid in found.tolist():
+            # trigrams only narrow it down; longer queries need the actual substring
+            if len(raw) == 3 or q in self.terms[tid]:
+                if len(out) >= limit:
+                    return out, True
+                out.append(tid)
+        return out, False
+
+    def _matches(self, token: str) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """Term ids and match kinds for one query token, best kinds first, and whether some were cut off."""
+        tids: List[int] = []
+        exact = self._tid.get(token)
+        if exact is not None:
+            tids.append(exact)
+        lo = bisect.bisect_left(self.terms, token)
+        hi = bisect.bisect_left(self.terms, token + '\uffff', lo)
+        tids += [t for t in range(lo, min(hi, lo + MAX_TERMS)) if t != exact]
+        kinds = [EXACT] * (exact is not None) + [PREFIX] * (len(tids) - (exact is not None))
+        cut = hi - lo > MAX_TERMS
+        if len(token.encode()) >= 3 and len(tids) < MAX_TERMS:
+            sub, more = self._substring(token, MAX_TERMS - len(tids) + (hi - lo))
+            sub = [t for t in sub if not lo <= t < hi][:MAX_TERMS - len(tids)]
+            cut = cut or more or len(sub) == MAX_TERMS - len(tids)
+            tids += sub; kinds += [SUBSTRING] * len(sub)
+        return np.array(tids, dtype=np.int64), np.array(kinds, dtype=np.int64), cut
+
+    def _token(self, token: str) -> Tuple[np.ndarray, np.ndarray, bool]:
+        """Matching docs (sorted) and their best rank key for one token."""
+        tids, kinds, cut = self._matches(token)
+        counts = self._ptr[tids + 1] - self._ptr[tids]
+        # positions of every posting of every matching term, without a Python loop
+        starts = np.repeat(self._ptr[tids] - np.cumsum(counts) + counts, counts)
+        post = self._post[starts + np.arange(int(counts.sum()), dtype=np.int64)]
+        owner = np.repeat(np.arange(len(tids)), counts)
+        doc, field = np.divmod(post, len(FIELDS))
+        # rank key: match kind, then field, then value length, then term (alphabetical)
+        key = (np.repeat(kinds, counts) << 56) | (field << 48) | (np.minimum(self._tlen[tids], 0xFFFF)[owner] << 32) | tids[owner]
+        order = np.lexsort((key, doc))
+        doc, key = doc[order], key[order]
+        first = np.concatenate(([True], doc[1:] != doc[:-1])) if len(doc) else np.zeros(0, dtype=bool)
+        return doc[first], key[first], cut
+
+    def search(self, query: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+        """
+        Nodes matching every whitespace-separated token of `query` (case-insensitive), ranked
+        by how they match (exact, prefix, substring), then by field (label first, ids last),
+        then by the length of the matched value; `offset` / `limit` page through them.
+        """
+        tokens = query.lower().split()
+        limit = max(0, min(limit, MAX_LIMIT)); offset = max(0, offset)
+        docs = keys = None
+        truncated = False
+        for token in tokens:
+            d, k, cut = self._token(token)
+            truncated = truncated or cut
+            if docs is None:
+                docs, keys = d, k
+            else:
+                # every token must match; match kinds add up, the first token's match is reported
+                both, i, j = np.intersect1d(docs, d, assume_unique=True, return_indices=True)
+                docs, keys = both, keys[i] + ((k[j] >> 56) << 56)
+        if docs is None:
+            return {'query': query, 'total': 0, 'truncated': False, 'offset': offset, 'next_offset': None, 'results': []}
+        order = np.argsort(keys, kind='stable')[offset:offset + limit]
+        results = []
+        for doc, key in zip(docs[order].tolist(), keys[order].tolist()):
+            n = self.nodes[doc]
+            results.append({
+                'id': n.id, 'label': n.label, 'type': n.type, 'region': n.region, 'account_id': n.account_id,
+                'parent': n.parent, 'match': {'field': FIELDS[(key >> 48) & 0xFF], 'value': self.terms[key & 0xFFFFFFFF]},
+            })
+        more = offset + limit < len(docs)
+        return {'query': query, 'total': len(docs), 'truncated': truncated, 'offset': offset,
+                'next_offset': offset + limit if more else None, 'results': results}
+
+def snapshot_search(snap: Snapshot) -> SearchIndex:
+    """The SearchIndex of `snap`, built on first use and kept with the snapshot."""
+    if snap.search is not None:  # built once, never replaced: no lock needed to read it
+        return snap.search
+    with snap.lock:
+        if snap.search is None:
+            snap.search = SearchIndex(snap.graph)
+        return snap.search
@@ -0,0 +1,85 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from collections import OrderedDict
+import os
+import threading
+import time
+import uuid
+
+import boto3
+import orjson
+
+from .graph import Graph
+from .scheduler import TaskKey
+
+if TYPE_CHECKING:
+    from .acl import AclTables
+    from .cidr import CidrIndex
+    from .search import SearchIndex
+    from .subgraph import Hierarchy
+
+SNAPSHOT_KEEP = int(os.environ.get('SNAPSHOT_KEEP', '8'))
+
+class Snapshot:
+    """The graph, fingerprints and sessions of one finished scan, reused by incremental scans and queries."""
+    def __init__(
+        self,
+        scope: str,
+        graph: Graph,
+        warnings: List[str],
+        findings: List[Dict[str, Any]],
+        fingerprints: Dict[TaskKey, Any],
+        sessions: Dict[str, boto3.Session],
+    ) -> None:
+        self.id = uuid.uuid4().hex
+        self.scope = scope
+        self.graph = graph
+        self.warnings = warnings
+        self.findings = findings
+        self.fingerprints = fingerprints
+        self.sessions = sessions  # account id -> session, for on-demand lookups
+        self.created = time.time()
+        self.layouts: Dict[str, Dict[str, List[float]]] = {}  # view mode -> node positions, see app.layout
+        self.hierarchy: Optional[Hierarchy] = None  # container index for the subgraph API, see app.subgraph
+        self.search: Optional[SearchIndex] = None  # see app.search
+        self.cidrs: Optional[CidrIndex] = None  # see app.cidr
+        self.acl: Optional[AclTables] = None  # see app.acl
+        self.lock = threading.Lock()  # held while one of the caches above is built
+
+class SnapshotStore:
+    """Most recent snapshots, newest last; a new snapshot replaces older ones of the same scope."""
+    def __init__(self, keep: int = SNAPSHOT_KEEP) -> None:
+        self.keep = keep
+        self._snaps: "OrderedDict[str, Snapshot]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def put(self, snap: Snapshot) -> None:
+        with self._lock:
+            for sid in [sid for sid, s in self._snaps.items() if s.scope == snap.scope]:
+                del self._snaps[sid]
+            self._snaps[snap.id] = snap
+            while len(self._snaps) > self.keep:
+                self._snaps.popitem(last=False)
+
+    def get(self, snap_id: str) -> Optional[Snapshot]:
+        with self._lock:
+            return self._snaps.get(snap_id)
+
+    def latest(self, scope: Optional[str] = None) -> Optional[Snapshot]:
+        with self._lock:
+            for snap in reversed(self._snaps.values()):
+                if scope is None or snap.scope == scope:
+                    return snap
+        return None
+
+def scope_of(payload: Dict[str, Any], regions: List[str]) -> str:
+    """What a scan covers: who it runs as, which accounts, regions and services. Never includes secrets."""
+    return orjson.dumps({
+        'profile': payload.get('profile'),
+        'access_key_id': payload.get('access_key_id'),
+        'assume_roles': sorted(payload.get('assume_roles') or []),
+        'regions': sorted(regions),
+        'services': payload.get('services') or {},
+    }, option=orjson.OPT_SORT_KEYS).decode()
+
+STORE = SnapshotStore()
@@ -0,0 +1,124 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set
+
+from .graph import Graph, Node
+
+if TYPE_CHECKING:
+    from .snapshots import Snapshot
+
+TOP_TYPES = ('account', 'region', 'vpc')
+MAX_HOPS = 3
+NEIGHBORHOOD_LIMIT = 2000  # nodes; larger neighborhoods are cut off and flagged `truncated`
+
+class Hierarchy:
+    """
+    Parent / child index of a graph with subtree sizes, built in one pass and kept with the
+    snapshot, so containers can be handed out collapsed and expanded on demand.
+    """
+    def __init__(self, g: Graph) -> None:
+        self.g = g
+        self.children: Dict[str, List[str]] = {}
+        self.descendants: Dict[str, int] = {}
+        nodes = g.nodes()
+        ids = {n.id for n in nodes}
+        for n in nodes:
+            if n.parent in ids and n.parent != n.id:
+                self.children.setdefault(n.parent, []).append(n.id)
+        # subtree sizes, children before parents
+        order: List[str] = []
+        seen: Set[str] = set()
+        stack = [n.id for n in nodes if n.parent not in ids or n.parent == n.id]
+        while stack:
+            nid = stack.pop()
+            if nid in seen:
+                continue
+            seen.add(nid); order.append(nid)
+            stack.extend(self.children.get(nid, ()))
+        for nid in reversed(order):
+            kids = self.children.get(nid)
+            if kids:
+                self.descendants[nid] = sum(1 + self.descendants.get(c, 0) for c in kids)
+
+    def element(self, n: Node) -> Dict[str, Any]:
+        """`n` as an element; containers carry `child_count` and `descendant_count`."""
+        el = n.to_element()
+        kids = self.children.get(n.id)
+        if kids:
+            el['data']['child_count'] = len(kids)
+            el['data']['descendant_count'] = self.descendants[n.id]
+        return el
+
+    def ancestors(self, n: Node) -> List[Node]:
+        """Parents of `n` up to its root, nearest first."""
+        out: List[Node] = []
+        seen = {n.id}
+        p = self.g.node(n.parent) if n.parent else None
+        while p is not None and p.id not in seen:
+            out.append(p); seen.add(p.id)
+            p = self.g.node(p.parent) if p.parent else None
+        return out
+
+    def _edges_between(self, ids: Set[str]) -> List[Dict[str, Any]]:
+        return [e.to_element() for nid in ids for e in self.g.out_edges(nid) if e.target in ids]
+
+    def overview(self) -> Dict[str, Any]:
+        """Account, region and VPC containers, collapsed."""
+        nodes = [n for t in TOP_TYPES for n in self.g.nodes(t)]
+        return {'elements': [self.element(n) for n in nodes]}
+
+    def expand(self, node_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Direct children of a container, collapsed themselves, with the edges that touch one of
+        them from outside the children's own subtrees; edges whose other end is not loaded yet
+        are held by the client until it is.
+        None when `node_id` is unknown.
+        """
+        if self.g.node(node_id) is None:
+            return None
+        kids = [n for n in map(self.g.node, self.children.get(node_id, ())) if n is not None]
+        ids = {n.id for n in kids}
+        edges: Dict[str, Dict[str, Any]] = {}
+        for n in kids:
+            for e in self.g.out_edges(n.id) + self.g.in_edges(n.id):
+                other = self.g.node(e.target if e.source == n.id else e.source)
+                # edges into a child's own subtree come with that child's expansion
+                if e.id in edges or other is None or (other.id not in ids and any(p.id in ids for p in self.ancestors(other))):
+                    continue
+                edges[e.id] = e.to_element()
+        return {'elements': [self.element(n) for n in kids] + list(edges.values())}
+
+    def neighborhood(self, node_id: str, k: int = 1, limit: int = NEIGHBORHOOD_LIMIT) -> Optional[Dict[str, Any]]:
+        """
+        Nodes within `k` hops of `node_id` along edges in either direction, their containers,
+        and the edges among them. None when `node_id` is unknown.
+        """
+        start = self.g.node(node_id)
+        if start is None:
+            return None
+        seen = {node_id}
+        frontier = [node_id]
+        truncated = False
+        for _ in range(max(0, min(k, MAX_HOPS))):
+            nxt = []
+            for nid in frontier:
+                for e in self.g.out_edges(nid) + self.g.in_edges(nid):
+                    other = e.target if e.source == nid else e.source
+                    if other in seen or self.g.node(other) is None:
+                        continue
+                    if len(seen) >= limit:
+                        truncated = True; break
+                    seen.add(other); nxt.append(other)
+            frontier = nxt
+        nodes = [n for n in map(self.g.node, seen) if n is not None]
+        parents = {p.id: p for n in nodes for p in self.ancestors(n) if p.id not in seen}
+        elements = [self.element(n) for n in list(parents.values()) + nodes] + self._edges_between(seen)
+        return {'elements': elements, 'truncated': truncated}
+
+def snapshot_hierarchy(snap: Snapshot) -> Hierarchy:
+    """The Hierarchy of `snap`, built on first use and kept with the snapshot."""
+    if snap.hierarchy is not None:  # built once, never replaced: no lock needed to read it
+        return snap.hierarchy
+    with snap.lock:
+        if snap.hierarchy is None:
+            snap.hierarchy = Hierarchy(snap.graph)
+        return snap.hierarchy
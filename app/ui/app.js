@@ -4,6 +4,8 @@ const LAYOUTS = {
   'service': { name: 'dagre', rankDir: 'LR', nodeSep: 50, rankSep: 100, edgeSep: 20, fit: true },
   'account': { name: 'cose-bilkent', quality: 'default', animate: false, nodeRepulsion: 60000, idealEdgeLength: 220, gravity: 0.25, numIter: 1000, tile: true },
 };
+// server-computed positions of the current snapshot, by view mode; LAYOUTS is the fallback
+let positions = {};
 
 const NODE_STYLES = [
   // Parent containers (VPC/Account/Region)
@@ -36,6 +38,7 @@ const NODE_STYLES = [
   { sel: 'node[type = "msk_cluster"]', style: { 'shape': 'round-rectangle', 'background-color': '#f59e0b' } },
   { sel: 'node[type = "s3_bucket"]', style: { 'shape': 'round-rectangle', 'background-color': '#84cc16' } },
   { sel: 'node[type = "cidr"], node[type = "prefix_list"], node[type = "external"]', style: { 'shape': 'ellipse', 'background-color': '#e5e7eb' } },
+  { sel: 'node[child_count]', style: { 'label': n => n.data('label') + (n.data('expanded') ? '' : ' (' + n.data('descendant_count') + ')') } },
   { sel: 'node:selected', style: { 'border-color': '#111827', 'border-width': 3 } },
 ];
 
@@ -66,7 +69,11 @@ function initCy() {
   cy.on('select', 'node,edge', (e) => {
     const d = e.target.data();
     document.getElementById('panel').innerHTML = '<pre>' + JSON.stringify(d, null, 2) + '</pre>';
+    if (d.details && d.details.lazy_details) loadDetails(d.id);
+    const hop = Number(document.getElementById('hop').value);
+    if (hop > 0 && e.target.isNode()) spotlight(d.id, hop);
   });
+  cy.on('dbltap', 'node[child_count]', (e) => expand(e.target));
   cy.on('unselect', () => {
     document.getElementById('panel').innerHTML = '<div class="small">Select a node or edge to see details.</div>';
   });
@@ -120,6 +127,87 @@ function addFindings(fs){
   });
 }
 
+// Edges/parents that arrived before their nodes; retried after every batch.
+const pendingEdges = new Map();
+const pendingParents = new Map();
+let lastLayout = 0;
+
+function mergeElements(els, removed){
+  cy.batch(() => {
+    (removed || []).forEach(id => { cy.getElementById(id).remove(); pendingEdges.delete(id); pendingParents.delete(id); });
+    (els || []).forEach(el => {
+      const d = el.data;
+      const existing = cy.getElementById(d.id);
+      if (existing.nonempty()) {
+        const { parent, ...rest } = d;
+        existing.data(rest);
+        if (existing.isNode() && parent && existing.data('parent') !== parent) pendingParents.set(d.id, parent);
+        return;
+      }
+      if (d.source) { pendingEdges.set(d.id, el); return; }
+      if (d.parent && cy.getElementById(d.parent).empty()) {
+        pendingParents.set(d.id, d.parent);
+        cy.add({ group: 'nodes', data: { ...d, parent: undefined } });
+        return;
+      }
+      cy.add({ group: 'nodes', data: d });
+    });
+    pendingParents.forEach((parent, id) => {
+      if (cy.getElementById(parent).empty()) return;
+      cy.getElementById(id).move({ parent });
+      pendingParents.delete(id);
+    });
+    pendingEdges.forEach((el, id) => {
+      if (cy.getElementById(el.data.source).empty() || cy.getElementById(el.data.target).empty()) return;
+      cy.add({ group: 'edges', data: el.data });
+      pendingEdges.delete(id);
+    });
+  });
+}
+
+let lastSnapshot = null;
+let collapsedView = false;  // only what was loaded through /subgraph is on screen
+
+async function loadSubgraph(path, params){
+  const q = new URLSearchParams(params || {});
+  if (lastSnapshot) q.set('snapshot', lastSnapshot);
+  const res = await fetch(path + '?' + q);
+  if (!res.ok) return null;
+  const body = await res.json();
+  mergeElements(body.elements, []);
+  applyToggles();
+  setMeta('Elements: ' + cy.elements().length);
+  return body;
+}
+
+async function expand(node){
+  if (node.data('expanded')) return;
+  node.data('expanded', true);
+  if (await loadSubgraph('/subgraph/children', { node: node.id() })) runLayout();
+}
+
+// load the k-hop neighborhood of a node and dim everything else
+async function spotlight(id, k){
+  const body = await loadSubgraph('/subgraph/neighborhood', { node: id, k });
+  if (!body) return;
+  if (collapsedView) runLayout();
+  const keep = new Set(body.elements.map(el => el.data.id));
+  cy.elements().forEach(el => el.toggleClass('dim', !keep.has(el.id())));
+}
+
+// details deferred by a scan with details='lazy', fetched when a node is opened
+async function loadDetails(id){
+  const q = new URLSearchParams({ node: id });
+  if (lastSnapshot) q.set('snapshot', lastSnapshot);
+  const res = await fetch('/details?' + q);
+  if (!res.ok) return;
+  const body = await res.json();
+  mergeElements(body.elements, []);
+  applyToggles();
+  const el = cy.getElementById(id);
+  if (el.selected()) document.getElementById('panel').innerHTML = '<pre>' + JSON.stringify(el.data(), null, 2) + '</pre>';
+}
+
 async function enumerate(){
   setStatus('Enumerating…');
   addWarnings([]); addFindings([]);
@@ -132,23 +220,77 @@ async function enumerate(){
     assume_roles: (document.getElementById('roles').value.trim() || '').split(',').map(s => s.trim()).filter(Boolean),
     regions: regionsRaw.toUpperCase() === 'ALL' ? ['ALL'] : (regionsRaw ? regionsRaw.split(',').map(s => s.trim()) : []),
     services: {},
+    incremental: document.getElementById('incremental').checked,
+    details: document.getElementById('details').value,
+    view: currentView(),
+    collapsed: document.getElementById('collapsed').checked,
   };
-  const res = await fetch('/enumerate', { method: 'POST', headers: { 'content-type': 'application/json' }, body: JSON.stringify(payload) });
-  const data = await res.json();
-  if (!res.ok) { setStatus(data.error || 'Error'); return; }
+  const res = await fetch('/enumerate/stream', { method: 'POST', headers: { 'content-type': 'application/json' }, body: JSON.stringify(payload) });
+  if (!res.ok) { setStatus('Error'); return; }
+
+  // incremental scans patch what is on screen; full scans start over
+  if (!payload.incremental || payload.collapsed !== collapsedView) { cy.elements().remove(); pendingEdges.clear(); pendingParents.clear(); }
+  collapsedView = payload.collapsed;
+  const warnings = [];
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buf = '', tasks = 0;
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buf += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buf.indexOf('\n')) >= 0) {
+      const line = buf.slice(0, nl); buf = buf.slice(nl + 1);
+      if (!line.trim()) continue;
+      const ev = JSON.parse(line);
+      if (ev.event === 'batch') {
+        tasks += 1;
+        mergeElements(ev.elements, ev.removed);
+        warnings.push(...(ev.warnings || []));
+        setMeta('Elements: ' + cy.elements().length);
+        setStatus('Enumerating… ' + tasks + ' tasks done');
+        // cheap interim layout at most once a second; the server's one arrives with 'final'
+        if (Date.now() - lastLayout > 1000) { applyToggles(); runLayout(true); lastLayout = Date.now(); }
+      } else if (ev.event === 'final') {
+        lastSnapshot = ev.snapshot_id;
+        positions = ev.layout ? { [ev.layout.mode]: ev.layout.positions } : {};
+        if (collapsedView) { cy.elements().remove(); pendingEdges.clear(); pendingParents.clear(); await loadSubgraph('/subgraph'); }
+        mergeElements(ev.elements, ev.removed);
+        setMeta('Elements: ' + cy.elements().length);
+        applyToggles(); runLayout().then(() => cy.fit(null, 50));
+        addWarnings(ev.warnings || warnings);
+        addFindings(ev.findings || []);
+      } else if (ev.event === 'end') {
+        setStatus(ev.status === 'done' ? 'Done' : (ev.error || ev.status));
+        if (ev.status !== 'done') addWarnings(warnings);
+      }
+    }
+  }
+}
+
+function currentView(){ return document.querySelector('input[name="view"]:checked').value; }
 
-  setMeta('Elements: ' + (data.elements?.length || 0));
-  cy.elements().remove();
-  cy.add(data.elements || []);
-  applyToggles(); runLayout(); cy.fit(null, 50);
-  addWarnings(data.warnings || []);
-  addFindings(data.findings || []);
-  setStatus('Done');
+// positions of `mode` for the last snapshot, fetched once per view
+async function loadPositions(mode){
+  if (collapsedView) return null;  // the visible part is small enough for the client layouts
+  if (!positions[mode] && lastSnapshot) {
+    const res = await fetch('/layout?' + new URLSearchParams({ mode, snapshot: lastSnapshot }));
+    if (res.ok) positions[mode] = (await res.json()).positions;
+  }
+  return positions[mode];
 }
 
-function runLayout(){
-  const mode = document.querySelector('input[name="view"]:checked').value;
-  cy.layout(LAYOUTS[mode]).run();
+async function runLayout(draft){
+  const mode = currentView();
+  if (draft) { cy.layout({ name: 'grid', animate: false }).run(); return; }
+  const pos = await loadPositions(mode);
+  if (!pos) { cy.layout(LAYOUTS[mode]).run(); return; }
+  // nodes the server has not placed (e.g. loaded later with their details) keep their position
+  cy.layout({ name: 'preset', animate: false, fit: false, positions: n => {
+    const p = pos[n.id()];
+    return p ? { x: p[0], y: p[1] } : n.position();
+  } }).run();
 }
 
 function applyToggles(){
@@ -163,7 +305,8 @@ function applyToggles(){
 function bindUI(){
   document.getElementById('run').addEventListener('click', enumerate);
   document.getElementById('fit').addEventListener('click', () => cy.fit(null, 50));
-  document.getElementById('layout').addEventListener('click', runLayout);
+  document.getElementById('layout').addEventListener('click', () => runLayout());
+  document.querySelectorAll('input[name="view"]').forEach(el => el.addEventListener('change', () => runLayout().then(() => cy.fit(null, 50))));
   document.getElementById('quick-sg').addEventListener('click', () => { document.getElementById('regions').value = 'ap-southeast-1'; });
   document.getElementById('quick-all').addEventListener('click', () => { document.getElementById('regions').value = 'ALL'; });
   ['toggle-network','toggle-resource','toggle-data'].forEach(id => document.getElementById(id).addEventListener('change', applyToggles));
@@ -181,10 +324,13 @@ function bindUI(){
     downloadText(JSON.stringify(data, null, 2), 'topology.json');
   });
 
+  let searchTimer;
   document.getElementById('search').addEventListener('input', (e) => {
     const q = e.target.value.trim().toLowerCase();
     cy.nodes().removeClass('dim');
     if (!q) return;
+    // collapsed: most nodes are not loaded, so ask the server's index
+    if (collapsedView) { clearTimeout(searchTimer); searchTimer = setTimeout(() => searchServer(q), 250); return; }
     const matched = cy.nodes().filter(n => {
       const d = n.data();
       return (d.label || '').toLowerCase().includes(q) || (d.id || '').toLowerCase().includes(q);
@@ -195,6 +341,30 @@ function bindUI(){
   });
 }
 
+async function searchServer(q, offset){
+  const params = new URLSearchParams({ q, offset: offset || 0, limit: 50 });
+  if (lastSnapshot) params.set('snapshot', lastSnapshot);
+  const res = await fetch('/search?' + params);
+  if (!res.ok) return;
+  const body = await res.json();
+  const panel = document.getElementById('panel');
+  panel.innerHTML = '<div class="small">' + body.total + (body.truncated ? '+' : '') + ' matches</div>';
+  body.results.forEach(r => {
+    const row = document.createElement('div'); row.className = 'search-hit';
+    row.textContent = r.label + ' [' + r.type + '] ' + r.match.field + ': ' + r.match.value;
+    row.addEventListener('click', async () => {
+      await spotlight(r.id, Math.max(1, Number(document.getElementById('hop').value)));
+      cy.getElementById(r.id).select();
+    });
+    panel.appendChild(row);
+  });
+  if (body.next_offset !== null) {
+    const more = document.createElement('button'); more.textContent = 'More';
+    more.addEventListener('click', () => searchServer(q, body.next_offset));
+    panel.appendChild(more);
+  }
+}
+
 function downloadDataURL(dataUrl, filename){
   const a = document.createElement('a');
   a.href = dataUrl; a.download = filename; a.click();
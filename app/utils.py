@@ -1,19 +1,69 @@
 from __future__ import annotations
-from typing import Any, Callable
+from typing import Any, Callable, Iterable, List
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar, copy_context
+import os
+import random
+import time
 from botocore.exceptions import ClientError, EndpointConnectionError
 
+DETAIL_WORKERS = int(os.environ.get('DETAIL_WORKERS', '8'))
+THROTTLE_CODES = frozenset({
+    'Throttling', 'ThrottlingException', 'ThrottledException', 'TooManyRequestsException', 'RequestLimitExceeded',
+    'RequestThrottled', 'RequestThrottledException', 'SlowDown', 'ProvisionedThroughputExceededException',
+})
+DETAIL_MODES = ('eager', 'lazy', 'skip')
+
+# per-resource detail calls (e.g. Lambda policies): fetched during the scan, on request, or never
+detail_mode: ContextVar[str] = ContextVar('detail_mode', default='eager')
+
 def mk_id(*parts: str) -> str:
     """Create a unique ID from a list of parts."""
     return ":".join([p for p in parts if p])
 
+def _attempt(fn: Callable, *args: Any, **kwargs: Any) -> tuple[Any | None, str | None, bool]:
+    """(result, error message, whether botocore already retried the failing call)."""
+    try:
+        return fn(*args, **kwargs), None, False
+    except (ClientError, EndpointConnectionError) as e:
+        resp = getattr(e, 'response', {})
+        return None, resp.get('Error', {}).get('Code', str(e)), bool((resp.get('ResponseMetadata') or {}).get('RetryAttempts'))
+    except Exception as e:
+        return None, str(e), False
+
 def safe_call(fn: Callable, *args: Any, **kwargs: Any) -> tuple[Any | None, str | None]:
     """
     Safely call a function, returning the result and any error message.
     """
-    try:
-        return fn(*args, **kwargs), None
-    except (ClientError, EndpointConnectionError) as e:
-        code = getattr(e, 'response', {}).get('Error', {}).get('Code', str(e))
-        return None, code
-    except Exception as e:
-        return None, str(e)
+    res, err, _ = _attempt(fn, *args, **kwargs)
+    return res, err
+
+def backoff_call(fn: Callable, *args: Any, attempts: int = 5, base: float = 0.25, cap: float = 8.0, **kwargs: Any) -> tuple[Any | None, str | None]:
+    """
+    `safe_call` that keeps retrying with jittered exponential backoff while AWS reports throttling.
+    A throttled call botocore has already retried (see clients.BOTO_CFG) is given up on: its
+    retry budget is spent, and retrying again would multiply the attempts.
+    """
+    for attempt in range(attempts):
+        res, err, retried = _attempt(fn, *args, **kwargs)
+        if err not in THROTTLE_CODES or retried or attempt == attempts - 1:
+            return res, err
+        time.sleep(random.uniform(0, min(cap, base * 2 ** attempt)))
+    return None, None
+
+def paginate_all(client: Any, op: str, key: str, **kwargs: Any) -> List[Any]:
+    """Every `key` item of every page of a paginated describe / list call."""
+    return [item for page in client.get_paginator(op).paginate(**kwargs) for item in page.get(key, []) or []]
+
+def fan_out(fn: Callable[[Any], Any], items: Iterable[Any], workers: int = DETAIL_WORKERS) -> List[Any]:
+    """
+    `[fn(item) for item in items]` on up to `workers` threads, results in input order.
+    Every call runs in a copy of the caller's context, so the current task, cache age
+    limit and detail mode carry over to the workers.
+    """
+    items = list(items)
+    if workers <= 1 or len(items) <= 1:
+        return [fn(item) for item in items]
+    ctx = copy_context()
+    with ThreadPoolExecutor(min(workers, len(items))) as ex:
+        return list(ex.map(lambda item: ctx.copy().run(fn, item), items))
@@ -0,0 +1,182 @@
+from __future__ import annotations
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import gzip
+import zlib
+
+import orjson
+from starlette.responses import Response
+
+from .metrics import METRICS
+
+try:  # optional: zstd is used when installed and the client accepts it
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+COMPACT_TYPE = 'application/vnd.awsenum.compact+json'
+COMPACT_FORMAT = 'compact/1'
+ELEMENT_KEYS = ('elements', 'added', 'changed')  # result keys holding element lists
+MIN_COMPRESS = 1024  # bytes; smaller bodies are sent as they are
+GZIP_LEVEL = 5
+# element data keys with a column of their own; any others (e.g. subgraph container counts) go in `extra`
+NODE_KEYS = frozenset({'id', 'label', 'type', 'region', 'details', 'parent', 'account_id'})
+EDGE_KEYS = frozenset({'id', 'source', 'target', 'label', 'type', 'category', 'derived', 'details'})
+ZSTD_LEVEL = 3
+
+def _intern(values: List[Optional[str]], st: Dict[Optional[str], int]) -> List[int]:
+    for v in set(values):
+        st.setdefault(v, len(st))
+    return list(map(st.__getitem__, values))  # map over bound C methods: no per-item Python frame
+
+def _split(ids: List[str], st: Dict[Optional[str], int]) -> Tuple[List[int], List[str]]:
+    # mk_id ids share everything up to the last ':' (kind, account, region, ARN prefix)
+    parts = [i.rpartition(':') for i in ids]
+    return _intern([h + sep for h, sep, _ in parts], st), [t for _, _, t in parts]
+
+def _extra(rows: List[Dict[str, Any]], keys: frozenset) -> Optional[List[Optional[Dict[str, Any]]]]:
+    """Per row, its data keys outside `keys` (or None); None when no row has any."""
+    out = [{k: v for k, v in r.items() if k not in keys} if len(r) > len(keys) else None for r in rows]
+    return out if any(out) else None
+
+def _columns(elements: Iterable[Dict[str, Any]], st: Dict[Optional[str], int]) -> Dict[str, Any]:
+    nodes = [el['data'] for el in elements if 'source' not in el['data']]
+    edges = [el['data'] for el in elements if 'source' in el['data']]
+    index = {n['id']: i for i, n in enumerate(nodes)}
+    col = lambda rows, k: [r[k] for r in rows]
+    ref = lambda ids: list(map(index.get, ids, ids))  # node position, or the id itself (None stays None)
+    n_pre, n_id = _split(list(index), st)
+    e_pre, e_id = _split(col(edges, 'id'), st)
+    out = {
+        'nodes': {
+            'id_prefix': n_pre, 'id': n_id,
+            'label': col(nodes, 'label'),
+            'type': _intern(col(nodes, 'type'), st),
+            'region': _intern(col(nodes, 'region'), st),
+            'account_id': _intern(col(nodes, 'account_id'), st),
+            'parent': ref(col(nodes, 'parent')),
+            'details': [n['details'] or None for n in nodes],
+        },
+        'edges': {
+            'id_prefix': e_pre, 'id': e_id,
+            'source': ref(col(edges, 'source')),
+            'target': ref(col(edges, 'target')),
+            'label': _intern(col(edges, 'label'), st),
+            'type': _intern(col(edges, 'type'), st),
+            'category': _intern(col(edges, 'category'), st),
+            'derived': [1 if e['derived'] else 0 for e in edges],
+            'details': [e['details'] or None for e in edges],
+        },
+    }
+    for part, rows, keys in (('nodes', nodes, NODE_KEYS), ('edges', edges, EDGE_KEYS)):
+        extra = _extra(rows, keys)
+        if extra is not None:
+            out[part]['extra'] = extra
+    return out
+
+def encode_compact(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Columnar form of a result's element lists: nodes and edges as parallel arrays, with ids
+    split into a shared prefix and a suffix, repeated strings (prefixes, types, regions,
+    accounts, edge labels) replaced by positions in one `strings` table, and edge endpoints
+    and parents given as node positions when the node is in the same list. Other data keys
+    are carried in an `extra` column, present only when some element has them.
+    """
+    st: Dict[Optional[str], int] = {}
+    out = {k: (_columns(v, st) if k in ELEMENT_KEYS and isinstance(v, list) else v) for k, v in result.items()}
+    out['format'] = COMPACT_FORMAT
+    out['strings'] = list(st)  # may hold null, e.g. the region of account containers
+    return out
+
+def decode_compact(doc: Dict[str, Any]) -> Dict[str, Any]:
+    """Inverse of `encode_compact`; element lists come back as nodes followed by edges."""
+    s = doc['strings'].__getitem__
+    out = {}
+    for k, v in doc.items():
+        if k in ('format', 'strings'):
+            continue
+        if k not in ELEMENT_KEYS or not isinstance(v, dict):
+            out[k] = v; continue
+        n, e = v['nodes'], v['edges']
+        ids = [s(p) + i for p, i in zip(n['id_prefix'], n['id'])]
+        ref = lambda r: ids[r] if isinstance(r, int) else r
+        els = [{'data': {
+            'id': ids[i], 'label': n['label'][i], 'type': s(n['type'][i]), 'region': s(n['region'][i]),
+            'details': n['details'][i] or {}, 'parent': ref(n['parent'][i]), 'account_id': s(n['account_id'][i]),
+        }} for i in range(len(ids))]
+        els += [{'data': {
+            'id': s(e['id_prefix'][i]) + e['id'][i], 'source': ref(e['source'][i]), 'target': ref(e['target'][i]),
+            'label': s(e['label'][i]), 'type': s(e['type'][i]), 'category': s(e['category'][i]),
+            'derived': bool(e['derived'][i]), 'details': e['details'][i] or {},
+        }} for i in range(len(e['id']))]
+        for i, x in enumerate(n.get('extra') or ()):
+            if x: els[i]['data'].update(x)
+        for i, x in enumerate(e.get('extra') or (), len(ids)):
+            if x: els[i]['data'].update(x)
+        out[k] = els
+    return out
+
+def _accepts(header: str) -> Dict[str, float]:
+    """Media types / codings of an Accept(-Encoding) header with their q-values."""
+    out = {}
+    for part in header.split(','):
+        name, _, params = part.strip().partition(';')
+        q = 1.0
+        for p in params.split(';'):
+            k, _, v = p.strip().partition('=')
+            if k == 'q':
+                try:
+                    q = float(v)
+                except ValueError:
+                    q = 0.0
+        if name:
+            out[name.strip().lower()] = q
+    return out
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """'zstd' (when available), 'gzip' or None, by the client's preference."""
+    acc = _accepts(accept_encoding or '')
+    options = [c for c in (('zstd',) if zstandard is not None else ()) + ('gzip',) if acc.get(c, acc.get('*', 0)) > 0]
+    return max(options, key=lambda c: acc.get(c, acc.get('*', 0)), default=None)
+
+def compress(body: bytes, coding: Optional[str]) -> bytes:
+    if coding == 'zstd':
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    if coding == 'gzip':
+        return gzip.compress(body, GZIP_LEVEL)
+    return body
+
+class StreamCompressor:
+    """Incremental gzip / zstd for streamed responses; every chunk is flushed so events are not held back."""
+    def __init__(self, coding: str) -> None:
+        self.coding = coding
+        if coding == 'zstd':
+            self._z = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+        else:
+            self._z = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def chunk(self, data: bytes) -> bytes:
+        if self.coding == 'zstd':
+            return self._z.compress(data) + self._z.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+        return self._z.compress(data) + self._z.flush(zlib.Z_SYNC_FLUSH)
+
+    def end(self) -> bytes:
+        return self._z.flush()
+
+def encode(data: Any, status_code: int = 200, accept: str = '', accept_encoding: str = '') -> Response:
+    """
+    One serialization straight to bytes: orjson, or the compact encoding when the client's
+    Accept header asks for COMPACT_TYPE, compressed when it accepts gzip / zstd. Timed as the
+    `serialize` and `compress` phases.
+    """
+    media = 'application/json'
+    with METRICS.phase('serialize'):
+        if isinstance(data, dict) and _accepts(accept).get(COMPACT_TYPE, 0) > 0:
+            data = encode_compact(data); media = COMPACT_TYPE
+        body = orjson.dumps(data)
+    headers = {'Vary': 'Accept, Accept-Encoding'}
+    coding = choose_encoding(accept_encoding) if len(body) >= MIN_COMPRESS else None
+    if coding:
+        with METRICS.phase('compress'):
+            body = compress(body, coding)
+        headers['Content-Encoding'] = coding
+    return Response(body, status_code=status_code, media_type=media, headers=headers)
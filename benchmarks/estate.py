@@ -0,0 +1,170 @@
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+from dataclasses import dataclass, field
+import datetime
+import json
+import random
+
+REGIONS = (
+    'us-east-1', 'eu-west-1', 'us-west-2', 'eu-central-1', 'ap-southeast-1', 'ap-northeast-1',
+    'us-east-2', 'eu-west-2', 'ap-south-1', 'ca-central-1', 'sa-east-1', 'ap-southeast-2',
+)
+
+@dataclass
+class EstateSpec:
+    """Size of a synthetic AWS estate; per-region counts apply to every account."""
+    accounts: int = 1
+    regions: int = 1
+    vpcs: int = 2          # per region
+    subnets: int = 4       # per VPC, the first half public
+    sgs: int = 4           # per VPC
+    sg_rules: int = 4      # ingress rules per SG
+    instances: int = 50    # per region
+    lambdas: int = 20      # per region
+    lbs: int = 4           # per region
+    targets: int = 4       # instances behind each LB's target group
+    buckets: int = 10      # per account
+    seed: int = 0
+
+@dataclass
+class RegionData:
+    """Parsed describe / list responses of one (account, region), by API result key."""
+    items: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    listeners: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    health: Dict[str, List[Dict[str, Any]]] = field(default_factory=dict)
+    policies: Dict[str, str] = field(default_factory=dict)
+
+class Estate:
+    """
+    Deterministic synthetic estate built from an EstateSpec: VPCs with public and private
+    subnets, route tables, gateways, security groups with rules, instances and their ENIs,
+    load balancers with listeners and targets, Lambda functions and S3 buckets.
+    Regions are generated on first access.
+    """
+    def __init__(self, spec: EstateSpec) -> None:
+        self.spec = spec
+        self.accounts = [f'{100000000000 + i:012d}' for i in range(spec.accounts)]
+        self.regions = list(REGIONS[:spec.regions])
+        self._regions: Dict[tuple, RegionData] = {}
+        self.buckets: Dict[str, List[Dict[str, Any]]] = {}
+        self.bucket_regions: Dict[str, str] = {}
+        for ai, acc in enumerate(self.accounts):
+            rows = []
+            for b in range(spec.buckets):
+                name = f'bench-{acc}-{b}'
+                self.bucket_regions[name] = self.regions[b % len(self.regions)]
+                rows.append({'Name': name, 'CreationDate': datetime.datetime(2020, 1, 1 + b % 28)})
+            self.buckets[acc] = rows
+
+    def role_arn(self, account: str) -> str:
+        return f'arn:aws:iam::{account}:role/bench'
+
+    def region(self, account: str, region: str) -> Optional[RegionData]:
+        if account not in self.accounts or region not in self.regions:
+            return None
+        key = (account, region)
+        if key not in self._regions:
+            self._regions[key] = self._build(self.accounts.index(account), self.regions.index(region))
+        return self._regions[key]
+
+    def _build(self, ai: int, ri: int) -> RegionData:
+        s = self.spec
+        rnd = random.Random(f'{s.seed}:{ai}:{ri}')
+        acc, region = self.accounts[ai], self.regions[ri]
+        tag = f'{ai:03x}{ri:02x}'
+        d = RegionData()
+        it = d.items
+        for k in ('Vpcs', 'Subnets', 'RouteTables', 'NetworkAcls', 'InternetGateways', 'NatGateways', 'SecurityGroups',
+                  'NetworkInterfaces', 'Reservations', 'VpcEndpoints', 'LoadBalancers', 'TargetGroups', 'Functions'):
+            it[k] = []
+        subnets: List[Dict[str, Any]] = []
+        sgs_of: Dict[str, List[str]] = {}
+        for v in range(s.vpcs):
+            vid = f'vpc-{tag}{v:04x}'
+            it['Vpcs'].append({'VpcId': vid, 'CidrBlock': f'10.{v % 256}.0.0/16', 'IsDefault': v == 0})
+            igw = f'igw-{tag}{v:04x}'; nat = f'nat-{tag}{v:04x}'
+            it['InternetGateways'].append({'InternetGatewayId': igw, 'Attachments': [{'VpcId': vid, 'State': 'available'}]})
+            pub, priv = [], []
+            for n in range(s.subnets):
+                sid = f'subnet-{tag}{v:04x}{n:03x}'
+                public = n < max(1, s.subnets // 2)
+                row = {'SubnetId': sid, 'VpcId': vid, 'CidrBlock': f'10.{v % 256}.{n % 256}.0/24',
+                       'AvailabilityZone': f'{region}{"abc"[n % 3]}', 'MapPublicIpOnLaunch': public}
+                it['Subnets'].append(row); subnets.append(row)
+                (pub if public else priv).append(sid)
+            it['NatGateways'].append({'NatGatewayId': nat, 'VpcId': vid, 'SubnetId': pub[0], 'State': 'available'})
+            local = {'DestinationCidrBlock': f'10.{v % 256}.0.0/16', 'GatewayId': 'local', 'State': 'active'}
+            it['RouteTables'].append({'RouteTableId': f'rtb-{tag}{v:04x}0', 'VpcId': vid,
+                                      'Associations': [{'Main': True}] + [{'SubnetId': x} for x in priv],
+                                      'Routes': [local, {'DestinationCidrBlock': '0.0.0.0/0', 'NatGatewayId': nat, 'State': 'active'}]})
+            it['RouteTables'].append({'RouteTableId': f'rtb-{tag}{v:04x}1', 'VpcId': vid,
+                                      'Associations': [{'SubnetId': x} for x in pub],
+                                      'Routes': [local, {'DestinationCidrBlock': '0.0.0.0/0', 'GatewayId': igw, 'State': 'active'}]})
+            it['NetworkAcls'].append({'NetworkAclId': f'acl-{tag}{v:04x}', 'VpcId': vid, 'IsDefault': True,
+                                      'Associations': [{'SubnetId': x} for x in pub + priv], 'Entries': [
+                {'RuleNumber': 90, 'Protocol': '6', 'RuleAction': 'deny', 'Egress': False, 'CidrBlock': '0.0.0.0/0', 'PortRange': {'From': 3389, 'To': 3389}},
+                {'RuleNumber': 100, 'Protocol': '-1', 'RuleAction': 'allow', 'Egress': False, 'CidrBlock': '0.0.0.0/0'},
+                {'RuleNumber': 32767, 'Protocol': '-1', 'RuleAction': 'deny', 'Egress': False, 'CidrBlock': '0.0.0.0/0'},
+                {'RuleNumber': 100, 'Protocol': '-1', 'RuleAction': 'allow', 'Egress': True, 'CidrBlock': '0.0.0.0/0'},
+            ]})
+            sgids = [f'sg-{tag}{v:04x}{g:03x}' for g in range(s.sgs)]
+            sgs_of[vid] = sgids
+            for gi, sgid in enumerate(sgids):
+                perms = []
+                for r in range(s.sg_rules):
+                    port = rnd.choice((22, 80, 443, 3306, 5432, 6379, 8080))
+                    perm: Dict[str, Any] = {'IpProtocol': 'tcp', 'FromPort': port, 'ToPort': port, 'IpRanges': [], 'UserIdGroupPairs': []}
+                    kind = rnd.random()
+                    if kind < 0.2:
+                        perm['IpRanges'].append({'CidrIp': '0.0.0.0/0'})
+                    elif kind < 0.6:
+                        perm['UserIdGroupPairs'].append({'GroupId': rnd.choice(sgids)})
+                    else:
+                        perm['IpRanges'].append({'CidrIp': f'10.{rnd.randrange(256)}.0.0/16'})
+                    perms.append(perm)
+                it['SecurityGroups'].append({'GroupId': sgid, 'GroupName': f'sg{gi}', 'Description': 'bench', 'VpcId': vid, 'IpPermissions': perms,
+                                             'IpPermissionsEgress': [{'IpProtocol': '-1', 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}]})
+            it['VpcEndpoints'].append({'VpcEndpointId': f'vpce-{tag}{v:04x}', 'VpcId': vid, 'ServiceName': f'com.amazonaws.{region}.s3',
+                                       'VpcEndpointType': 'Gateway', 'PolicyDocument': json.dumps({'Statement': [{'Effect': 'Allow', 'Principal': '*', 'Action': '*'}]})})
+        instances = []
+        for i in range(s.instances if subnets else 0):
+            sn = subnets[i % len(subnets)]
+            iid = f'i-{tag}{i:06x}'; sg = rnd.choice(sgs_of[sn['VpcId']])
+            public_ip = f'54.{ai % 256}.{i // 256 % 256}.{i % 256}' if sn['MapPublicIpOnLaunch'] else None
+            inst = {'InstanceId': iid, 'SubnetId': sn['SubnetId'], 'VpcId': sn['VpcId'], 'State': {'Name': 'running'},
+                    'SecurityGroups': [{'GroupId': sg}], 'Tags': [{'Key': 'Name', 'Value': f'host-{i}'}],
+                    'MetadataOptions': {'HttpTokens': rnd.choice(('required', 'optional'))}}
+            if public_ip:
+                inst['PublicIpAddress'] = public_ip
+            it['Reservations'].append({'Instances': [inst]})
+            eni = {'NetworkInterfaceId': f'eni-{tag}{i:06x}', 'VpcId': sn['VpcId'], 'SubnetId': sn['SubnetId'],
+                   'PrivateIpAddress': f'10.0.{i // 256 % 256}.{i % 256}', 'Groups': [{'GroupId': sg}], 'Attachment': {'InstanceId': iid}}
+            if public_ip:
+                eni['Association'] = {'PublicIp': public_ip}
+            it['NetworkInterfaces'].append(eni)
+            instances.append(iid)
+        for b in range(s.lbs if subnets else 0):
+            sn = subnets[b % len(subnets)]; vid = sn['VpcId']
+            lbarn = f'arn:aws:elasticloadbalancing:{region}:{acc}:loadbalancer/app/lb{b}/{tag}{b:04x}'
+            tgarn = f'arn:aws:elasticloadbalancing:{region}:{acc}:targetgroup/tg{b}/{tag}{b:04x}'
+            it['LoadBalancers'].append({'LoadBalancerArn': lbarn, 'LoadBalancerName': f'lb{b}', 'DNSName': f'lb{b}.{region}.elb.amazonaws.com',
+                                        'Scheme': 'internet-facing' if b % 2 == 0 else 'internal', 'Type': 'application', 'VpcId': vid,
+                                        'AvailabilityZones': [{'SubnetId': x['SubnetId']} for x in subnets if x['VpcId'] == vid][:2],
+                                        'SecurityGroups': [sgs_of[vid][0]]})
+            it['TargetGroups'].append({'TargetGroupArn': tgarn, 'TargetGroupName': f'tg{b}', 'Protocol': 'HTTP', 'Port': 80,
+                                       'TargetType': 'instance', 'LoadBalancerArns': [lbarn]})
+            d.listeners[lbarn] = [{'Protocol': 'HTTPS', 'Port': 443, 'SslPolicy': 'ELBSecurityPolicy-2016-08'}, {'Protocol': 'HTTP', 'Port': 80}]
+            picks = rnd.sample(instances, min(s.targets, len(instances)))
+            d.health[tgarn] = [{'Target': {'Id': x, 'Port': 80}, 'TargetHealth': {'State': 'healthy'}} for x in picks]
+        for f in range(s.lambdas):
+            arn = f'arn:aws:lambda:{region}:{acc}:function:fn{f}'
+            fn: Dict[str, Any] = {'FunctionArn': arn, 'FunctionName': f'fn{f}', 'Runtime': rnd.choice(('python3.12', 'nodejs20.x', 'python3.7')),
+                                  'RevisionId': f'{tag}-{f}', 'TracingConfig': {'Mode': 'PassThrough'}}
+            if subnets and f % 3 == 0:
+                sn = subnets[f % len(subnets)]
+                fn['VpcConfig'] = {'VpcId': sn['VpcId'], 'SubnetIds': [sn['SubnetId']], 'SecurityGroupIds': [sgs_of[sn['VpcId']][0]]}
+            it['Functions'].append(fn)
+            if f % 5 == 0:
+                principal = '*' if f % 10 == 0 else {'Service': 's3.amazonaws.com'}
+                d.policies[arn] = json.dumps({'Statement': [{'Effect': 'Allow', 'Principal': principal, 'Action': 'lambda:InvokeFunction'}]})
+        return d
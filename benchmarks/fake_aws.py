@@ -0,0 +1,134 @@
+from __future__ import annotations
+from typing import Any, Callable, Dict, Optional, Tuple
+from collections import Counter
+import threading
+
+import botocore.session
+import orjson
+from botocore.awsrequest import AWSResponse
+
+from app.scheduler import current_task
+
+from .estate import Estate
+
+PAGE_SIZE = 100
+
+class _Body:
+    """Just enough of urllib3's response for botocore and the metrics hooks to read `content`."""
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+
+    def stream(self, **kw: Any):
+        yield self.data
+
+class FakeAWS:
+    """
+    Serves an Estate to real boto3 clients without any network.
+
+    Installed like the response cache, as a `before-call` handler on every pooled client
+    (botocore's Stubber works the same way, but insists on a fixed call order, which a
+    concurrent scan does not have). Each call is answered with the parsed response an
+    AWS endpoint would produce, split into pages along botocore's own paginator model;
+    operations the estate does not model return an empty response. Calls are counted
+    per (service, operation).
+    """
+    def __init__(self, estate: Estate, page_size: int = PAGE_SIZE) -> None:
+        self.estate = estate
+        self.page_size = page_size
+        self.calls: Counter = Counter()
+        self._paging: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+        self._handlers: Dict[Tuple[str, str], Callable[[str, str, Dict[str, Any]], Any]] = {
+            ('sts', 'GetCallerIdentity'): lambda acc, region, p: {'Account': acc, 'Arn': f'arn:aws:iam::{acc}:user/bench'},
+            ('sts', 'AssumeRole'): self._assume_role,
+            ('ec2', 'DescribeRegions'): lambda acc, region, p: {'Regions': [{'RegionName': r} for r in self.estate.regions]},
+            ('elbv2', 'DescribeListeners'): lambda acc, region, p: {'Listeners': self._data(acc, region, 'listeners').get(p.get('LoadBalancerArn'), [])},
+            ('elbv2', 'DescribeTargetHealth'): lambda acc, region, p: {'TargetHealthDescriptions': self._data(acc, region, 'health').get(p.get('TargetGroupArn'), [])},
+            ('elbv2', 'DescribeTags'): lambda acc, region, p: {'TagDescriptions': [{'ResourceArn': a, 'Tags': [{'Key': 'env', 'Value': 'bench'}]} for a in p.get('ResourceArns', [])]},
+            ('lambda', 'GetFunctionEventInvokeConfig'): lambda acc, region, p: _error('ResourceNotFoundException', 404),
+            ('lambda', 'GetPolicy'): self._policy,
+            ('s3', 'ListBuckets'): lambda acc, region, p: {'Buckets': self.estate.buckets.get(acc, [])},
+            ('s3', 'GetBucketLocation'): lambda acc, region, p: {'LocationConstraint': _location(self.estate.bucket_regions.get(p.get('Bucket'), 'us-east-1'))},
+        }
+
+    def install(self, client: Any) -> None:
+        service = client.meta.service_model.service_name
+        region = client.meta.region_name or 'us-east-1'
+        events = client.meta.events
+        # 'before-call' only sees the serialized request: keep the API parameters from before
+        events.register('before-parameter-build', lambda params, context, **kw: context.__setitem__('bench_params', dict(params)))
+        events.register('before-call', lambda model, context, **kw: self._respond(service, region, model.name, context.get('bench_params', {})))
+
+    def _account(self) -> str:
+        # scheduler tasks know their account; the identity task of an assumed role is keyed by its ARN
+        task = current_task.get()
+        key = task[0] if task else 'self'
+        if key.startswith('arn:'):
+            return key.split(':')[4]
+        return key if key in self.estate.accounts else self.estate.accounts[0]
+
+    def _data(self, acc: str, region: str, attr: str) -> Dict[str, Any]:
+        d = self.estate.region(acc, region)
+        return getattr(d, attr) if d is not None else {}
+
+    def _assume_role(self, acc: str, region: str, p: Dict[str, Any]) -> Dict[str, Any]:
+        target = p['RoleArn'].split(':')[4]
+        return {'Credentials': {'AccessKeyId': f'ASIA{target}', 'SecretAccessKey': 'bench', 'SessionToken': 'bench', 'Expiration': '2100-01-01T00:00:00Z'}}
+
+    def _policy(self, acc: str, region: str, p: Dict[str, Any]) -> Dict[str, Any]:
+        pol = self._data(acc, region, 'policies').get(p.get('FunctionName'))
+        return {'Policy': pol} if pol else _error('ResourceNotFoundException', 404)
+
+    def _paginator(self, service: str, op: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if service not in self._paging:
+                try:
+                    self._paging[service] = botocore.session.get_session().get_paginator_model(service)
+                except Exception:
+                    self._paging[service] = None
+            model = self._paging[service]
+        if model is None:
+            return None
+        try:
+            return model.get_paginator(op)
+        except ValueError:
+            return None
+
+    def _respond(self, service: str, region: str, op: str, params: Dict[str, Any]) -> Tuple[AWSResponse, Dict[str, Any]]:
+        with self._lock:
+            self.calls[(service, op)] += 1
+        acc = self._account()
+        handler = self._handlers.get((service, op))
+        if handler is not None:
+            parsed = handler(acc, region, params)
+        else:
+            parsed = self._listing(acc, region, service, op, params)
+        status = parsed.get('ResponseMetadata', {}).get('HTTPStatusCode', 200)
+        if (service, op) == ('s3', 'GetBucketLocation'):
+            # botocore re-parses this one from the raw XML body
+            body = f'<LocationConstraint>{parsed["LocationConstraint"] or ""}</LocationConstraint>'.encode()
+        else:
+            body = orjson.dumps(parsed, default=str)
+        parsed.setdefault('ResponseMetadata', {'HTTPStatusCode': status, 'RetryAttempts': 0})
+        return AWSResponse('https://fake.amazonaws.com/', status, {}, _Body(body)), parsed
+
+    def _listing(self, acc: str, region: str, service: str, op: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        """Describe / list calls answered from the region's items, one page at a time."""
+        pag = self._paginator(service, op)
+        key = pag.get('result_key') if pag else None
+        d = self.estate.region(acc, region)
+        if not isinstance(key, str) or d is None or key not in d.items:
+            return {}
+        items = d.items[key]
+        start = int(params.get(pag['input_token']) or 0) if isinstance(pag.get('input_token'), str) else 0
+        size = int(params.get(pag.get('limit_key') or '') or self.page_size)
+        out: Dict[str, Any] = {key: items[start:start + size]}
+        if start + size < len(items) and isinstance(pag.get('output_token'), str):
+            out[pag['output_token']] = str(start + size)
+        return out
+
+def _error(code: str, status: int) -> Dict[str, Any]:
+    return {'Error': {'Code': code, 'Message': code}, 'ResponseMetadata': {'HTTPStatusCode': status, 'RetryAttempts': 0}}
+
+def _location(region: str) -> Optional[str]:
+    return None if region == 'us-east-1' else region
@@ -0,0 +1,185 @@
+"""
+Scaling curves of the post-processing stages, on synthetic graphs of growing size.
+
+    python -m benchmarks.scaling                       # compare against benchmarks/baseline.json
+    python -m benchmarks.scaling --sizes 5000,10000,20000 --memory
+    python -m benchmarks.scaling --update-baseline
+
+Each size (instances per estate) is enumerated offline into graph buffers, then every stage
+is timed: commit into the Graph, the container pass, derive_reachability, findings.analyze,
+the SG / NACL exposure sweep over every ENI, Graph.elements and orjson serialization. The
+growth exponent of each stage is the slope of log(time) over log(elements). Exits 1 when a
+stage grows faster than its baseline exponent (plus tolerance) or runs slower than its
+baseline time (times tolerance) at the same size.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Dict, List, Optional, Tuple
+import argparse
+import gc
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import boto3
+import orjson
+
+from app.acl import AclTables
+from app.aws import ec2, elbv2, lambda_, nacl_tgw_vpn_dx
+from app.aws.cache import CACHE
+from app.aws.clients import POOL
+from app.findings import analyze
+from app.graph import Graph, GraphBuffer
+from app.reachability import derive_reachability
+from app.scan import add_containers
+from app.scheduler import current_task
+
+from .estate import Estate, EstateSpec
+from .fake_aws import FakeAWS
+
+BASELINE = os.path.join(os.path.dirname(__file__), 'baseline.json')
+SIZES = (15000, 30000, 60000, 140000)  # instances; about 7 graph elements each, so ~10^5 to 10^6 elements
+STAGES = ('commit', 'containers', 'reachability', 'findings', 'exposure', 'elements', 'orjson')
+MIN_FIT_SECONDS = 0.005  # shorter timings are mostly noise and stay out of the exponent fit
+ENUMERATORS = (('ec2', ec2.enumerate), ('elbv2', elbv2.enumerate), ('lambda', lambda_.enumerate), ('nacl_tgw_vpn_dx', nacl_tgw_vpn_dx.enumerate))
+
+def spec_for(instances: int) -> EstateSpec:
+    regions = min(12, max(1, instances // 10000))
+    per_region = max(1, instances // regions)
+    return EstateSpec(accounts=1, regions=regions, vpcs=max(1, per_region // 1000), subnets=6, sgs=8, sg_rules=6,
+                      instances=per_region, lambdas=per_region // 20, lbs=max(1, per_region // 200), targets=10, buckets=0)
+
+def buffers(spec: EstateSpec) -> List[Tuple[Tuple[str, str, str], GraphBuffer]]:
+    """Run the real EC2, ELBv2, Lambda and NACL enumerators over the estate, one buffer per task."""
+    estate = Estate(spec)
+    fake = FakeAWS(estate, page_size=1000)
+    sess = boto3.Session(aws_access_key_id='AKIABENCHMARK', aws_secret_access_key='bench')
+    enabled = CACHE.enabled
+    CACHE.enabled = False
+    POOL.clear(); POOL.hooks.append(fake.install)
+    out = []
+    try:
+        for acc in estate.accounts:
+            for region in estate.regions:
+                for svc, fn in ENUMERATORS:
+                    key = (acc, region, svc)
+                    buf, warnings = GraphBuffer(), []
+                    token = current_task.set(key)
+                    try:
+                        fn(sess, acc, region, buf, warnings)
+                    finally:
+                        current_task.reset(token)
+                    out.append((key, buf))
+    finally:
+        POOL.hooks.remove(fake.install); POOL.clear()
+        CACHE.enabled = enabled
+    return out
+
+def _stages(bufs: List[Tuple[Any, GraphBuffer]]) -> List[Tuple[str, Callable[[Dict[str, Any]], Any]]]:
+    def commit(st: Dict[str, Any]) -> None:
+        g = st['g'] = Graph(track_changes=True)
+        for key, buf in bufs:
+            g.commit(buf, key)
+    return [
+        ('commit', commit),
+        ('containers', lambda st: add_containers(st['g'])),
+        ('reachability', lambda st: derive_reachability(st['g'])),
+        ('findings', lambda st: analyze(st['g'])),
+        ('exposure', lambda st: AclTables(st['g']).sweep()),
+        ('elements', lambda st: st.__setitem__('els', st['g'].elements())),
+        ('orjson', lambda st: orjson.dumps(st['els'])),
+    ]
+
+def measure(instances: int, memory: bool = False) -> Dict[str, Any]:
+    """Seconds (and with `memory`, peak traced MiB) of every stage for one estate size."""
+    bufs = buffers(spec_for(instances))
+    row: Dict[str, Any] = {'instances': instances, 'seconds': {}, 'peak_mib': {}}
+    st: Dict[str, Any] = {}
+    gc.collect()
+    for name, fn in _stages(bufs):
+        t0 = time.perf_counter()
+        fn(st)
+        row['seconds'][name] = round(time.perf_counter() - t0, 4)
+    row['elements'] = len(st['els'])
+    if memory:
+        # a second pass: tracing slows allocation down too much to time the same run
+        st = {}
+        gc.collect()
+        tracemalloc.start()
+        try:
+            for name, fn in _stages(bufs):
+                tracemalloc.reset_peak()
+                base = tracemalloc.get_traced_memory()[0]
+                fn(st)
+                row['peak_mib'][name] = round((tracemalloc.get_traced_memory()[1] - base) / 2 ** 20, 1)
+        finally:
+            tracemalloc.stop()
+    return row
+
+def exponent(points: List[Tuple[float, float]]) -> Optional[float]:
+    """Least-squares slope of log(seconds) over log(elements); None with fewer than two usable points."""
+    pts = [(math.log(n), math.log(t)) for n, t in points if n > 0 and t >= MIN_FIT_SECONDS]
+    if len(pts) < 2:
+        return None
+    mx = sum(x for x, _ in pts) / len(pts); my = sum(y for _, y in pts) / len(pts)
+    var = sum((x - mx) ** 2 for x, _ in pts)
+    return round(sum((x - mx) * (y - my) for x, y in pts) / var, 2) if var else None
+
+def summarize(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    stages = {}
+    for s in STAGES:
+        stages[s] = {
+            'exponent': exponent([(r['elements'], r['seconds'][s]) for r in rows]),
+            'seconds': {str(r['instances']): r['seconds'][s] for r in rows},
+        }
+    return {'sizes': [r['instances'] for r in rows], 'elements': {str(r['instances']): r['elements'] for r in rows}, 'stages': stages}
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], exponent_tolerance: float = 0.3, time_tolerance: float = 2.0) -> List[str]:
+    """Regressions of `current` against `baseline`, as messages; empty when within tolerance."""
+    out = []
+    for s, cur in current['stages'].items():
+        base = baseline.get('stages', {}).get(s)
+        if base is None:
+            continue
+        if cur['exponent'] is not None and base.get('exponent') is not None and cur['exponent'] > base['exponent'] + exponent_tolerance:
+            out.append(f"{s}: grows as n^{cur['exponent']}, baseline n^{base['exponent']}")
+        for size, t in cur['seconds'].items():
+            bt = base.get('seconds', {}).get(size)
+            if bt is not None and t >= MIN_FIT_SECONDS and t > bt * time_tolerance:
+                out.append(f"{s}: {t}s at {size} instances, baseline {bt}s")
+    return out
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--sizes', default=','.join(map(str, SIZES)), help='comma-separated instance counts')
+    ap.add_argument('--memory', action='store_true', help='also trace peak memory per stage (a second, slower pass)')
+    ap.add_argument('--baseline', default=BASELINE)
+    ap.add_argument('--update-baseline', action='store_true')
+    ap.add_argument('--exponent-tolerance', type=float, default=0.3)
+    ap.add_argument('--time-tolerance', type=float, default=2.0, help='allowed slowdown factor at equal size')
+    args = ap.parse_args(argv)
+    rows = []
+    for n in sorted(int(x) for x in args.sizes.split(',')):
+        row = measure(n, args.memory)
+        rows.append(row)
+        print(f"{n} instances, {row['elements']} elements: " + ', '.join(
+            f"{s} {row['seconds'][s]}s" + (f" / {row['peak_mib'][s]} MiB" if s in row['peak_mib'] else '') for s in STAGES), file=sys.stderr)
+    current = summarize(rows)
+    print(json.dumps({**current, 'runs': rows}, indent=2))
+    if args.update_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as fh:
+            json.dump(current, fh, indent=2); fh.write('\n')
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f'no baseline at {args.baseline}; run with --update-baseline', file=sys.stderr)
+        return 0
+    with open(args.baseline, encoding='utf-8') as fh:
+        problems = compare(current, json.load(fh), args.exponent_tolerance, args.time_tolerance)
+    for p in problems:
+        print(f'REGRESSION {p}', file=sys.stderr)
+    return 1 if problems else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
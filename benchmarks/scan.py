@@ -0,0 +1,105 @@
+"""
+End-to-end scan benchmark against a synthetic estate, with no network.
+
+    python -m benchmarks.scan --preset medium
+    python -m benchmarks.scan --accounts 3 --regions 2 --instances 1000 --repeat 3
+
+Every run posts to the real `/enumerate` endpoint; AWS is answered by FakeAWS.
+"""
+from __future__ import annotations
+from typing import Any, Dict, List, Optional
+from dataclasses import asdict, fields
+import argparse
+import json
+import resource
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from app.aws.cache import CACHE
+from app.aws.clients import POOL
+from app.main import app
+
+from .estate import Estate, EstateSpec
+from .fake_aws import FakeAWS
+
+PRESETS: Dict[str, EstateSpec] = {
+    'small': EstateSpec(),
+    'medium': EstateSpec(accounts=2, regions=3, vpcs=3, instances=500, lambdas=100, lbs=20, buckets=100),
+    'large': EstateSpec(accounts=4, regions=6, vpcs=5, subnets=6, sgs=8, sg_rules=8, instances=2000, lambdas=300, lbs=50, targets=10, buckets=500),
+}
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux (bytes on macOS): the process-wide peak so far
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+def run(spec: EstateSpec, details: str = 'eager', services: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Scan `spec`'s estate once through `/enumerate` and report wall time, API calls, peak RSS and phase timings."""
+    estate = Estate(spec)
+    fake = FakeAWS(estate)
+    payload: Dict[str, Any] = {
+        'access_key_id': 'AKIABENCHMARK', 'secret_access_key': 'bench', 'regions': estate.regions, 'details': details,
+        'assume_roles': [estate.role_arn(acc) for acc in estate.accounts[1:]],
+    }
+    if services:
+        payload['services'] = {name: name in services for name in _service_names()}
+    enabled = CACHE.enabled
+    CACHE.enabled = False  # every call must reach the fake
+    POOL.clear(); POOL.hooks.append(fake.install)
+    try:
+        t0 = time.perf_counter()
+        res = TestClient(app).post('/enumerate', json=payload)
+        wall = time.perf_counter() - t0
+    finally:
+        POOL.hooks.remove(fake.install); POOL.clear()
+        CACHE.enabled = enabled
+    if res.status_code != 200:
+        raise RuntimeError(f'/enumerate failed: {res.status_code} {res.text[:500]}')
+    body = res.json()
+    return {
+        'spec': asdict(spec),
+        'wall_seconds': round(wall, 3),
+        'api_calls': sum(fake.calls.values()),
+        'calls_by_operation': {f'{s}.{o}': n for (s, o), n in fake.calls.most_common()},
+        'peak_rss_mb': peak_rss_mb(),
+        'phases': body['timings']['phases'],
+        'elements': len(body['elements']),
+        'findings': len(body['findings']),
+        'warnings': body['warnings'],
+    }
+
+def _service_names() -> List[str]:
+    from app.scan import SVC_LIST
+    return [name for name, _ in SVC_LIST]
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument('--preset', choices=sorted(PRESETS), default='small')
+    for f in fields(EstateSpec):
+        ap.add_argument(f'--{f.name.replace("_", "-")}', type=int, dest=f.name, help=f'override the preset ({f.name})')
+    ap.add_argument('--details', choices=('eager', 'lazy', 'skip'), default='eager')
+    ap.add_argument('--services', help='comma-separated services to enable (default: all)')
+    ap.add_argument('--repeat', type=int, default=1)
+    ap.add_argument('--out', help='also write the reports to this JSON file')
+    args = ap.parse_args(argv)
+    spec = EstateSpec(**{**asdict(PRESETS[args.preset]), **{f.name: getattr(args, f.name) for f in fields(EstateSpec) if getattr(args, f.name) is not None}})
+    services = args.services.split(',') if args.services else None
+    reports = []
+    for i in range(args.repeat):
+        rep = run(spec, args.details, services)
+        reports.append(rep)
+        print(f"run {i + 1}: {rep['wall_seconds']}s wall, {rep['api_calls']} API calls, {rep['elements']} elements, "
+              f"{rep['findings']} findings, peak RSS {rep['peak_rss_mb']} MiB, phases {rep['phases']}", file=sys.stderr)
+        if rep['warnings']:
+            print(f"  {len(rep['warnings'])} warnings, e.g. {rep['warnings'][0]}", file=sys.stderr)
+    out = json.dumps(reports if args.repeat > 1 else reports[0], indent=2, default=str)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as fh:
+            fh.write(out)
+    print(out)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,19 @@
+import pytest
+
+from app.graph import Graph, GraphBuffer
+
+@pytest.fixture
+def run_enumerator(monkeypatch):
+    """
+    `run(module, fake, account_id, region, g=None)` runs `module.enumerate` with every client
+    it asks for replaced by `fake`, commits the result into `g` (a new Graph by default) as
+    the module's task and returns (graph, warnings).
+    """
+    def run(module, fake, account_id, region, g=None):
+        monkeypatch.setattr(module, 'client', lambda sess, svc, region=None: fake)
+        buf, warnings = GraphBuffer(), []
+        module.enumerate(None, account_id, region, buf, warnings)
+        g = Graph() if g is None else g
+        g.commit(buf, (account_id, region, module.__name__.rsplit('.', 1)[-1].rstrip('_')))
+        return g, warnings
+    return run
@@ -0,0 +1,84 @@
+import numpy as np
+from fastapi.testclient import TestClient
+
+import app.aws.nacl_tgw_vpn_dx as nacl_tgw_vpn_dx
+from app.acl import AclTables, parse_ports
+from app.graph import Graph
+from app.main import app
+from app.snapshots import STORE, Snapshot
+
+ENTRIES = [
+    {'RuleNumber': 90, 'Protocol': '6', 'RuleAction': 'deny', 'Egress': False, 'CidrBlock': '0.0.0.0/0', 'PortRange': {'From': 3389, 'To': 3389}},
+    {'RuleNumber': 100, 'Protocol': '-1', 'RuleAction': 'allow', 'Egress': False, 'CidrBlock': '0.0.0.0/0'},
+    {'RuleNumber': 32767, 'Protocol': '-1', 'RuleAction': 'deny', 'Egress': False, 'CidrBlock': '0.0.0.0/0'},
+    {'RuleNumber': 100, 'Protocol': '-1', 'RuleAction': 'allow', 'Egress': True, 'CidrBlock': '0.0.0.0/0'},
+]
+
+class _Ec2:
+    def describe_network_acls(self):
+        return {'NetworkAcls': [{'NetworkAclId': 'acl-1', 'VpcId': 'vpc-1', 'IsDefault': True, 'Entries': ENTRIES,
+                                 'Associations': [{'SubnetId': 'subnet-1'}]}]}
+
+    def describe_transit_gateways(self):
+        return {}
+
+    def describe_vpc_peering_connections(self):
+        return {}
+
+def _sg(g, sg, cidr, proto, lo, hi):
+    g.add_node(f'cidr:{cidr}', cidr, 'cidr')
+    g.add_edge(f'{sg}:{cidr}:{proto}:{lo}', f'cidr:{cidr}', sg, 'rule', 'sg-rule', 'network',
+               {'direction': 'ingress', 'rules': [{'proto': proto, 'from': lo, 'to': hi}]})
+
+def _eni(g, eni, subnet, sgs, public_ip='54.0.0.1'):
+    g.add_node(eni, eni, 'eni', details={'public_ip': public_ip}, parent=subnet)
+    for sg in sgs:
+        g.add_edge(f'{eni}:{sg}', eni, sg, 'has-sg', 'attach', 'resource')
+
+def _graph(run_enumerator):
+    g = Graph()
+    g.add_node('subnet:111:r:subnet-1', 'subnet-1', 'subnet')
+    g.add_node('subnet-2', 'subnet-2', 'subnet')
+    run_enumerator(nacl_tgw_vpn_dx, _Ec2(), '111', 'r', g)
+    for sg in ('sg-web', 'sg-admin', 'sg-priv'):
+        g.add_node(sg, sg, 'security_group')
+    _sg(g, 'sg-web', '0.0.0.0/0', 'tcp', 80, 443)
+    _sg(g, 'sg-admin', '0.0.0.0/0', '-1', None, None)
+    _sg(g, 'sg-priv', '10.0.0.0/8', 'tcp', 22, 22)
+    _eni(g, 'eni-web', 'subnet:111:r:subnet-1', ['sg-web', 'sg-priv'])
+    _eni(g, 'eni-admin', 'subnet:111:r:subnet-1', ['sg-admin'])
+    _eni(g, 'eni-open', 'subnet-2', ['sg-admin'])  # no NACL known for this subnet
+    _eni(g, 'eni-inner', 'subnet:111:r:subnet-1', ['sg-admin'], public_ip=None)
+    return g
+
+def test_nacl_entries_are_captured_with_associations(run_enumerator):
+    g = _graph(run_enumerator)
+    n = g.node('nacl:111:r:acl-1')
+    assert n.details['default'] is True and len(n.details['entries']) == 4
+    assert n.details['entries'][0] == {'rule': 90, 'egress': False, 'proto': '6', 'from': 3389, 'to': 3389, 'cidr': '0.0.0.0/0', 'action': 'deny'}
+    assert [e.target for e in g.out_edges('subnet:111:r:subnet-1', 'assoc')] == ['nacl:111:r:acl-1']
+
+def test_security_groups_and_first_matching_nacl_entry_decide(run_enumerator):
+    t = AclTables(_graph(run_enumerator))
+    ports = [('tcp', 22), ('tcp', 443), ('tcp', 3389), ('udp', 53)]
+    hit = t.admits(['0.0.0.0/0', '10.1.2.3'], ports)
+    row = {eni: hit[i] for i, eni in enumerate(t.enis)}
+    assert row['eni-web'][0].tolist() == [False, True, False, False]
+    assert row['eni-web'][1].tolist() == [True, True, False, False]  # 10.1.2.3 is inside 10.0.0.0/8
+    assert row['eni-admin'][0].tolist() == [True, True, False, True]  # rule 90 denies RDP before rule 100
+    assert row['eni-open'][0].tolist() == [True, True, True, True]
+    res = t.sweep(['0.0.0.0/0'], ports)
+    assert {r['id'] for r in res['results']} == {'eni-web', 'eni-admin', 'eni-open'} and res['total'] == 3
+    assert [o['port'] for o in res['results'][0]['open']] == ['tcp:443']
+    assert t.sweep(['0.0.0.0/0'], ports, public_only=False)['total'] == 4
+    assert not np.any(t.admits(['::/0'], ports))
+
+def test_exposure_endpoint(run_enumerator):
+    snap = Snapshot('acl-test', _graph(run_enumerator), [], [], {}, {})
+    STORE.put(snap)
+    c = TestClient(app)
+    res = c.get('/exposure', params={'ports': 'tcp:3389,tcp:443', 'snapshot': snap.id}).json()
+    assert res['ports'] == ['tcp:3389', 'tcp:443'] and res['total'] == 3
+    assert c.get('/exposure', params={'ports': 'tcp:http', 'snapshot': snap.id}).status_code == 400
+    assert c.get('/exposure', params={'source': 'nope', 'snapshot': snap.id}).status_code == 400
+    assert parse_ports('TCP:22, udp:53') == [('tcp', 22), ('udp', 53)]
@@ -0,0 +1,12 @@
+from benchmarks.estate import EstateSpec
+from benchmarks.scan import run
+
+def test_synthetic_estate_scans_end_to_end():
+    rep = run(EstateSpec(accounts=2, instances=150, lambdas=5, lbs=2, buckets=3))
+    assert rep['warnings'] == []
+    calls = rep['calls_by_operation']
+    assert calls['sts.AssumeRole'] == 1 and calls['sts.GetCallerIdentity'] == 2
+    assert calls['ec2.DescribeInstances'] == 4  # two pages of 100 per account
+    assert calls['elbv2.DescribeTargetGroups'] == 2 and calls['elbv2.DescribeTargetHealth'] == 4
+    assert set(rep['phases']) == {'enumerate', 'containers', 'reachability', 'findings', 'layout', 'elements'}
+    assert rep['elements'] > 2 * 150 and rep['findings'] > 0 and rep['peak_rss_mb'] > 0
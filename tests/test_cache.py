@@ -0,0 +1,42 @@
+import time
+
+from app.aws.cache import ResponseCache, principal
+from app.scheduler import current_task
+
+def test_get_respects_ttl_and_max_age(tmp_path):
+    c = ResponseCache(str(tmp_path), default_ttl=60)
+    key = c.make_key('123456789012', 'eu-west-1', 'sqs', 'ListQueues', {})
+    assert c.get(key, 'sqs') is None
+    c.put(key, 'sqs', 'ListQueues', '123456789012', 'eu-west-1', {'QueueUrls': ['q1']})
+    assert c.get(key, 'sqs') == {'QueueUrls': ['q1']}
+    assert c.get(key, 'sqs', limit=0) is None
+
+def test_lru_eviction_keeps_recently_used(tmp_path):
+    c = ResponseCache(str(tmp_path), max_bytes=10_000)
+    blob = {'x': 'y' * 3000}
+    keys = [c.make_key('123456789012', 'r', 'sqs', 'ListQueues', {'i': i}) for i in range(3)]
+    for k in keys:
+        c.put(k, 'sqs', 'ListQueues', '123456789012', 'r', blob); time.sleep(0.01)
+    assert c.get(keys[0], 'sqs') is not None  # touch the oldest
+    c.put(c.make_key('123456789012', 'r', 'sqs', 'ListQueues', {'i': 9}), 'sqs', 'ListQueues', '123456789012', 'r', blob)
+    assert c.get(keys[0], 'sqs') is not None
+    assert c.get(keys[1], 'sqs') is None
+    assert c.stats()['bytes'] <= 10_000
+
+def test_entries_are_scoped_to_the_caller(tmp_path):
+    class _Model:
+        name = 'ListQueues'
+    c = ResponseCache(str(tmp_path))
+    keys = []
+    token = current_task.set(('123456789012', 'eu-west-1', 'sqs'))
+    try:
+        for caller in (None, 'arn:aws:sts::123456789012:assumed-role/audit/s', 'arn:aws:iam::123456789012:user/admin'):
+            ctx = {}
+            t = principal.set(caller)
+            c._keyed('sqs', 'eu-west-1', {}, _Model(), ctx)
+            principal.reset(t)
+            keys.append(ctx.get('awsenum_cache'))
+    finally:
+        current_task.reset(token)
+    assert keys[0] is None  # unknown caller: not cached
+    assert keys[1][0] != keys[2][0]
@@ -0,0 +1,78 @@
+from fastapi.testclient import TestClient
+
+from app.cidr import CidrIndex
+from app.findings import analyze
+from app.graph import Graph
+from app.main import app
+from app.snapshots import STORE, Snapshot
+
+def _graph(vpc_a='10.0.0.0/16'):
+    g = Graph()
+    g.add_node('vpc-a', 'vpc-a', 'vpc', details={'cidr': vpc_a}, account_id='111')
+    g.add_node('vpc-b', 'vpc-b', 'vpc', details={'cidr': '10.0.128.0/17'}, account_id='222')
+    g.add_node('vpc-c', 'vpc-c', 'vpc', details={'cidr': '10.1.0.0/16'}, account_id='111')
+    g.add_node('subnet-a', 'subnet-a', 'subnet', details={'cidr': '10.0.1.0/24'}, parent='vpc-a', account_id='111')
+    g.add_node('rtb-a', 'rtb-a', 'route_table', parent='vpc-a', account_id='111')
+    g.add_node('igw-1', 'igw-1', 'igw')
+    g.add_node('pcx-1', 'pcx-1', 'pcx', details={'status': 'active',
+        'requester': {'vpc': 'vpc-a', 'cidrs': ['10.0.0.0/16']}, 'accepter': {'vpc': 'vpc-b', 'cidrs': ['10.0.128.0/17']}})
+    g.add_edge('r1', 'rtb-a', 'igw-1', 'route', 'route', 'network', {'destination': '0.0.0.0/0', 'target_type': 'igw'})
+    g.add_edge('r2', 'rtb-a', 'pcx-1', 'route', 'route', 'network', {'destination': '10.0.200.0/24', 'target_type': 'pcx'})
+    g.add_edge('r3', 'rtb-a', 'igw-1', 'route', 'route', 'network', {'destination': '10.0.1.0/24', 'target_type': 'igw', 'state': 'blackhole'})
+    g.add_node('sg-1', 'sg-1', 'security_group', account_id='111')
+    g.add_node('cidr:0.0.0.0/00', '0.0.0.0/00', 'cidr')  # a public source not spelled 0.0.0.0/0
+    g.add_edge('sg-1:any', 'cidr:0.0.0.0/00', 'sg-1', 'tcp:22', 'sg-rule', 'network',
+               {'direction': 'ingress', 'rules': [{'proto': 'tcp', 'from': 22, 'to': 22}]})
+    return g
+
+def _ids(entries):
+    return [(e['kind'], e['id']) for e in entries]
+
+def test_covering_returns_entries_most_specific_first():
+    ix = CidrIndex(_graph())
+    assert _ids(ix.covering('10.0.1.7')) == [('route', 'r3'), ('subnet', 'subnet-a'), ('vpc', 'vpc-a'), ('route', 'r1'), ('sg-rule', 'sg-1:any')]
+    assert _ids(ix.covering('10.0.200.0/25', ['vpc'])) == [('vpc', 'vpc-b'), ('vpc', 'vpc-a')]
+    assert ix.covering('2001:db8::1') == [] and ix.covering('not an ip') is None
+    # longest prefix per route table, blackholes skipped
+    assert {k: e.id for k, e in ix.routes_covering(ix.nets[ix.ids.index('subnet-a')]).items()} == {'rtb-a': 'r1'}
+
+def test_overlaps_and_peering_conflicts():
+    g = _graph()
+    ix = CidrIndex(g)
+    res = ix.overlaps('vpc')
+    assert [(p['a']['id'], p['b']['id']) for p in res['pairs']] == [('vpc-a', 'vpc-b')] and not res['truncated']
+    assert ix.overlaps('vpc', limit=0)['truncated']
+    types = sorted(c['type'] for c in ix.peering_conflicts()['conflicts'])
+    assert types == ['overlapping-peers', 'route-inside-vpc']
+    ids = {f['id'] for f in analyze(g)}
+    assert 'finding:pcx-1:pcx-cidr-conflict' in ids
+    assert 'finding:sg-1:any:sg-public-ingress' in ids
+
+def test_peering_conflicts_are_re_evaluated_when_a_distant_vpc_changes():
+    g = _graph(vpc_a='10.9.0.0/16')  # does not cover the route to the peering
+    previous = analyze(g)
+    g.add_node('vpc-a', 'vpc-a', 'vpc', details={'cidr': '10.0.0.0/16'})  # vpc-a has no edges to pcx-1
+    inc = analyze(g, {(False, 'vpc-a')}, previous)
+    assert inc == analyze(g) and inc != previous
+    assert 'route-inside-vpc' in next(f['detail'] for f in inc if f['rule'] == 'pcx-cidr-conflict')
+
+def test_ambiguous_peers_do_not_depend_on_insertion_order():
+    for order in (['pcx-1', 'pcx-2'], ['pcx-2', 'pcx-1']):
+        g = Graph()
+        for pcx in order:  # two overlapping CIDR pairs across the same two peerings: one conflict
+            vpc, cidrs = {'pcx-1': ('vpc-b', ['10.1.0.0/16', '10.2.0.0/16']), 'pcx-2': ('vpc-c', ['10.1.0.0/24', '10.2.0.0/24'])}[pcx]
+            g.add_node(pcx, pcx, 'pcx', details={'status': 'active',
+                'requester': {'vpc': 'vpc-a', 'cidrs': ['10.0.0.0/16']}, 'accepter': {'vpc': vpc, 'cidrs': cidrs}})
+        res = [c for c in CidrIndex(g).peering_conflicts()['conflicts'] if c['type'] == 'ambiguous-peers']
+        assert [(c['vpc'], c['pcx'], c['cidrs']) for c in res] == [('vpc-a', ['pcx-1', 'pcx-2'], ['10.1.0.0/16', '10.1.0.0/24'])]
+
+def test_cidr_endpoints():
+    snap = Snapshot('cidr-test', _graph(), [], [], {}, {})
+    STORE.put(snap)
+    c = TestClient(app)
+    res = c.get('/cidr', params={'q': '10.0.200.9', 'kind': 'vpc,subnet', 'snapshot': snap.id}).json()
+    assert _ids(res['covering']) == [('vpc', 'vpc-b'), ('vpc', 'vpc-a')]
+    assert c.get('/cidr', params={'q': 'x', 'snapshot': snap.id}).status_code == 400
+    assert c.get('/cidr', params={'q': '10.0.0.1', 'kind': 'nope', 'snapshot': snap.id}).status_code == 400
+    assert len(c.get('/cidr/overlaps', params={'snapshot': snap.id}).json()['pairs']) == 1
+    assert len(c.get('/cidr/peering', params={'snapshot': snap.id}).json()['conflicts']) == 2
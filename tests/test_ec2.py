@@ -0,0 +1,51 @@
+import threading
+
+from botocore.exceptions import ClientError
+
+import app.aws.ec2 as ec2
+
+ACC = '111111111111'
+R = 'eu-west-1'
+
+PAGES = {
+    'Vpcs': [[{'VpcId': 'vpc-1', 'CidrBlock': '10.0.0.0/16'}], [{'VpcId': 'vpc-2', 'CidrBlock': '10.1.0.0/16'}]],
+    'Subnets': [[{'SubnetId': 'subnet-1', 'VpcId': 'vpc-1'}], [{'SubnetId': 'subnet-2', 'VpcId': 'vpc-2'}]],
+    'SecurityGroups': [[{'GroupId': 'sg-1', 'VpcId': 'vpc-1', 'IpPermissions': [
+        {'IpProtocol': 'tcp', 'FromPort': 22, 'ToPort': 22, 'IpRanges': [{'CidrIp': '0.0.0.0/0'}]}]}]],
+    'Reservations': [[{'Instances': [{'InstanceId': 'i-1', 'SubnetId': 'subnet-1', 'SecurityGroups': [{'GroupId': 'sg-1'}]}]}],
+                     [{'Instances': [{'InstanceId': 'i-2', 'SubnetId': 'subnet-2'}]}]],
+}
+
+class _Ec2:
+    def __init__(self, fail=()):
+        self.fail = fail
+        # every describe must be in flight at the same time for all of them to pass
+        self.barrier = threading.Barrier(len(ec2.DESCRIBES), timeout=5)
+
+    def get_paginator(self, op):
+        return _Paginator(self, op)
+
+class _Paginator:
+    def __init__(self, fake, op):
+        self.fake, self.op = fake, op
+
+    def paginate(self):
+        self.fake.barrier.wait()
+        if self.op in self.fake.fail:
+            raise ClientError({'Error': {'Code': 'UnauthorizedOperation'}}, self.op)
+        key = dict(ec2.DESCRIBES)[self.op]
+        for page in PAGES.get(key, [[]]):
+            yield {key: page}
+
+def test_describes_run_concurrently_across_all_pages(run_enumerator):
+    g, warnings = run_enumerator(ec2, _Ec2(fail=('describe_nat_gateways',)), ACC, R)
+    assert warnings == [f'[{ACC}/{R}] describe_nat_gateways: UnauthorizedOperation']
+    assert [n.id for n in g.nodes('vpc')] == [f'vpc:{ACC}:{R}:vpc-1', f'vpc:{ACC}:{R}:vpc-2']
+    assert len(g.nodes('subnet')) == 2 and len(g.nodes('instance')) == 2
+    assert g.node(f'i:{ACC}:{R}:i-2').parent == f'subnet:{ACC}:{R}:subnet-2'
+    assert len(g.edges('sg-rule')) == 1 and [e.label for e in g.out_edges(f'i:{ACC}:{R}:i-1')] == ['in-subnet', 'has-sg']
+
+def test_vpc_failure_skips_the_region(run_enumerator):
+    g, warnings = run_enumerator(ec2, _Ec2(fail=('describe_vpcs',)), ACC, R)
+    assert warnings == [f'[{ACC}/{R}] describe_vpcs: UnauthorizedOperation']
+    assert g.nodes() == []
@@ -0,0 +1,62 @@
+import threading
+
+import app.aws.elbv2 as elbv2
+
+ACC = '111111111111'
+R = 'eu-west-1'
+
+def _arn(kind, i):
+    return f'arn:aws:elasticloadbalancing:{R}:{ACC}:{kind}/app/x{i}'
+
+class _Elb:
+    def __init__(self, n):
+        self.lbs = [{'LoadBalancerArn': _arn('loadbalancer', i), 'LoadBalancerName': f'lb{i}', 'Scheme': 'internet-facing',
+                     'Type': 'application', 'VpcId': 'vpc-1', 'SecurityGroups': ['sg-1']} for i in range(n)]
+        self.tgs = [{'TargetGroupArn': _arn('targetgroup', i), 'TargetGroupName': f'tg{i}', 'Protocol': 'HTTP', 'Port': 80,
+                     'TargetType': 'instance', 'LoadBalancerArns': [_arn('loadbalancer', i)]} for i in range(n)]
+        self.tgs.append({'TargetGroupArn': _arn('targetgroup', 'orphan'), 'LoadBalancerArns': []})
+        self.calls = []
+        self.threads = set()
+        self.lock = threading.Lock()
+
+    def _log(self, op, arg):
+        with self.lock:
+            self.calls.append((op, arg)); self.threads.add(threading.get_ident())
+
+    def get_paginator(self, op):
+        return _Paginator(self, op)
+
+    def describe_target_health(self, TargetGroupArn):
+        self._log('describe_target_health', TargetGroupArn)
+        return {'TargetHealthDescriptions': [{'Target': {'Id': 'i-' + TargetGroupArn[-1]}}]}
+
+    def describe_tags(self, ResourceArns):
+        self._log('describe_tags', len(ResourceArns))
+        return {'TagDescriptions': [{'ResourceArn': a, 'Tags': [{'Key': 'env', 'Value': 'prod'}]} for a in ResourceArns]}
+
+class _Paginator:
+    def __init__(self, elb, op):
+        self.elb, self.op = elb, op
+
+    def paginate(self, **kw):
+        self.elb._log(self.op, kw.get('LoadBalancerArn'))
+        if self.op == 'describe_load_balancers':
+            for i in range(0, len(self.elb.lbs), 10):
+                yield {'LoadBalancers': self.elb.lbs[i:i + 10]}
+        elif self.op == 'describe_target_groups':
+            yield {'TargetGroups': self.elb.tgs}
+        else:
+            yield {'Listeners': [{'Protocol': 'HTTPS', 'Port': 443, 'SslPolicy': 'ELBSecurityPolicy-2016-08'}]}
+
+def test_target_groups_are_listed_once_and_tags_batched(run_enumerator):
+    fake = _Elb(45)
+    g, warnings = run_enumerator(elbv2, fake, ACC, R)
+    ops = [op for op, _ in fake.calls]
+    assert ops.count('describe_target_groups') == 1 and ops.count('describe_load_balancers') == 1
+    assert ops.count('describe_listeners') == 45 and ops.count('describe_target_health') == 45  # orphan TG skipped
+    assert sorted(n for op, n in fake.calls if op == 'describe_tags') == [5, 20, 20]
+    assert len(fake.threads) > 1 and warnings == []
+    assert len(g.nodes('load_balancer')) == 45 and len(g.nodes('target_group')) == 45
+    assert len(g.edges('bind')) == len(g.edges('tg-target')) == len(g.edges('listener')) == 45
+    lb = g.node(f'lb:{ACC}:{R}:{_arn("loadbalancer", 7)}')
+    assert lb.details['tags'] == {'env': 'prod'}
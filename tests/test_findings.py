@@ -0,0 +1,60 @@
+from app.findings import RULES, analyze
+from app.graph import Graph
+from app.scheduler import current_task
+
+def _graph():
+    g = Graph()
+    g.add_node('sg-1', 'web (sg-1)', 'security_group', details={'name': 'web'})
+    g.add_node('cidr-any', '0.0.0.0/0', 'cidr')
+    g.add_edge('rule-1', 'cidr-any', 'sg-1', 'tcp:22', 'sg-rule', 'network',
+               {'direction': 'ingress', 'rules': [{'proto': 'tcp', 'from': 0, 'to': 5000}]})
+    g.add_node('i-1', 'i-1', 'instance', details={'imds_tokens': 'optional'})
+    g.add_node('db', 'db', 'rds_instance', details={'PubliclyAccessible': True, 'encrypted': True})
+    return g
+
+def _ids(fs):
+    return sorted(f['id'] for f in fs)
+
+def test_rules_dispatch_by_type_and_order_by_severity():
+    assert len(RULES) >= 50
+    fs = analyze(_graph())
+    rules = {f['rule'] for f in fs}
+    assert {'sg-public-ingress', 'sg-public-wide-port-range', 'instance-imdsv1', 'rds-public'} <= rules
+    # one finding per edge, naming the sensitive ports it opens; 6379 (Redis) is outside 0-5000
+    [ingress] = [f['detail'] for f in fs if f['rule'] == 'sg-public-ingress']
+    assert ingress.startswith('tcp:22 to sg-1, exposes FTP (21), SSH (22), Telnet (23),')
+    assert 'RDP (3389)' in ingress and 'MySQL (3306)' in ingress and 'Redis' not in ingress
+    assert 'sg-unused' in rules
+    assert fs[0]['severity'] == 'High' and fs[-1]['severity'] in ('Medium', 'Low', 'Info')
+
+def test_changed_only_evaluation_matches_a_full_run():
+    g = _graph()
+    previous = analyze(g)
+    # i-1 becomes internet-reachable, the DB turns out to be unencrypted
+    g.add_node('internet', 'Internet', 'external')
+    g.add_edge('derived', 'internet', 'i-1', 'tcp:22', 'derived-reachability', 'network', derived=True)
+    g.add_node('db', 'db', 'rds_instance', details={'encrypted': False})
+    changed = {(True, 'derived'), (False, 'internet'), (False, 'db')}
+    assert _ids(analyze(g, changed, previous)) == _ids(analyze(g))
+    assert 'finding:i-1:instance-public-imdsv1' in _ids(analyze(g, changed, previous))
+
+    # a removed edge re-evaluates both endpoints: the SG is now unused
+    key = ('111111111111', 'eu-west-1', 'ec2')
+    token = current_task.set(key)
+    g.add_edge('has-sg-2', 'i-1', 'sg-1', 'has-sg', 'attach', 'resource')
+    current_task.reset(token)
+    previous = analyze(g)
+    assert 'finding:sg-1:sg-unused' not in _ids(previous)
+    g.remove_owner(key)
+    changed = {(True, 'has-sg-2'), (False, 'i-1'), (False, 'sg-1')}
+    assert _ids(analyze(g, changed, previous)) == _ids(analyze(g))
+    assert 'finding:sg-1:sg-unused' in _ids(analyze(g, changed, previous))
+
+def test_public_listeners_are_decided_by_the_source_node():
+    g = Graph()
+    g.add_node('lb-1', 'lb-1', 'load_balancer', details={'scheme': 'internet-facing'})
+    g.add_node('ext-any', 'Internet', 'external', details={'cidr': '::/0'})
+    g.add_node('vpc:0.0.0.0/0', 'VPC', 'external')  # spelled like a public CIDR, but not the internet
+    g.add_edge('l-1', 'ext-any', 'lb-1', 'HTTPS:443', 'listener', 'network', {'protocol': 'HTTPS'})
+    g.add_edge('l-2', 'vpc:0.0.0.0/0', 'lb-1', 'HTTP:80', 'listener', 'network', {'protocol': 'HTTP'})
+    assert [f['id'] for f in analyze(g) if f['rule'].startswith('lb-')] == ['finding:l-1:lb-listener']
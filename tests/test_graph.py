@@ -0,0 +1,44 @@
+from app.graph import Graph, GraphBuffer
+from app.scheduler import current_task
+
+def test_indexes_follow_adds_and_owner_removal():
+    g = Graph(track_changes=True)
+    token = current_task.set(('111111111111', 'eu-west-1', 'ec2'))
+    g.add_node('i-1', 'i-1', 'instance', 'eu-west-1', {'public_ip': '1.2.3.4'})
+    g.add_node('subnet-1', 'subnet-1', 'subnet', 'eu-west-1')
+    g.add_edge('e1', 'i-1', 'subnet-1', 'in', 'attach', 'resource')
+    current_task.reset(token)
+    g.add_edge('e2', 'subnet-1', 'rtb-1', 'assoc', 'assoc', 'network')
+
+    assert [n.id for n in g.nodes('instance')] == ['i-1']
+    assert [e.id for e in g.out_edges('i-1')] == ['e1']
+    assert [e.id for e in g.in_edges('subnet-1', 'attach')] == ['e1']
+    assert [e.id for e in g.edges('assoc')] == ['e2']
+    assert g.elements()[0] == {'data': {'id': 'i-1', 'label': 'i-1', 'type': 'instance', 'region': 'eu-west-1',
+                                        'details': {'public_ip': '1.2.3.4'}, 'parent': None, 'account_id': ''}}
+    assert len(g.drain_changes()) == 4
+
+    assert g.remove_owner(('111111111111', 'eu-west-1', 'ec2')) == 3
+    assert g.nodes('instance') == [] and g.in_edges('subnet-1') == []
+    assert [e.id for e in g.out_edges('subnet-1')] == ['e2']  # owned by POST, kept
+    assert g.counts() == {'nodes': 0, 'edges': 1}
+    assert set(g.drain_removed()) == {(False, 'i-1'), (False, 'subnet-1'), (True, 'e1')}
+
+def test_buffer_commit_keeps_merge_rules_and_owner():
+    g = Graph()
+    g.add_node('vpc-1', 'vpc-1', 'vpc', 'eu-west-1', {'cidr': '10.0.0.0/16'})
+    buf = GraphBuffer()
+    buf.add_node('vpc-1', 'other', 'vpc', 'eu-west-1', {'default': False}, account_id='111111111111')
+    buf.add_node('subnet-1', 'subnet-1', 'subnet', 'eu-west-1', {'az': 'a'})
+    buf.add_node('subnet-1', 'subnet-1', 'subnet', 'eu-west-1', {'az': 'b'}, parent='vpc-1')
+    buf.add_edge('e1', 'subnet-1', 'vpc-1', 'in', 'attach', 'resource')
+    buf.add_edge('e1', 'subnet-1', 'vpc-1', 'dup', 'attach', 'resource')
+    assert g.counts() == {'nodes': 1, 'edges': 0}  # nothing lands before the commit
+
+    key = ('111111111111', 'eu-west-1', 'ec2')
+    g.commit(buf, key)
+    vpc, subnet = g.node('vpc-1'), g.node('subnet-1')
+    assert (vpc.label, vpc.details, vpc.account_id) == ('vpc-1', {'cidr': '10.0.0.0/16', 'default': False}, '111111111111')
+    assert (subnet.details, subnet.parent) == ({'az': 'b'}, 'vpc-1')
+    assert g.edge('e1').label == 'in'
+    assert g.remove_owner(key) == 2  # vpc-1 is still owned by the direct add_node
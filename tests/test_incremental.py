@@ -0,0 +1,91 @@
+import app.scan as scan
+from app.jobs import Job
+
+class _Sts:
+    def get_caller_identity(self):
+        return {'Account': '111111111111'}
+
+def _patch(monkeypatch, state):
+    def fake_lambda(sess, account_id, region, g, warnings):
+        state['runs'] += 1
+        for name in state['functions']:
+            g.add_node(f'lambda:{account_id}:{region}:{name}', name, 'lambda', region, account_id=account_id)
+
+    def fake_sqs(sess, account_id, region, g, warnings):
+        for q in state['queues']:
+            g.add_node(f'sqs:{account_id}:{region}:{q}', q, 'sqs_queue', region, account_id=account_id)
+
+    monkeypatch.setattr(scan, 'client', lambda sess, svc, region=None: _Sts())
+    monkeypatch.setattr(scan, 'SVC_LIST', [('lambda', fake_lambda), ('sqs_sns', fake_sqs)])
+    monkeypatch.setattr(scan, 'FINGERPRINTS', {'lambda': lambda sess, acc, region: sorted(state['functions'])})
+
+def test_incremental_scan_reuses_unchanged_services_and_returns_diff(monkeypatch):
+    state = {'runs': 0, 'functions': ['f1', 'f2'], 'queues': ['q1']}
+    _patch(monkeypatch, state)
+    payload = {'access_key_id': 'AKIATEST', 'secret_access_key': 'x', 'regions': ['eu-west-1']}
+
+    full = scan.run_scan(Job(payload))
+    assert state['runs'] == 1
+    assert {'f1', 'f2', 'q1'} <= {e['data']['label'] for e in full['elements']}
+
+    state['queues'] = ['q2']
+    inc = scan.run_scan(Job({**payload, 'incremental': True}))
+    assert state['runs'] == 1  # lambda fingerprint unchanged: not enumerated again
+    assert inc['base_snapshot'] == full['snapshot_id']
+    assert [e['data']['label'] for e in inc['added']] == ['q2']
+    assert inc['removed'] == ['sqs:111111111111:eu-west-1:q1']
+    assert inc['stats'] == {'tasks': 2, 'reused': 1}
+
+    state['functions'] = ['f1']
+    inc = scan.run_scan(Job({**payload, 'incremental': True}))
+    assert state['runs'] == 2
+    assert inc['added'] == [] and inc['removed'] == ['lambda:111111111111:eu-west-1:f2']
+
+def test_incremental_scan_leaves_the_base_snapshot_readable_and_intact(monkeypatch):
+    from app.snapshots import STORE
+    state = {'runs': 0, 'functions': ['f1'], 'queues': ['q1']}
+    _patch(monkeypatch, state)
+    payload = {'access_key_id': 'AKIATEST', 'secret_access_key': 'x', 'regions': ['eu-west-1']}
+    full = scan.run_scan(Job(payload))
+    base = STORE.get(full['snapshot_id'])
+    held = []
+    fake_sqs = dict(scan.SVC_LIST)['sqs_sns']
+
+    def sqs(sess, account_id, region, g, warnings):
+        held.append(base.lock.locked())
+        fake_sqs(sess, account_id, region, g, warnings)
+
+    monkeypatch.setattr(scan, 'SVC_LIST', [('lambda', dict(scan.SVC_LIST)['lambda']), ('sqs_sns', sqs)])
+    state['queues'] = ['q2']
+    inc = scan.run_scan(Job({**payload, 'incremental': True}))
+    assert held == [False] and inc['removed'] == ['sqs:111111111111:eu-west-1:q1']
+    labels = {n.label for n in base.graph.nodes()}
+    assert 'q1' in labels and 'q2' not in labels
+
+def test_scan_settings_do_not_leak_into_the_next_job_on_the_same_worker(monkeypatch):
+    from app.aws import cache
+    from app.jobs import JobManager
+    seen = []
+    def fake_lambda(sess, account_id, region, g, warnings):
+        seen.append(cache.max_age.get())
+    monkeypatch.setattr(scan, 'client', lambda sess, svc, region=None: _Sts())
+    monkeypatch.setattr(scan, 'SVC_LIST', [('lambda', fake_lambda)])
+    monkeypatch.setattr(scan, 'FINGERPRINTS', {})
+    payload = {'access_key_id': 'AKIATEST', 'secret_access_key': 'x', 'regions': ['eu-west-1']}
+    jobs = JobManager(workers=1)  # both jobs run on the same pool thread
+    jobs.submit({**payload, 'max_age': 0}).future.result()
+    jobs.submit(payload).future.result()
+    assert seen == [0.0, None]
+
+def test_detail_mode_does_not_leak_into_the_next_job(monkeypatch):
+    from app.jobs import JobManager
+    from app.utils import detail_mode
+    seen = []
+    monkeypatch.setattr(scan, 'client', lambda sess, svc, region=None: _Sts())
+    monkeypatch.setattr(scan, 'SVC_LIST', [('lambda', lambda sess, acc, region, g, w: seen.append(detail_mode.get()))])
+    monkeypatch.setattr(scan, 'FINGERPRINTS', {})
+    payload = {'access_key_id': 'AKIATEST', 'secret_access_key': 'x', 'regions': ['eu-west-1']}
+    jobs = JobManager(workers=1)
+    for p in ({**payload, 'details': 'skip'}, {**payload, 'details': 'lazy'}, payload):
+        jobs.submit(p).future.result()
+    assert seen == ['skip', 'lazy', 'eager']
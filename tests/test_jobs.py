@@ -0,0 +1,26 @@
+import time
+
+import app.jobs as jobs
+from app.jobs import Job, JobManager
+
+def test_events_are_dropped_once_the_job_ended_and_no_stream_reads():
+    job = Job({})
+    job.open_reader()
+    for i in range(3):
+        job.emit({'event': 'batch', 'i': i})
+    job.emit({'event': 'end'})
+    new, ended = job.wait_events(0, 0)
+    assert len(new) == 4 and ended  # still buffered for the open stream
+    job.close_reader()
+    assert job.events == [{'event': 'end'}]
+    assert job.wait_events(4, 0) == ([], True)
+    assert job.wait_events(0, 0) == ([{'event': 'end'}], True)  # a stream opened later
+
+def test_finished_jobs_are_pruned_on_read(monkeypatch):
+    monkeypatch.setattr(jobs, 'run_scan', lambda job: {'elements': []})
+    mgr = JobManager(workers=1, ttl=0)
+    job = mgr.submit({})
+    job.future.result()
+    assert job.events == [{'event': 'end', 'status': 'done', 'error': None, 'elapsed': job.elapsed()}]
+    time.sleep(0.01)
+    assert mgr.get(job.id) is None
@@ -0,0 +1,95 @@
+import json
+
+from botocore.exceptions import ClientError
+
+import app.aws.lambda_ as lambda_
+from app.layout import snapshot_layout
+from app.scan import add_containers, load_details
+from app.search import snapshot_search
+from app.snapshots import Snapshot
+from app.utils import detail_mode
+
+ACC = '111111111111'
+
+class _Lambda:
+    def __init__(self, n):
+        self.functions = [{'FunctionArn': f'arn:aws:lambda:eu-west-1:{ACC}:function:f{i}', 'FunctionName': f'f{i}', 'Runtime': 'python3.12'} for i in range(n)]
+        self.calls = []
+        self.throttle = False
+
+    def get_paginator(self, op):
+        return self
+
+    def paginate(self):
+        yield {'Functions': self.functions}
+
+    def get_function_event_invoke_config(self, FunctionName):
+        self.calls.append(('config', FunctionName))
+        return {'DestinationConfig': {'OnFailure': {'Destination': f'arn:aws:sqs:eu-west-1:{ACC}:dlq'}}}
+
+    def get_policy(self, FunctionName):
+        self.calls.append(('policy', FunctionName))
+        if self.throttle:  # botocore's own retries ran out
+            raise ClientError({'Error': {'Code': 'Throttling'}, 'ResponseMetadata': {'RetryAttempts': 7}}, 'GetPolicy')
+        if FunctionName.endswith('f1'):
+            raise ClientError({'Error': {'Code': 'ResourceNotFoundException'}}, 'GetPolicy')
+        return {'Policy': json.dumps({'Statement': [{'Effect': 'Allow', 'Principal': '*', 'Action': 'lambda:InvokeFunction'}]})}
+
+def _run(run_enumerator, mode, n=5):
+    fake = _Lambda(n)
+    token = detail_mode.set(mode)
+    try:
+        g, warnings = run_enumerator(lambda_, fake, ACC, 'eu-west-1')
+    finally:
+        detail_mode.reset(token)
+    return fake, g, warnings
+
+def test_eager_details_are_fetched_for_every_function(run_enumerator):
+    fake, g, warnings = _run(run_enumerator, 'eager')
+    assert len(fake.calls) == 10 and warnings == []
+    f0 = g.node(f'lambda:{ACC}:eu-west-1:arn:aws:lambda:eu-west-1:{ACC}:function:f0')
+    assert f0.details['public_policy'] is True
+    f1 = g.node(f'lambda:{ACC}:eu-west-1:arn:aws:lambda:eu-west-1:{ACC}:function:f1')
+    assert 'policy' not in f1.details
+    assert len(g.edges('invoke')) == 5
+
+def test_lazy_details_are_fetched_on_request(run_enumerator):
+    fake, g, _ = _run(run_enumerator, 'lazy')
+    assert fake.calls == [] and g.edges('invoke') == []
+    node_id = f'lambda:{ACC}:eu-west-1:arn:aws:lambda:eu-west-1:{ACC}:function:f2'
+    assert g.node(node_id).details['lazy_details'] is True
+
+    snap = Snapshot('lambda-test', g, [], [], {}, {ACC: object()})
+    res = load_details(snap, node_id)
+    assert fake.calls == [('config', f'arn:aws:lambda:eu-west-1:{ACC}:function:f2'), ('policy', f'arn:aws:lambda:eu-west-1:{ACC}:function:f2')]
+    assert [el['data']['type'] for el in res['elements']] == ['lambda', 'destination', 'invoke']
+    assert g.node(node_id).details['lazy_details'] is False and g.node(node_id).details['public_policy'] is True
+    assert load_details(snap, 'nope') is None
+
+def test_lazily_loaded_destinations_join_containers_and_indexes(run_enumerator):
+    fake, g, _ = _run(run_enumerator, 'lazy')
+    add_containers(g)
+    snap = Snapshot('lambda-indexes', g, [], [], {}, {ACC: object()})
+    assert snapshot_search(snap).search('dlq')['total'] == 0
+    snapshot_layout(snap, 'vpc')
+    load_details(snap, f'lambda:{ACC}:eu-west-1:arn:aws:lambda:eu-west-1:{ACC}:function:f2')
+    [dest] = g.nodes('destination')
+    assert dest.parent == f'account:{ACC}:region:eu-west-1'
+    assert snapshot_search(snap).search('dlq')['total'] == 1  # indexes are rebuilt with the new node
+    assert dest.id in snapshot_layout(snap, 'vpc')
+
+def test_throttled_lazy_details_can_be_fetched_again(run_enumerator):
+    fake, g, _ = _run(run_enumerator, 'lazy')
+    node_id = f'lambda:{ACC}:eu-west-1:arn:aws:lambda:eu-west-1:{ACC}:function:f3'
+    snap = Snapshot('lambda-throttled', g, [], [], {}, {ACC: object()})
+    fake.throttle = True
+    res = load_details(snap, node_id)
+    assert res['warnings'] == [f'[{ACC}/eu-west-1] lambda get_policy for f3: throttled']
+    assert g.node(node_id).details['lazy_details'] is True  # the client asks again
+    fake.throttle = False
+    assert load_details(snap, node_id)['warnings'] == []
+    assert g.node(node_id).details['lazy_details'] is False and g.node(node_id).details['public_policy'] is True
+
+def test_skip_fetches_nothing(run_enumerator):
+    fake, g, _ = _run(run_enumerator, 'skip')
+    assert fake.calls == [] and len(g.nodes('lambda')) == 5
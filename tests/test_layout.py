@@ -0,0 +1,38 @@
+import itertools
+
+from app.graph import Graph
+from app.layout import MODES, NODE_SIZE, compute_layout, snapshot_layout
+from app.snapshots import Snapshot
+
+def _graph():
+    g = Graph()
+    g.add_node('vpc:1', 'vpc', 'vpc', 'r')
+    for s in (1, 2):
+        g.add_node(f'subnet:{s}', f's{s}', 'subnet', 'r', parent='vpc:1')
+    for i in range(12):
+        g.add_node(f'i:{i}', f'i{i}', 'instance', 'r', parent=f'subnet:{1 + i % 2}')
+        g.add_node(f'eni:{i}', f'eni{i}', 'eni', 'r', parent=f'subnet:{1 + i % 2}')
+        g.add_edge(f'att:{i}', f'i:{i}', f'eni:{i}', 'eni', 'attach', 'resource')
+    g.add_node('fn', 'fn', 'lambda', 'r')
+    g.add_edge('inv', 'fn', 'i:0', 'invoke', 'invoke', 'data')
+    return g
+
+def test_every_view_places_leaves_without_overlap_inside_their_compounds():
+    g = _graph()
+    for mode in MODES:
+        pos = compute_layout(g, mode)
+        assert set(pos) == {n.id for n in g.nodes() if n.type not in ('vpc', 'subnet')}
+        for a, b in itertools.combinations(pos.values(), 2):
+            assert max(abs(a[0] - b[0]), abs(a[1] - b[1])) >= NODE_SIZE
+        # the two subnets' boxes do not interleave
+        xs = {s: [pos[f'i:{i}'][0] for i in range(s - 1, 12, 2)] for s in (1, 2)}
+        ys = {s: [pos[f'i:{i}'][1] for i in range(s - 1, 12, 2)] for s in (1, 2)}
+        assert max(xs[1]) < min(xs[2]) or max(xs[2]) < min(xs[1]) or max(ys[1]) < min(ys[2]) or max(ys[2]) < min(ys[1])
+    service = compute_layout(g, 'service')
+    assert service['fn'][0] < service['i:0'][0]  # sources to the left
+
+def test_layouts_are_cached_per_snapshot():
+    snap = Snapshot('scope', _graph(), [], [], {}, {})
+    first = snapshot_layout(snap, 'vpc')
+    assert snapshot_layout(snap, 'vpc') is first and set(snap.layouts) == {'vpc'}
+    assert compute_layout(snap.graph, 'vpc') == first  # deterministic
@@ -0,0 +1,54 @@
+import io
+
+import boto3
+import botocore.endpoint
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.metrics import Metrics, Timings, current_timings
+from app.scheduler import current_task
+
+ACC = '111111111111'
+
+class _Raw(io.BytesIO):
+    def stream(self, **kw):
+        yield self.getvalue()
+
+def test_calls_are_counted_per_operation_and_job(monkeypatch):
+    monkeypatch.setattr(botocore.endpoint.time, 'sleep', lambda s: None)
+    m = Metrics()
+    c = boto3.client('lambda', region_name='eu-west-1', aws_access_key_id='x', aws_secret_access_key='y',
+                     config=Config(retries={'max_attempts': 3, 'mode': 'standard'}))
+    m.install(c)
+    attempts = []
+    def respond(request, **kw):
+        attempts.append(1)
+        if len(attempts) == 1:
+            return AWSResponse(request.url, 429, {'x-amzn-errortype': 'TooManyRequestsException'}, _Raw(b'{}'))
+        return AWSResponse(request.url, 200, {}, _Raw(b'{"Functions": []}'))
+    c.meta.events.register('before-send', respond)
+    timings = Timings()
+    tokens = current_task.set((ACC, 'eu-west-1', 'lambda')), current_timings.set(timings)
+    try:
+        c.list_functions()
+        c.list_functions()
+        with m.phase('findings'):
+            pass
+    finally:
+        current_task.reset(tokens[0]); current_timings.reset(tokens[1])
+    row = m.counters[('lambda', 'ListFunctions', ACC, 'eu-west-1')]
+    assert row == {'calls': 2, 'cached': 0, 'errors': 0, 'retries': 1, 'throttles': 1, 'bytes': 34, 'pages': 2}
+    out = timings.to_dict()
+    assert out['services']['lambda']['calls'] == 2 and 'findings' in out['phases']
+    assert out['slowest_operations'][0]['operation'] == 'ListFunctions'
+    text = m.render()
+    assert f'awsenum_api_throttles_total{{service="lambda",operation="ListFunctions",account="{ACC}",region="eu-west-1"}} 1' in text
+    assert f'awsenum_api_latency_seconds_count{{service="lambda",operation="ListFunctions",account="{ACC}",region="eu-west-1"}} 2' in text
+    assert 'awsenum_phase_seconds_bucket{phase="findings",le="+Inf"} 1' in text
+
+def test_metrics_endpoint_serves_prometheus_text():
+    r = TestClient(app).get('/metrics')
+    assert r.status_code == 200 and r.headers['content-type'].startswith('text/plain')
+    assert '# TYPE awsenum_api_latency_seconds histogram' in r.text and 'awsenum_cache_hits_total' in r.text
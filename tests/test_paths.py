@@ -0,0 +1,51 @@
+from fastapi.testclient import TestClient
+
+from app.graph import Graph
+from app.main import app
+from app.paths import find_paths
+from app.snapshots import STORE, Snapshot
+
+def _graph():
+    g = Graph()
+    for n, t in [('internet', 'external'), ('lb', 'load_balancer'), ('tg', 'target_group'), ('i-1', 'instance'),
+                 ('subnet', 'subnet'), ('rtb', 'route_table'), ('igw', 'igw'), ('lambda', 'lambda')]:
+        g.add_node(n, n, t)
+    g.add_edge('l', 'internet', 'lb', 'tcp:443', 'listener', 'network')
+    g.add_edge('b', 'lb', 'tg', 'lb→tg', 'bind', 'resource')
+    g.add_edge('t', 'tg', 'i-1', 'tcp:80', 'tg-target', 'network')
+    g.add_edge('d', 'internet', 'i-1', 'tcp:80', 'derived-reachability', 'network')
+    g.add_edge('s', 'i-1', 'subnet', 'in-subnet', 'attach', 'resource')
+    g.add_edge('a', 'subnet', 'rtb', 'assoc', 'assoc', 'resource')
+    g.add_edge('r', 'rtb', 'igw', 'route', 'route', 'network')
+    return g
+
+def test_k_shortest_paths_follow_network_edges():
+    g = _graph()
+    assert [p.key() for p in find_paths(g, 'internet', 'i-1', k=3)] == [('d',), ('l', 'b', 't')]
+    assert [p.key() for p in find_paths(g, 'i-1', 'igw')] == [('s', 'a', 'r')]
+    assert [p.key() for p in find_paths(g, 'i-1', 'rtb', types=['attach', 'assoc'])] == [('s', 'a')]
+    assert find_paths(g, 'igw', 'i-1') == []  # edges are walked in their own direction
+    # containment edges are walked both ways: subnet down to its instance
+    down = find_paths(g, 'subnet', 'i-1', k=1)[0].to_dict()
+    assert [h['reverse'] for h in down['hops']] == [True]
+
+def test_paths_do_not_hop_between_members_of_a_container():
+    g = _graph()
+    for n, t in [('i-2', 'instance'), ('sg', 'security_group'), ('cidr', 'cidr')]:
+        g.add_node(n, n, t)
+    g.add_edge('g1', 'i-1', 'sg', 'has-sg', 'attach', 'resource')
+    g.add_edge('g2', 'i-2', 'sg', 'has-sg', 'attach', 'resource')
+    g.add_edge('s2', 'i-2', 'subnet', 'in-subnet', 'attach', 'resource')
+    g.add_edge('in', 'cidr', 'sg', 'tcp:22', 'sg-rule', 'network')
+    assert find_paths(g, 'i-1', 'i-2') == []  # not instance -> sg <- instance, nor through the subnet
+    assert [p.key() for p in find_paths(g, 'cidr', 'i-2')] == [('in', 'g2')]
+
+def test_paths_endpoint_queries_a_snapshot():
+    snap = Snapshot('paths-test', _graph(), [], [], {}, {})
+    STORE.put(snap)
+    client = TestClient(app)
+    r = client.get('/paths', params={'from': 'internet', 'to': 'i-1', 'snapshot': snap.id})
+    assert r.status_code == 200
+    assert r.json()['paths'][0]['hops'][0]['edge'] == 'd'
+    assert client.get('/paths', params={'from': 'internet', 'to': 'nope', 'snapshot': snap.id}).status_code == 404
+    assert client.get('/paths', params={'from': 'internet'}).status_code == 400
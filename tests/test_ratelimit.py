@@ -0,0 +1,58 @@
+import io
+
+import boto3
+import botocore.endpoint
+from botocore.awsrequest import AWSResponse
+from botocore.config import Config
+
+import app.aws.ratelimit as ratelimit
+from app.aws.ratelimit import RateLimiter, family
+from app.scheduler import current_task
+
+class _Raw(io.BytesIO):
+    def stream(self, **kw):
+        yield self.getvalue()
+
+class _Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, s):
+        self.now += s
+
+def test_acquire_paces_and_rate_adapts(monkeypatch):
+    clock = _Clock()
+    monkeypatch.setattr(ratelimit, 'time', clock)
+    lim = RateLimiter(start=4, floor=1, ceiling=8)
+    key = ('111111111111', 'eu-west-1', family('ec2', 'DescribeInstances'))
+    assert [lim.acquire(key) for _ in range(6)] == [0, 0, 0, 0, 0.25, 0.25]  # one second of burst, then 4/s
+    lim.observe(key, True); lim.observe(key, True)  # the second throttle lands within the cooldown
+    assert lim.stats()['buckets']['111111111111/eu-west-1/ec2:read']['rate'] == 2
+    lim.observe(key, False)
+    assert lim.stats()['buckets']['111111111111/eu-west-1/ec2:read']['rate'] == 2.5
+    assert lim.stats()['throttles'] == 2
+    assert family('ec2', 'RunInstances') == 'ec2:write'
+
+def test_installed_limiter_counts_throttled_attempts(monkeypatch):
+    monkeypatch.setattr(botocore.endpoint.time, 'sleep', lambda s: None)
+    lim = RateLimiter(start=5, ceiling=50)
+    c = boto3.client('lambda', region_name='eu-west-1', aws_access_key_id='x', aws_secret_access_key='y',
+                     config=Config(retries={'max_attempts': 3, 'mode': 'standard'}))
+    lim.install(c)
+    attempts = []
+    def respond(request, **kw):
+        attempts.append(1)
+        if len(attempts) < 3:
+            return AWSResponse(request.url, 429, {'x-amzn-errortype': 'TooManyRequestsException'}, _Raw(b'{}'))
+        return AWSResponse(request.url, 200, {}, _Raw(b'{"Functions": []}'))
+    c.meta.events.register('before-send', respond)
+    token = current_task.set(('111111111111', 'eu-west-1', 'lambda'))
+    try:
+        c.list_functions()
+    finally:
+        current_task.reset(token)
+    b = lim.stats()['buckets']['111111111111/eu-west-1/lambda:read']
+    assert (b['calls'], b['throttles'], b['rate']) == (3, 2, 2.9)
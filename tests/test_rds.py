@@ -0,0 +1,38 @@
+import app.aws.elbv2 as elbv2
+import app.aws.rds as rds
+from app.graph import Graph
+
+ACC = '111111111111'
+R = 'eu-west-1'
+
+class _Rds:
+    def get_paginator(self, op):
+        return self
+
+    def paginate(self):
+        yield {'DBInstances': [{'DBInstanceArn': f'arn:aws:rds:{R}:{ACC}:db:web', 'DBInstanceIdentifier': 'web',
+                                'DBSubnetGroup': {'VpcId': 'vpc-1', 'Subnets': [{'SubnetIdentifier': 'subnet-1'}]},
+                                'VpcSecurityGroups': [{'VpcSecurityGroupId': 'sg-1'}]}]}
+
+class _Elb:
+    def get_paginator(self, op):
+        return self if op == 'describe_load_balancers' else _Empty()
+
+    def paginate(self, **kw):
+        yield {'LoadBalancers': [{'LoadBalancerArn': f'arn:aws:elasticloadbalancing:{R}:{ACC}:loadbalancer/app/web/1',
+                                  'LoadBalancerName': 'web', 'Type': 'application', 'VpcId': 'vpc-1',
+                                  'AvailabilityZones': [{'SubnetId': 'subnet-1'}], 'SecurityGroups': ['sg-1']}]}
+
+    def describe_tags(self, ResourceArns):
+        return {'TagDescriptions': []}
+
+class _Empty:
+    def paginate(self, **kw):
+        return iter(())
+
+def test_rds_and_load_balancer_of_the_same_name_keep_their_own_edges(run_enumerator):
+    g = Graph()
+    for mod, fake in ((rds, _Rds()), (elbv2, _Elb())):
+        assert run_enumerator(mod, fake, ACC, R, g)[1] == []
+    for label in ('in-subnet', 'has-sg'):
+        assert sorted(g.node(e.source).type for e in g.edges('attach') if e.label == label) == ['load_balancer', 'rds_instance']
@@ -0,0 +1,49 @@
+from app.graph import Graph
+from app.reachability import INTERNET, derive_reachability
+
+def _vpc(g):
+    g.add_node('vpc-1', 'vpc-1', 'vpc')
+    g.add_node('subnet-pub', 'subnet-pub', 'subnet', parent='vpc-1')
+    g.add_node('subnet-main', 'subnet-main', 'subnet', parent='vpc-1')
+    g.add_node('rtb-pub', 'rtb-pub', 'route_table', details={'main': False}, parent='vpc-1')
+    g.add_node('rtb-main', 'rtb-main', 'route_table', details={'main': True}, parent='vpc-1')
+    g.add_node('igw-1', 'igw-1', 'igw')
+    g.add_node('pcx-1', 'pcx-1', 'pcx')
+    g.add_edge('a1', 'subnet-pub', 'rtb-pub', 'assoc', 'assoc', 'resource')
+    g.add_edge('r1', 'rtb-pub', 'igw-1', 'route', 'route', 'network', {'destination': '0.0.0.0/0', 'target_type': 'igw'})
+    # more specific route: replies to 8.8.0.0/16 leave through the peering, not the IGW
+    g.add_edge('r2', 'rtb-pub', 'pcx-1', 'route', 'route', 'network', {'destination': '8.8.0.0/16', 'target_type': 'pcx'})
+    g.add_edge('r3', 'rtb-main', 'igw-1', 'route', 'route', 'network', {'destination': '0.0.0.0/0', 'target_type': 'igw'})
+
+def _sg(g, sg, cidr, port):
+    g.add_node(sg, sg, 'security_group')
+    g.add_node(f'cidr:{cidr}', cidr, 'cidr')
+    g.add_edge(f'{sg}:{cidr}', f'cidr:{cidr}', sg, f'tcp:{port}', 'sg-rule', 'network',
+               {'direction': 'ingress', 'rules': [{'proto': 'tcp', 'from': port, 'to': port}]})
+
+def _instance(g, iid, subnet, sg, public_ip='1.2.3.4'):
+    g.add_node(iid, iid, 'instance', details={'public_ip': public_ip}, parent=subnet)
+    g.add_edge(f'{iid}:subnet', iid, subnet, 'in-subnet', 'attach', 'resource')
+    g.add_edge(f'{iid}:sg', iid, sg, 'has-sg', 'attach', 'resource')
+
+def test_longest_prefix_route_and_sg_ingress_decide_reachability():
+    g = Graph()
+    _vpc(g)
+    _sg(g, 'sg-web', '0.0.0.0/0', 443)
+    _sg(g, 'sg-peer', '8.8.8.0/24', 22)
+    _sg(g, 'sg-priv', '10.0.0.0/8', 22)
+    _instance(g, 'i-web', 'subnet-pub', 'sg-web')
+    _instance(g, 'i-peer', 'subnet-pub', 'sg-peer')
+    _instance(g, 'i-priv', 'subnet-pub', 'sg-priv')
+    _instance(g, 'i-main', 'subnet-main', 'sg-web')
+    _instance(g, 'i-noip', 'subnet-pub', 'sg-web', public_ip=None)
+
+    assert derive_reachability(g) == 2
+    assert g.node(INTERNET) is not None
+    reached = {e.target: e for e in g.out_edges(INTERNET)}
+    assert set(reached) == {'i-web', 'i-main'}
+    assert reached['i-web'].label == 'tcp:443' and reached['i-web'].derived
+    assert reached['i-web'].details['trail'] == [
+        'public ip 1.2.3.4', 'subnet-pub uses rtb-pub (explicit)', 'route 0.0.0.0/0 -> igw-1', 'sg-web allows tcp:443 from 0.0.0.0/0',
+    ]
+    assert reached['i-main'].details['trail'][1] == 'subnet-main uses rtb-main (main)'
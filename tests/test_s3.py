@@ -0,0 +1,39 @@
+from botocore.exceptions import ClientError
+
+import app.aws.s3 as s3
+from app.aws.cache import ResponseCache
+
+ACC = '111111111111'
+LOCATIONS = {'a': {'LocationConstraint': None}, 'b': {'LocationConstraint': 'EU'}, 'c': {'LocationConstraint': 'ap-south-1'}}
+
+class _S3:
+    def __init__(self):
+        self.calls = []
+
+    def get_paginator(self, op):
+        return self
+
+    def paginate(self):
+        yield {'Buckets': [{'Name': n, 'CreationDate': '2020-01-01'} for n in ('a', 'b', 'c', 'gone')]}
+        yield {'Buckets': [{'Name': 'd', 'CreationDate': '2021-01-01', 'BucketRegion': 'us-west-2'}]}
+
+    def get_bucket_location(self, Bucket):
+        self.calls.append(Bucket)
+        if Bucket not in LOCATIONS:
+            raise ClientError({'Error': {'Code': 'NoSuchBucket'}}, 'GetBucketLocation')
+        return LOCATIONS[Bucket]
+
+def _regions(g):
+    return {n.label: n.region for n in g.nodes('s3_bucket')}
+
+def test_bucket_regions_are_resolved_once_and_cached(monkeypatch, tmp_path, run_enumerator):
+    monkeypatch.setattr(s3, 'CACHE', ResponseCache(str(tmp_path)))
+    fake = _S3()
+    g, warnings = run_enumerator(s3, fake, ACC, 'global')
+    regions = _regions(g)
+    assert regions == {'a': 'us-east-1', 'b': 'eu-west-1', 'c': 'ap-south-1', 'gone': 'us-east-1', 'd': 'us-west-2'}
+    assert sorted(fake.calls) == ['a', 'b', 'c', 'gone']  # 'd' came with its region
+    assert warnings == [f'[{ACC}/global] s3 get_bucket_location for bucket gone: NoSuchBucket']
+    fake.calls.clear()
+    assert _regions(run_enumerator(s3, fake, ACC, 'global')[0]) == regions
+    assert fake.calls == ['gone']  # failures are not cached
@@ -0,0 +1,17 @@
+from benchmarks.scaling import STAGES, compare, exponent, measure, summarize
+
+def test_exponent_and_baseline_comparison():
+    assert exponent([(1000, 0.01), (2000, 0.02), (4000, 0.04)]) == 1.0
+    assert exponent([(1000, 0.01), (2000, 0.04), (4000, 0.16)]) == 2.0
+    assert exponent([(1000, 0.001), (2000, 0.02)]) is None  # below the noise floor
+    base = {'stages': {'findings': {'exponent': 1.0, 'seconds': {'1000': 0.01}}}}
+    linear = {'stages': {'findings': {'exponent': 1.1, 'seconds': {'1000': 0.015}}}}
+    quadratic = {'stages': {'findings': {'exponent': 2.0, 'seconds': {'1000': 0.05}}}}
+    assert compare(linear, base) == []
+    assert compare(quadratic, base) == ['findings: grows as n^2.0, baseline n^1.0', 'findings: 0.05s at 1000 instances, baseline 0.01s']
+
+def test_every_stage_is_measured():
+    rows = [measure(200, memory=True)]
+    assert set(rows[0]['seconds']) == set(STAGES) == set(rows[0]['peak_mib'])
+    assert rows[0]['elements'] > 200
+    assert summarize(rows)['stages']['commit']['seconds'] == {'200': rows[0]['seconds']['commit']}
@@ -0,0 +1,43 @@
+import threading
+import time
+
+from app.aws.clients import BOTO_CFG
+from app.scheduler import MAX_WORKERS, Scheduler
+
+def test_runs_every_task_including_ones_submitted_while_running():
+    sched = Scheduler(workers=4, per_account=4, per_service=4)
+    for i in range(3):
+        sched.submit(('a', 'r', 'seed'), lambda i=i: i)
+    seen = []
+    for key, fut in sched.run():
+        seen.append((key[2], fut.result()))
+        if key[2] == 'seed':
+            sched.submit(('a', 'r', 'child'), lambda v=fut.result(): v * 10)
+    assert sorted(v for k, v in seen if k == 'seed') == [0, 1, 2]
+    assert sorted(v for k, v in seen if k == 'child') == [0, 10, 20]
+
+def test_per_account_and_per_service_caps():
+    lock = threading.Lock()
+    running = {'acc': {}, 'svc': {}}
+    peak = {'acc': 0, 'svc': 0}
+
+    def task(acc, svc):
+        with lock:
+            for kind, k in (('acc', acc), ('svc', svc)):
+                running[kind][k] = running[kind].get(k, 0) + 1
+                peak[kind] = max(peak[kind], running[kind][k])
+        time.sleep(0.01)
+        with lock:
+            running['acc'][acc] -= 1; running['svc'][svc] -= 1
+
+    sched = Scheduler(workers=16, per_account=3, per_service=2)
+    for acc in ('a1', 'a2', 'a3'):
+        for svc in ('ec2', 'rds', 'lambda'):
+            for region in ('r1', 'r2', 'r3'):
+                sched.submit((acc, region, svc), task, acc, svc)
+    results = list(sched.run())
+    assert len(results) == 27
+    assert peak['acc'] <= 3 and peak['svc'] <= 2
+
+def test_workers_are_capped_at_the_client_connection_pool_size():
+    assert Scheduler(workers=MAX_WORKERS * 10).workers == MAX_WORKERS == BOTO_CFG.max_pool_connections
@@ -0,0 +1,42 @@
+from fastapi.testclient import TestClient
+
+from app.graph import Graph
+from app.main import app
+from app.search import SearchIndex
+from app.snapshots import STORE, Snapshot
+
+def _graph():
+    g = Graph()
+    g.add_node('i:111:r:i-0abc', 'web-1', 'instance', 'r', details={'public_ip': '54.1.2.3'}, account_id='111')
+    g.add_node('i:111:r:i-0def', 'web-2', 'instance', 'r', account_id='111')
+    g.add_node('eni:111:r:eni-1', 'eni-1', 'eni', 'r', details={'private_ip': '10.0.1.5', 'public_ip': '54.1.2.3'}, account_id='111')
+    g.add_node('subnet:111:r:subnet-1', 'Subnet subnet-1', 'subnet', 'r', details={'cidr': '10.0.1.0/24'}, account_id='111')
+    g.add_node('lb:111:r:lb', 'api (application)', 'load_balancer', 'r', details={'dns': 'api-123.elb.amazonaws.com', 'tags': {'env': 'Prod'}}, account_id='111')
+    return g
+
+def _ids(res):
+    return [r['id'] for r in res['results']]
+
+def test_exact_prefix_and_substring_matches_are_ranked():
+    ix = SearchIndex(_graph())
+    assert _ids(ix.search('web')) == ['i:111:r:i-0abc', 'i:111:r:i-0def']
+    res = ix.search('54.1.2.3')
+    assert set(_ids(res)) == {'eni:111:r:eni-1', 'i:111:r:i-0abc'}
+    assert res['results'][0]['match'] == {'field': 'public_ip', 'value': '54.1.2.3'}
+    # '10.0.1' is a prefix of the ENI's IP and of the subnet's CIDR; 'elb.amazon' only a substring
+    assert set(_ids(ix.search('10.0.1'))) == {'eni:111:r:eni-1', 'subnet:111:r:subnet-1'}
+    assert _ids(ix.search('ELB.amazon')) == ['lb:111:r:lb']
+    assert _ids(ix.search('env:prod')) == ['lb:111:r:lb'] and _ids(ix.search('0abc')) == ['i:111:r:i-0abc']
+    assert _ids(ix.search('web 54.1')) == ['i:111:r:i-0abc']  # every token must match
+    assert ix.search('nothing-like-this')['total'] == 0 and ix.search('  ')['total'] == 0
+
+def test_search_endpoint_pages_through_results():
+    snap = Snapshot('search-test', _graph(), [], [], {}, {})
+    STORE.put(snap)
+    c = TestClient(app)
+    first = c.get('/search', params={'q': '54', 'limit': 1, 'snapshot': snap.id}).json()
+    assert first['total'] == 2 and len(first['results']) == 1 and first['next_offset'] == 1
+    rest = c.get('/search', params={'q': '54', 'offset': 1, 'snapshot': snap.id}).json()
+    assert rest['next_offset'] is None
+    assert {r['id'] for r in first['results'] + rest['results']} == {'eni:111:r:eni-1', 'i:111:r:i-0abc'}
+    assert c.get('/search', params={'q': '54', 'limit': 'x'}).status_code == 400
@@ -0,0 +1,41 @@
+from app.graph import Graph
+from app.scan import add_containers
+from app.snapshots import Snapshot
+from app.subgraph import snapshot_hierarchy
+
+def _snap():
+    g = Graph()
+    g.add_node('vpc:1', 'vpc-1', 'vpc', 'r', account_id='111')
+    g.add_node('subnet:1', 'subnet-1', 'subnet', 'r', parent='vpc:1', account_id='111')
+    for i in range(3):
+        g.add_node(f'i:{i}', f'i-{i}', 'instance', 'r', parent='subnet:1', account_id='111')
+    g.add_node('fn', 'fn', 'lambda', 'r', account_id='111')
+    g.add_edge('e1', 'fn', 'i:0', 'invoke', 'invoke', 'data')
+    g.add_edge('e2', 'i:0', 'i:1', 'sg', 'sg-rule', 'network')
+    g.add_edge('e3', 'i:1', 'i:2', 'sg', 'sg-rule', 'network')
+    add_containers(g)
+    return Snapshot('scope', g, [], [], {}, {})
+
+def _ids(res):
+    return {el['data']['id'] for el in res['elements']}
+
+def test_overview_lists_collapsed_containers_with_counts():
+    h = snapshot_hierarchy(_snap())
+    els = {el['data']['id']: el['data'] for el in h.overview()['elements']}
+    assert set(els) == {'account:111', 'account:111:region:r', 'vpc:1'}
+    assert els['vpc:1']['child_count'] == 1 and els['vpc:1']['descendant_count'] == 4
+    assert els['account:111:region:r']['descendant_count'] == 6
+
+def test_expand_returns_children_and_their_edges():
+    snap = _snap()
+    h = snapshot_hierarchy(snap)
+    assert snapshot_hierarchy(snap) is h
+    assert _ids(h.expand('subnet:1')) == {'i:0', 'i:1', 'i:2', 'e1', 'e2', 'e3'}
+    assert h.expand('nope') is None
+
+def test_neighborhood_brings_containers_and_stops_at_k_or_limit():
+    h = snapshot_hierarchy(_snap())
+    one = h.neighborhood('fn', 1)
+    assert _ids(one) == {'fn', 'i:0', 'e1', 'subnet:1', 'vpc:1', 'account:111:region:r', 'account:111'}
+    assert {'i:1', 'e2'} <= _ids(h.neighborhood('fn', 2)) and 'i:2' not in _ids(h.neighborhood('fn', 2))
+    assert h.neighborhood('fn', 3, limit=2)['truncated']
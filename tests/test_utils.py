@@ -19,3 +19,37 @@ def test_range_to_str():
     assert range_to_str(80, 443, 'tcp') == '80-443'
     assert range_to_str(None, None, 'tcp') == 'all'
     assert range_to_str(0, 0, '-1') == 'all'
+
+def test_fan_out_keeps_order_and_context():
+    import threading
+    from app.scheduler import current_task
+    from app.utils import fan_out
+    token = current_task.set(('111111111111', 'eu-west-1', 'lambda'))
+    try:
+        out = fan_out(lambda i: (i, current_task.get(), threading.get_ident()), range(20), workers=4)
+    finally:
+        current_task.reset(token)
+    assert [i for i, _, _ in out] == list(range(20))
+    assert {k for _, k, _ in out} == {('111111111111', 'eu-west-1', 'lambda')}
+    assert threading.get_ident() not in {t for _, _, t in out}
+
+def test_backoff_call_retries_throttling(monkeypatch):
+    from botocore.exceptions import ClientError
+    import app.utils as utils
+    monkeypatch.setattr(utils.time, 'sleep', lambda s: None)
+    calls = []
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ClientError({'Error': {'Code': 'TooManyRequestsException'}}, 'GetPolicy')
+        return {'ok': True}
+    assert utils.backoff_call(flaky) == ({'ok': True}, None)
+    assert len(calls) == 3
+    def missing():
+        raise ClientError({'Error': {'Code': 'ResourceNotFoundException'}}, 'GetPolicy')
+    assert utils.backoff_call(missing) == (None, 'ResourceNotFoundException')
+    calls.clear()
+    def exhausted():  # botocore's own retries already ran out
+        calls.append(1)
+        raise ClientError({'Error': {'Code': 'Throttling'}, 'ResponseMetadata': {'RetryAttempts': 7}}, 'DescribeInstances')
+    assert utils.backoff_call(exhausted) == (None, 'Throttling') and len(calls) == 1
@@ -0,0 +1,54 @@
+import gzip
+import zlib
+
+import orjson
+
+from app.graph import Graph
+from app.metrics import METRICS
+from app.subgraph import Hierarchy
+from app.wire import COMPACT_TYPE, StreamCompressor, decode_compact, encode, encode_compact
+from benchmarks.scaling import buffers, spec_for
+
+def _graph():
+    g = Graph()
+    for key, buf in buffers(spec_for(300)):
+        g.commit(buf, key)
+    g.add_edge('derived:x', 'internet', 'i:nowhere', 'tcp:22', 'derived-reachability', 'network', derived=True, details={'ports': ['tcp:22']})
+    return g
+
+def test_compact_encoding_round_trips_and_is_smaller():
+    result = {'elements': _graph().elements(), 'warnings': ['w'], 'snapshot_id': 's1'}
+    compact = orjson.loads(orjson.dumps(encode_compact(result)))
+    assert compact['format'] == 'compact/1' and compact['warnings'] == ['w']
+    assert decode_compact(compact) == result
+    assert len(orjson.dumps(compact)) < 0.6 * len(orjson.dumps(result))
+
+def test_compact_encoding_carries_other_data_keys():
+    res = {'elements': Hierarchy(_graph()).overview()['elements']}
+    assert any('child_count' in el['data'] for el in res['elements'])
+    assert decode_compact(orjson.loads(orjson.dumps(encode_compact(res)))) == res
+    assert 'extra' not in encode_compact({'elements': _graph().elements()})['elements']['nodes']
+
+def test_encode_negotiates_format_and_compression():
+    result = {'elements': _graph().elements()}
+    plain = encode(result)
+    assert plain.media_type == 'application/json' and 'content-encoding' not in plain.headers
+    assert orjson.loads(plain.body) == result
+    r = encode(result, accept=f'{COMPACT_TYPE}, application/json;q=0.5', accept_encoding='gzip, deflate')
+    assert r.media_type == COMPACT_TYPE and r.headers['content-encoding'] == 'gzip'
+    assert decode_compact(orjson.loads(gzip.decompress(r.body))) == result
+    assert 'content-encoding' not in encode({'ok': True}, accept_encoding='gzip').headers  # too small to bother
+    assert 'content-encoding' not in encode(result, accept_encoding='gzip;q=0').headers
+
+def test_encode_times_serialization_and_compression():
+    METRICS.clear()
+    encode({'elements': _graph().elements()}, accept_encoding='gzip')
+    assert METRICS.phases['serialize'].count == 1 and METRICS.phases['compress'].count == 1
+
+def test_stream_compressor_flushes_every_chunk():
+    z = StreamCompressor('gzip')
+    d = zlib.decompressobj(31)
+    for ev in (b'{"event":"batch"}\n', b'{"event":"final"}\n'):
+        assert d.decompress(z.chunk(ev)) == ev  # readable without waiting for the next chunk
+    d.decompress(z.end())
+    assert d.eof